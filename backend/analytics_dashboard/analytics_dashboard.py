@@ -1,78 +1,404 @@
 import json
+import math
 import os
-from collections import defaultdict
-import pandas as pd
+import time
+import sqlite3
+import threading
+import numpy as np
 
+# Legacy read-modify-write store; imported into ANALYTICS_DB once and then renamed.
 ANALYTICS_FILE = "analytics_data.json"
+ANALYTICS_DB = os.environ.get("ANALYTICS_DB", "analytics.db")
+# Number of distinct policy questions tracked by the Space-Saving heavy-hitters sketch.
+QUESTION_SKETCH_CAPACITY = int(os.environ.get("QUESTION_SKETCH_CAPACITY", "200"))
+# Bump when the aggregate tables change shape so they are rebuilt from the event log.
+AGGREGATES_VERSION = "2"
 
-def log_data(log_type, data):
+# Time buckets events are rolled up into, in seconds.
+GRANULARITIES = {"minute": 60, "hour": 3600, "day": 86400}
+MINUTE_ROLLUP_RETENTION_SECONDS = int(os.environ.get("MINUTE_ROLLUP_RETENTION_SECONDS", str(7 * 86400)))
+# Fit scores are bucketed into a 0-100 histogram per time bucket and role for percentiles.
+SCORE_BINS = 101
+MAX_WINDOW_BUCKETS = 5000
+
+_local = threading.local()
+
+
+def _init_schema(conn):
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at REAL NOT NULL,
+            type TEXT NOT NULL,
+            payload TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS events_type ON events (type);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+
+        -- Aggregates maintained on every append so dashboard reads never scan events.
+        CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value REAL NOT NULL);
+        CREATE TABLE IF NOT EXISTS role_stats (role TEXT PRIMARY KEY, count INTEGER NOT NULL, total REAL NOT NULL);
+        CREATE TABLE IF NOT EXISTS question_counts (question TEXT PRIMARY KEY, count INTEGER NOT NULL, error INTEGER NOT NULL);
+        CREATE INDEX IF NOT EXISTS question_counts_count ON question_counts (count);
+
+        -- Time-bucketed rollups; hist is a uint32[SCORE_BINS] NumPy array stored as bytes.
+        CREATE TABLE IF NOT EXISTS score_rollups (
+            granularity TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            total REAL NOT NULL,
+            hist BLOB NOT NULL,
+            PRIMARY KEY (granularity, bucket, role)
+        );
+        CREATE TABLE IF NOT EXISTS event_rollups (
+            granularity TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (granularity, bucket, type)
+        );
+    """)
+
+
+def _migrate_legacy_file(conn):
     """
-    Logs a new data point to the analytics file.
+    Imports analytics_data.json into the event log exactly once, even with
+    several uvicorn workers starting at the same time.
     """
     if not os.path.exists(ANALYTICS_FILE):
-        analytics_data = {"fit_scores": [], "jds_generated": 0, "policy_questions": []}
-    else:
-        with open(ANALYTICS_FILE, 'r') as f:
-            try:
-                analytics_data = json.load(f)
-            except json.JSONDecodeError:
-                analytics_data = {"fit_scores": [], "jds_generated": 0, "policy_questions": []}
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_migrated'").fetchone():
+            conn.execute("COMMIT")
+            return
+        try:
+            with open(ANALYTICS_FILE, 'r') as f:
+                legacy = json.load(f)
+        except (json.JSONDecodeError, OSError, UnicodeDecodeError):
+            legacy = {}
+        created_at = os.path.getmtime(ANALYTICS_FILE)
+        for log_type, data in _legacy_events(legacy):
+            _record_event(conn, created_at, log_type, data)
+        conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_migrated', ?)", (str(time.time()),))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    os.replace(ANALYTICS_FILE, f"{ANALYTICS_FILE}.migrated")
+
+
+def _normalize_fit_score(data):
+    try:
+        role = data.get("role")
+        score = float(data["score"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+    if not math.isfinite(score):
+        return None
+    return {"role": role.strip() if isinstance(role, str) and role.strip() else "Unknown Role", "score": score}
+
+
+def _legacy_events(legacy):
+    # Malformed sections and rows are skipped so one bad entry cannot block the import
+    if not isinstance(legacy, dict):
+        return []
+    fit_scores = legacy.get("fit_scores")
+    fit_scores = [_normalize_fit_score(item) for item in fit_scores] if isinstance(fit_scores, list) else []
+    events = [("fit_score", item) for item in fit_scores if item is not None]
+    jds_generated = legacy.get("jds_generated")
+    if isinstance(jds_generated, int) and not isinstance(jds_generated, bool):
+        events += [("jd_generated", {})] * max(jds_generated, 0)
+    questions = legacy.get("policy_questions")
+    if isinstance(questions, list):
+        events += [("policy_question", q) for q in questions if isinstance(q, str) and q]
+    return events
+
+
+def _connect():
+    # One connection per thread; WAL lets readers and a writer from any worker run concurrently.
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(ANALYTICS_DB, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Commits are durable at WAL checkpoints rather than fsync'd one by one.
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _init_schema(conn)
+        _migrate_legacy_file(conn)
+        _ensure_aggregates(conn)
+        _local.conn = conn
+    return conn
+
 
+def _increment(conn, name, amount=1):
+    conn.execute(
+        "INSERT INTO counters (name, value) VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+        (name, amount),
+    )
+
+
+def _count_question(conn, question):
+    """
+    Space-Saving update: exact counts while there is room, otherwise the
+    least-counted question is replaced and inherits its count as the error bound.
+    """
+    if conn.execute("UPDATE question_counts SET count = count + 1 WHERE question = ?", (question,)).rowcount:
+        return
+    tracked = conn.execute("SELECT COUNT(*) FROM question_counts").fetchone()[0]
+    if tracked < QUESTION_SKETCH_CAPACITY:
+        conn.execute("INSERT INTO question_counts (question, count, error) VALUES (?, 1, 0)", (question,))
+        return
+    victim, min_count = conn.execute("SELECT question, count FROM question_counts ORDER BY count LIMIT 1").fetchone()
+    conn.execute(
+        "UPDATE question_counts SET question = ?, count = ?, error = ? WHERE question = ?",
+        (question, min_count + 1, min_count, victim),
+    )
+
+
+def _apply_rollups(conn, created_at, log_type, data):
+    for granularity, width in GRANULARITIES.items():
+        bucket = int(created_at // width) * width
+        conn.execute(
+            "INSERT INTO event_rollups (granularity, bucket, type, count) VALUES (?, ?, ?, 1) "
+            "ON CONFLICT (granularity, bucket, type) DO UPDATE SET count = count + 1",
+            (granularity, bucket, log_type),
+        )
+        if log_type != "fit_score":
+            continue
+        row = conn.execute(
+            "SELECT hist FROM score_rollups WHERE granularity = ? AND bucket = ? AND role = ?",
+            (granularity, bucket, data["role"]),
+        ).fetchone()
+        hist = np.frombuffer(row[0], dtype=np.uint32).copy() if row else np.zeros(SCORE_BINS, dtype=np.uint32)
+        hist[int(min(max(round(data["score"]), 0), SCORE_BINS - 1))] += 1
+        conn.execute(
+            "INSERT INTO score_rollups (granularity, bucket, role, count, total, hist) VALUES (?, ?, ?, 1, ?, ?) "
+            "ON CONFLICT (granularity, bucket, role) DO UPDATE SET "
+            "count = count + 1, total = total + excluded.total, hist = excluded.hist",
+            (granularity, bucket, data["role"], data["score"], hist.tobytes()),
+        )
+
+
+def _apply_aggregates(conn, created_at, log_type, data):
+    _apply_rollups(conn, created_at, log_type, data)
     if log_type == "fit_score":
-        analytics_data["fit_scores"].append(data)
+        _increment(conn, "screenings")
+        _increment(conn, "fit_score_total", data["score"])
+        conn.execute(
+            "INSERT INTO role_stats (role, count, total) VALUES (?, 1, ?) "
+            "ON CONFLICT (role) DO UPDATE SET count = count + 1, total = total + excluded.total",
+            (data["role"], data["score"]),
+        )
     elif log_type == "jd_generated":
-        analytics_data["jds_generated"] = analytics_data.get("jds_generated", 0) + 1
+        _increment(conn, "jds_generated")
     elif log_type == "policy_question":
-        analytics_data["policy_questions"].append(data)
+        _count_question(conn, data)
 
-    with open(ANALYTICS_FILE, 'w') as f:
-        json.dump(analytics_data, f, indent=4)
 
-def get_analytics_data():
+def _record_event(conn, created_at, log_type, data):
+    conn.execute(
+        "INSERT INTO events (created_at, type, payload) VALUES (?, ?, ?)",
+        (created_at, log_type, json.dumps(data)),
+    )
+    _apply_aggregates(conn, created_at, log_type, data)
+
+
+def _ensure_aggregates(conn):
     """
-    Reads and processes the analytics data for visualization.
+    Rebuilds the aggregate tables from the event log once, for databases
+    created before the current AGGREGATES_VERSION.
     """
-    if not os.path.exists(ANALYTICS_FILE):
-        return {
-            "total_screenings": 0,
-            "total_jds_generated": 0,
-            "avg_fit_score": 0,
-            "avg_score_by_role": {},
-            "common_policy_questions": []
-        }
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'aggregates_version'").fetchone()
+        if row is None or row[0] != AGGREGATES_VERSION:
+            for table in ("counters", "role_stats", "question_counts", "score_rollups", "event_rollups"):
+                conn.execute(f"DELETE FROM {table}")
+            events = conn.execute("SELECT created_at, type, payload FROM events ORDER BY id").fetchall()
+            for created_at, log_type, payload in events:
+                data = json.loads(payload)
+                if log_type == "fit_score":
+                    # Events logged before roles were defaulted may carry a null role
+                    data = _normalize_fit_score(data)
+                    if data is None:
+                        continue
+                _apply_aggregates(conn, created_at, log_type, data)
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('aggregates_version', ?)", (AGGREGATES_VERSION,)
+            )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
 
-    with open(ANALYTICS_FILE, 'r') as f:
-        try:
-            analytics_data = json.load(f)
-        except json.JSONDecodeError:
-            return {} # Return empty if file is corrupt
+
+def log_data(log_type, data):
+    """
+    Appends a new data point to the analytics event log and updates the
+    running aggregates in the same transaction.
+    """
+    if log_type == "fit_score":
+        data = _normalize_fit_score(data)
+        if data is None:
+            return # The LLM returned a non-numeric score; nothing meaningful to record
+    conn = _connect()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _record_event(conn, now, log_type, data)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    _prune_minute_rollups(conn, now)
+
+
+def _prune_minute_rollups(conn, now):
+    # Minute buckets are only useful for recent windows; prune at most once an hour per thread.
+    if now - getattr(_local, "last_prune", 0) < 3600:
+        return
+    _local.last_prune = now
+    conn.execute(
+        "DELETE FROM score_rollups WHERE granularity = 'minute' AND bucket < ?", (now - MINUTE_ROLLUP_RETENTION_SECONDS,)
+    )
+    conn.execute(
+        "DELETE FROM event_rollups WHERE granularity = 'minute' AND bucket < ?", (now - MINUTE_ROLLUP_RETENTION_SECONDS,)
+    )
+
+
+def get_analytics_data():
+    """
+    Reads the pre-aggregated analytics for visualization. The cost does not
+    grow with the number of logged events.
+    """
+    conn = _connect()
+    counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
 
     # Calculate total screenings and average fit score
-    fit_scores = analytics_data.get("fit_scores", [])
-    total_screenings = len(fit_scores)
-    avg_fit_score = sum(item['score'] for item in fit_scores) / total_screenings if total_screenings > 0 else 0
+    total_screenings = int(counters.get("screenings", 0))
+    avg_fit_score = counters.get("fit_score_total", 0) / total_screenings if total_screenings > 0 else 0
 
     # Calculate average fit score by role
-    scores_by_role = defaultdict(lambda: {'total_score': 0, 'count': 0})
-    for item in fit_scores:
-        role = item.get('role', 'Unknown Role')
-        scores_by_role[role]['total_score'] += item['score']
-        scores_by_role[role]['count'] += 1
-
     avg_score_by_role = {
-        role: data['total_score'] / data['count']
-        for role, data in scores_by_role.items()
+        role: total / count
+        for role, count, total in conn.execute("SELECT role, count, total FROM role_stats").fetchall()
     }
 
     # Get common policy questions
-    policy_questions = analytics_data.get("policy_questions", [])
-    question_counts = pd.Series(policy_questions).value_counts().nlargest(5)
-
+    question_counts = conn.execute("SELECT question, count FROM question_counts ORDER BY count DESC LIMIT 5").fetchall()
 
     return {
         "total_screenings": total_screenings,
-        "total_jds_generated": analytics_data.get("jds_generated", 0),
+        "total_jds_generated": int(counters.get("jds_generated", 0)),
         "avg_fit_score": round(avg_fit_score, 2),
         "avg_score_by_role": avg_score_by_role,
-        "common_policy_questions": question_counts.to_dict()
+        "common_policy_questions": dict(question_counts)
+    }
+
+
+def _percentile(hist, q):
+    total = hist.sum()
+    if total == 0:
+        return None
+    return int(np.searchsorted(np.cumsum(hist), q * total))
+
+
+def pick_granularity(start, end):
+    span = end - start
+    if span <= 6 * 3600:
+        return "minute"
+    if span <= 14 * 86400:
+        return "hour"
+    return "day"
+
+
+def get_analytics_window(start, end, granularity=None):
+    """
+    Serves windowed analytics between two epoch timestamps from the rollup
+    tables: per-bucket counts and averages plus per-role fit score percentiles.
+    """
+    granularity = granularity or pick_granularity(start, end)
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of: {', '.join(GRANULARITIES)}.")
+    if end <= start:
+        raise ValueError("'to' must be later than 'from'.")
+    width = GRANULARITIES[granularity]
+    first_bucket = int(start // width) * width
+    if (end - first_bucket) / width > MAX_WINDOW_BUCKETS:
+        raise ValueError(f"The window spans more than {MAX_WINDOW_BUCKETS} {granularity} buckets; use a coarser granularity.")
+    conn = _connect()
+
+    score_rows = conn.execute(
+        "SELECT bucket, role, count, total, hist FROM score_rollups "
+        "WHERE granularity = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+        (granularity, first_bucket, end),
+    ).fetchall()
+    event_rows = conn.execute(
+        "SELECT bucket, type, count FROM event_rollups "
+        "WHERE granularity = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+        (granularity, first_bucket, end),
+    ).fetchall()
+
+    # Columnar view of the window: one slot per bucket.
+    buckets = np.arange(first_bucket, end, width, dtype=np.int64)
+    slot = {int(b): i for i, b in enumerate(buckets)}
+    screenings = np.zeros(len(buckets), dtype=np.int64)
+    score_totals = np.zeros(len(buckets), dtype=np.float64)
+    jds_generated = np.zeros(len(buckets), dtype=np.int64)
+    policy_questions = np.zeros(len(buckets), dtype=np.int64)
+    role_hists = {}
+    role_totals = {}
+
+    for bucket, role, count, total, hist in score_rows:
+        i = slot[bucket]
+        screenings[i] += count
+        score_totals[i] += total
+        role_hists[role] = role_hists.get(role, 0) + np.frombuffer(hist, dtype=np.uint32).astype(np.int64)
+        role_totals[role] = role_totals.get(role, 0.0) + total
+    for bucket, log_type, count in event_rows:
+        if log_type == "jd_generated":
+            jds_generated[slot[bucket]] += count
+        elif log_type == "policy_question":
+            policy_questions[slot[bucket]] += count
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_scores = np.where(screenings > 0, score_totals / screenings, np.nan)
+
+    by_role = {}
+    for role, hist in role_hists.items():
+        count = int(hist.sum())
+        by_role[role] = {
+            "screenings": count,
+            "avg_fit_score": round(role_totals[role] / count, 2),
+            "p50_fit_score": _percentile(hist, 0.5),
+            "p90_fit_score": _percentile(hist, 0.9),
+        }
+    all_hist = sum(role_hists.values()) if role_hists else np.zeros(SCORE_BINS, dtype=np.int64)
+    total_screenings = int(screenings.sum())
+
+    return {
+        "from": start,
+        "to": end,
+        "granularity": granularity,
+        "series": [
+            {
+                "bucket_start": int(buckets[i]),
+                "screenings": int(screenings[i]),
+                "avg_fit_score": None if np.isnan(avg_scores[i]) else round(float(avg_scores[i]), 2),
+                "jds_generated": int(jds_generated[i]),
+                "policy_questions": int(policy_questions[i]),
+            }
+            for i in range(len(buckets))
+        ],
+        "totals": {
+            "screenings": total_screenings,
+            "avg_fit_score": round(float(score_totals.sum()) / total_screenings, 2) if total_screenings > 0 else 0,
+            "p50_fit_score": _percentile(all_hist, 0.5),
+            "p90_fit_score": _percentile(all_hist, 0.9),
+            "jds_generated": int(jds_generated.sum()),
+            "jd_generation_rate_per_day": round(float(jds_generated.sum()) * 86400 / max(end - start, 1), 3),
+            "policy_questions": int(policy_questions.sum()),
+        },
+        "by_role": by_role,
     }
@@ -0,0 +1,456 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+import numpy as np
+
+try:
+    import fcntl
+except ImportError: # Windows: a single worker is assumed to own the index
+    fcntl = None
+
+from ..helpers.executor import run_io, run_cpu
+from ..helpers.embeddings import EMBEDDING_MODEL, embed_texts
+from ..helpers.extraction import ExtractedDocument
+from ..helpers.retrieval import chunk_text
+from ..candidate_store.candidate_store import artifact_version, get_jd, get_candidates, get_candidate_texts, get_candidate_texts_after, remember_jd
+from ..resume_screener.resume_screener import score_candidate_fit
+
+logger = logging.getLogger(__name__)
+
+CANDIDATE_INDEX_DIR = os.environ.get("CANDIDATE_INDEX_DIR", "candidate_index")
+# How often each worker embeds newly stored resumes (or, if another worker owns the index, picks up its writes).
+CANDIDATE_INDEX_SYNC_SECONDS = float(os.environ.get("CANDIDATE_INDEX_SYNC_SECONDS", "30"))
+CANDIDATE_INDEX_BATCH = 256
+# Each resume is embedded as the mean of its first few chunks.
+CANDIDATE_EMBED_MAX_CHUNKS = 8
+# Below this many resumes a flat scan is fast enough; above it the IVF lists are trained.
+IVF_MIN_TRAIN_ROWS = int(os.environ.get("IVF_MIN_TRAIN_ROWS", "4096"))
+# Retrain the coarse centroids once the index has grown this many times since the last training.
+IVF_RETRAIN_GROWTH = 4.0
+IVF_TRAIN_SAMPLE = 50_000
+IVF_TRAIN_ITERATIONS = 10
+IVF_NPROBE = int(os.environ.get("IVF_NPROBE", "16"))
+MATCH_MAX_TOP_N = 100
+MATCH_MAX_RESCORE = 20
+_SCAN_BLOCK_ROWS = 16384
+
+
+def embed_documents(texts):
+    """
+    Embeds each text as the normalized mean of its chunk embeddings, so long
+    resumes are represented beyond the model's input limit. Runs in the CPU pool.
+    """
+    chunks = []
+    owners = []
+    for n, text in enumerate(texts):
+        pieces = chunk_text(text)[:CANDIDATE_EMBED_MAX_CHUNKS] or [""]
+        chunks.extend(pieces)
+        owners.extend([n] * len(pieces))
+    vectors = embed_texts(chunks)
+    means = np.zeros((len(texts), vectors.shape[1]), dtype=np.float32)
+    np.add.at(means, np.array(owners), vectors)
+    norms = np.linalg.norm(means, axis=1, keepdims=True)
+    return means / np.maximum(norms, 1e-12)
+
+
+def _train_centroids(sample, nlist, seed=0):
+    # Spherical k-means: vectors and centroids are unit length, similarity is a dot product
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(IVF_TRAIN_ITERATIONS):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        counts = np.bincount(assignment, minlength=nlist)
+        empty = counts == 0
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return centroids.astype(np.float32)
+
+
+class CandidateIndex:
+    """
+    Resume embeddings in an append-only float16 memory-mapped matrix, with an
+    IVF (inverted file) layer on top: rows are bucketed by their nearest coarse
+    centroid and a query only scans the buckets of its closest centroids.
+
+    meta.json is the commit point: rows past its "count" are ignored, so readers
+    in other workers never see a half-written insert. One worker at a time holds
+    the writer lock and appends; the others reload when meta.json changes.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._meta = None
+        self._meta_mtime = None
+        self._vectors = None
+        self._ids = None
+        self._assignments = None
+        self._centroids = None
+        self._lists = None
+        self._writer_file = None
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _empty_meta(self, dim):
+        return {"model": EMBEDDING_MODEL, "dim": dim, "count": 0, "capacity": 0, "last_candidate_id": 0, "generation": 0, "nlist": 0, "trained_count": 0}
+
+    def try_become_writer(self):
+        if self._writer_file is not None:
+            return True
+        os.makedirs(self.directory, exist_ok=True)
+        handle = open(self._path("writer.lock"), "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                return False
+        self._writer_file = handle
+        return True
+
+    def _write_meta(self, meta):
+        tmp_path = self._path("meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._path("meta.json"))
+
+    def _open(self, meta):
+        mode = "r+" if self._writer_file is not None else "r"
+        capacity, dim, generation = meta["capacity"], meta["dim"], meta["generation"]
+        self._vectors = np.memmap(self._path("vectors.f16"), dtype=np.float16, mode=mode, shape=(capacity, dim)) if capacity else None
+        self._ids = np.memmap(self._path("ids.i64"), dtype=np.int64, mode=mode, shape=(capacity,)) if capacity else None
+        if meta["nlist"]:
+            self._centroids = np.load(self._path(f"centroids-{generation}.npy"))
+            self._assignments = np.memmap(self._path(f"lists-{generation}.i32"), dtype=np.int32, mode=mode, shape=(capacity,))
+        else:
+            self._centroids = None
+            self._assignments = None
+        self._lists = None
+        self._meta = meta
+
+    def _reload(self):
+        try:
+            mtime = os.path.getmtime(self._path("meta.json"))
+        except OSError:
+            return
+        if mtime == self._meta_mtime:
+            return
+        with open(self._path("meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("model") != EMBEDDING_MODEL:
+            # Vectors from another embedding model are not comparable; start over
+            if self._writer_file is None:
+                return
+            logger.warning("Candidate index was built with %s; rebuilding for %s.", meta.get("model"), EMBEDDING_MODEL)
+            self._reset()
+            return
+        try:
+            self._open(meta)
+        except OSError:
+            # Caught mid-retrain with files from another generation; the next call retries
+            return
+        self._meta_mtime = mtime
+
+    def _reset(self):
+        for name in os.listdir(self.directory):
+            if name != "writer.lock" and name != "jds":
+                os.remove(self._path(name))
+        self._meta = None
+        self._meta_mtime = None
+        self._vectors = self._ids = self._assignments = self._centroids = self._lists = None
+
+    def last_candidate_id(self):
+        with self._lock:
+            self._reload()
+            return self._meta["last_candidate_id"] if self._meta else 0
+
+    def _grow(self, meta, needed):
+        capacity = max(needed, 2 * meta["capacity"], 1024)
+        for name, itemsize in (("vectors.f16", 2 * meta["dim"]), ("ids.i64", 8)) + (((f"lists-{meta['generation']}.i32", 4),) if meta["nlist"] else ()):
+            # Extending the file keeps rows already mapped by readers valid
+            with open(self._path(name), "ab") as f:
+                f.truncate(capacity * itemsize)
+        meta["capacity"] = capacity
+        self._open(meta)
+
+    def add(self, candidate_ids, vectors):
+        """
+        Appends embedded candidates, assigning each to its IVF bucket. Writer only; runs in the I/O pool.
+        """
+        with self._lock:
+            self._reload()
+            meta = dict(self._meta) if self._meta else self._empty_meta(vectors.shape[1])
+            start = meta["count"]
+            end = start + len(candidate_ids)
+            if end > meta["capacity"]:
+                self._grow(meta, end)
+            self._vectors[start:end] = vectors.astype(np.float16)
+            self._ids[start:end] = candidate_ids
+            if self._centroids is not None:
+                self._assignments[start:end] = np.argmax(vectors @ self._centroids.T, axis=1)
+            self._vectors.flush()
+            self._ids.flush()
+            if self._assignments is not None:
+                self._assignments.flush()
+            meta["count"] = end
+            meta["last_candidate_id"] = int(max(candidate_ids))
+            self._write_meta(meta)
+            self._open(meta)
+            self._meta_mtime = os.path.getmtime(self._path("meta.json"))
+            needs_training = end >= IVF_MIN_TRAIN_ROWS and end >= IVF_RETRAIN_GROWTH * meta["trained_count"]
+        if needs_training:
+            self._train()
+
+    def _remove_retired_generations(self, live):
+        # Files of generations before `live` are no longer mapped here, and other workers
+        # moved off them when they reloaded after the previous training
+        for name in os.listdir(self.directory):
+            stem, _, ext = name.rpartition(".")
+            prefix, _, generation = stem.partition("-")
+            if prefix in ("lists", "centroids") and ext in ("i32", "npy") and generation.isdigit() and int(generation) < live:
+                try:
+                    os.remove(self._path(name))
+                except OSError:
+                    pass # Still mapped somewhere (Windows); retried after the next training
+
+    def _train(self):
+        """
+        Retrains the coarse centroids and writes the next generation of lists
+        without holding the index lock, so searches keep using the current
+        generation meanwhile; the new one is swapped in at the end. Only the
+        writer's add() calls this, so no rows are appended while it runs.
+        """
+        with self._lock:
+            meta = dict(self._meta)
+            vectors = self._vectors
+        self._remove_retired_generations(meta["generation"])
+        count = meta["count"]
+        nlist = int(min(4096, max(16, np.sqrt(count))))
+        rng = np.random.default_rng(count)
+        sample_rows = np.sort(rng.choice(count, min(count, IVF_TRAIN_SAMPLE), replace=False))
+        started = time.perf_counter()
+        centroids = _train_centroids(vectors[sample_rows].astype(np.float32), nlist, seed=count)
+
+        generation = meta["generation"] + 1
+        assignments = np.memmap(self._path(f"lists-{generation}.i32"), dtype=np.int32, mode="w+", shape=(meta["capacity"],))
+        for block in range(0, count, _SCAN_BLOCK_ROWS):
+            rows = vectors[block:block + _SCAN_BLOCK_ROWS].astype(np.float32)
+            assignments[block:block + len(rows)] = np.argmax(rows @ centroids.T, axis=1)
+        assignments.flush()
+        del assignments
+        np.save(self._path(f"centroids-{generation}.npy"), centroids)
+
+        with self._lock:
+            meta.update(generation=generation, nlist=nlist, trained_count=count)
+            self._write_meta(meta)
+            self._open(meta)
+            self._meta_mtime = os.path.getmtime(self._path("meta.json"))
+        logger.info("Trained %d IVF lists over %d candidates in %.1fs", nlist, count, time.perf_counter() - started)
+
+    def _inverted_lists(self):
+        count = self._meta["count"]
+        if self._lists is None or self._lists[0] != count:
+            assignments = np.asarray(self._assignments[:count])
+            order = np.argsort(assignments, kind="stable")
+            offsets = np.searchsorted(assignments[order], np.arange(self._meta["nlist"] + 1))
+            self._lists = (count, order, offsets)
+        return self._lists[1], self._lists[2]
+
+    def search(self, query_vector, top_n, nprobe=IVF_NPROBE):
+        """
+        Returns (candidate_ids, similarities, rows_scanned) for the top_n
+        nearest resumes. Runs in the I/O pool; numpy releases the GIL.
+        """
+        with self._lock:
+            self._reload()
+            count = self._meta["count"] if self._meta else 0
+            if not count:
+                return [], [], 0
+            query_vector = np.asarray(query_vector, dtype=np.float32)
+            if self._centroids is None:
+                rows = np.arange(count)
+                scores = np.concatenate([
+                    self._vectors[block:min(block + _SCAN_BLOCK_ROWS, count)].astype(np.float32) @ query_vector
+                    for block in range(0, count, _SCAN_BLOCK_ROWS)
+                ])
+            else:
+                order, offsets = self._inverted_lists()
+                nprobe = min(nprobe, len(self._centroids))
+                probed = np.argpartition(-(self._centroids @ query_vector), nprobe - 1)[:nprobe]
+                rows = np.sort(np.concatenate([order[offsets[c]:offsets[c + 1]] for c in probed]))
+                scores = self._vectors[rows].astype(np.float32) @ query_vector
+            top_n = min(top_n, len(rows))
+            if not top_n:
+                return [], [], 0
+            top = np.argpartition(-scores, top_n - 1)[:top_n]
+            top = top[np.argsort(-scores[top])]
+            return [int(i) for i in self._ids[rows[top]]], [float(s) for s in scores[top]], int(len(rows))
+
+    def stats(self):
+        with self._lock:
+            self._reload()
+            meta = self._meta or {}
+            return {
+                "candidates": meta.get("count", 0),
+                "last_candidate_id": meta.get("last_candidate_id", 0),
+                "ivf_lists": meta.get("nlist", 0),
+                "trained_on": meta.get("trained_count", 0),
+                "writer": self._writer_file is not None,
+            }
+
+
+index = CandidateIndex(CANDIDATE_INDEX_DIR)
+_sync_lock = asyncio.Lock()
+_jd_vectors = {}
+
+
+async def sync_candidate_index():
+    """
+    Embeds resumes stored since the last sync and appends them to the index.
+    Returns how many were added (0 when another worker owns the index).
+    """
+    if not await run_io(index.try_become_writer):
+        return 0
+    added = 0
+    async with _sync_lock:
+        while True:
+            rows = await run_io(get_candidate_texts_after, await run_io(index.last_candidate_id), CANDIDATE_INDEX_BATCH)
+            if not rows:
+                break
+            vectors = await run_cpu(embed_documents, [text for _, text in rows])
+            await run_io(index.add, [candidate_id for candidate_id, _ in rows], vectors)
+            added += len(rows)
+    return added
+
+
+async def run_candidate_index_sync():
+    """
+    Keeps the index up to date with the candidate store. Started from the app lifespan.
+    """
+    while True:
+        try:
+            added = await sync_candidate_index()
+            if added:
+                logger.info("Indexed %d new candidates", added)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Candidate index sync failed: %s", e)
+        await asyncio.sleep(CANDIDATE_INDEX_SYNC_SECONDS)
+
+
+# JD vectors are tagged with the embedding model so switching models never mixes vector spaces.
+_JD_VECTOR_TAG = artifact_version(EMBEDDING_MODEL)[:8]
+
+
+def _jd_vector_path(digest):
+    return os.path.join(CANDIDATE_INDEX_DIR, "jds", f"{digest}.{_JD_VECTOR_TAG}.npy")
+
+
+def _load_jd_vector(digest):
+    path = _jd_vector_path(digest)
+    return np.load(path) if os.path.exists(path) else None
+
+
+def _save_jd_vector(digest, vector):
+    os.makedirs(os.path.dirname(_jd_vector_path(digest)), exist_ok=True)
+    tmp_path = f"{_jd_vector_path(digest)}.tmp.npy"
+    np.save(tmp_path, vector)
+    os.replace(tmp_path, _jd_vector_path(digest))
+
+
+async def get_jd_vector(jd):
+    """
+    Returns a JD's embedding, computing it once and keeping it on disk so
+    matching a registered JD never waits on the embedding model.
+    """
+    vector = _jd_vectors.get(jd["digest"])
+    if vector is None:
+        vector = await run_io(_load_jd_vector, jd["digest"])
+    if vector is None:
+        vector = (await run_cpu(embed_documents, [jd["text"]]))[0]
+        await run_io(_save_jd_vector, jd["digest"], vector)
+    _jd_vectors[jd["digest"]] = vector
+    return vector
+
+
+async def register_jd(jd_doc, title=None):
+    """
+    Stores a job description for matching and embeds it up front.
+    """
+    jd_id = await remember_jd(jd_doc, title)
+    await get_jd_vector({"digest": jd_doc.digest, "text": jd_doc.text})
+    return {"id": jd_id, "digest": jd_doc.digest, "title": title}
+
+
+async def _rescore(result, candidate, jd_doc):
+    try:
+        resume_doc = ExtractedDocument(candidate["digest"], candidate["text"], [0])
+        result["fit_analysis"] = await score_candidate_fit(resume_doc, jd_doc)
+    except Exception as e:
+        result["error"] = f"An unexpected error occurred during analysis: {e}"
+
+
+def _fit_score(result):
+    try:
+        return float(result.get("fit_analysis", {}).get("fit_score"))
+    except (TypeError, ValueError):
+        return -1.0
+
+
+async def match_jd(jd_id, top_n=10, rescore=False, nprobe=IVF_NPROBE):
+    """
+    Returns the stored candidates nearest to a registered JD, or None if the
+    JD does not exist. With `rescore`, only those candidates get a full LLM
+    fit analysis (reusing stored ones) and are re-ordered by fit score.
+    Raises ValueError on bad limits.
+    """
+    if not 1 <= top_n <= MATCH_MAX_TOP_N:
+        raise ValueError(f"top_n must be between 1 and {MATCH_MAX_TOP_N}.")
+    if rescore and top_n > MATCH_MAX_RESCORE:
+        raise ValueError(f"Re-scoring is limited to the top {MATCH_MAX_RESCORE} candidates.")
+    if nprobe < 1:
+        raise ValueError("nprobe must be at least 1.")
+    jd = await run_io(get_jd, jd_id)
+    if jd is None:
+        return None
+
+    vector = await get_jd_vector(jd)
+    started = time.perf_counter()
+    ids, similarities, scanned = await run_io(index.search, vector, top_n, nprobe)
+    took_ms = round((time.perf_counter() - started) * 1000, 2)
+    details = await run_io(get_candidates, ids)
+    results = [
+        {
+            "candidate_id": candidate_id,
+            "filename": details.get(candidate_id, {}).get("filename"),
+            "similarity": round(similarity, 4),
+        }
+        for candidate_id, similarity in zip(ids, similarities)
+    ]
+
+    if rescore and results:
+        jd_doc = ExtractedDocument(jd["digest"], jd["text"], [0])
+        candidates = await run_io(get_candidate_texts, ids)
+        await asyncio.gather(*(
+            _rescore(result, candidates[result["candidate_id"]], jd_doc)
+            for result in results if result["candidate_id"] in candidates
+        ))
+        results.sort(key=lambda r: (-_fit_score(r), -r["similarity"]))
+
+    return {
+        "jd": {"id": jd["id"], "title": jd["title"]},
+        "results": results,
+        "scanned": scanned,
+        "took_ms": took_ms,
+    }
+
+
+def get_candidate_index_stats():
+    return index.stats()
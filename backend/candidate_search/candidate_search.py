@@ -0,0 +1,378 @@
+import re
+import math
+import time
+import logging
+import threading
+import numpy as np
+
+from ..helpers.executor import run_io
+from ..resume_screener.skills import normalize_skill, SKILL_ALIASES
+from ..candidate_store.candidate_store import get_artifact_changes, get_candidate_artifacts, get_candidates
+
+logger = logging.getLogger(__name__)
+
+# Artifacts whose skills feed the index: the ATS parse and each JD's matching skills.
+INDEXED_KINDS = ("ats_parsing", "fit_analysis")
+SEARCH_MODES = ("boolean", "ranked")
+SEARCH_MAX_QUERY_TERMS = 50
+# Bounds on operators and parentheses, so the recursive parser and evaluator stay shallow.
+SEARCH_MAX_QUERY_TOKENS = 200
+SEARCH_MAX_DEPTH = 20
+SEARCH_MAX_LIMIT = 500
+# Longest run of plain words tried as one skill name ("ruby on rails", "google cloud platform").
+SEARCH_MAX_PHRASE_WORDS = 4
+# BM25 parameters; each candidate is a "document" whose terms are its skills.
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r'"([^"]*)"|(\()|(\))|([^\s()"]+)')
+_OPERATORS = {"and": "AND", "&&": "AND", "or": "OR", "||": "OR", "not": "NOT"}
+
+
+def skill_key(name):
+    """
+    The index key for a skill: its canonical name, lowercased.
+    """
+    return normalize_skill(name).lower()
+
+
+def _payload_skills(payload):
+    # Stored artifacts come from LLM output; anything that is not a list of names is skipped
+    if not isinstance(payload, dict):
+        if payload is not None:
+            logger.warning("Skipping a malformed skills artifact of type %s", type(payload).__name__)
+        return []
+    skills = []
+    for field in ("skills", "matching_skills"):
+        value = payload.get(field)
+        if value is None:
+            continue
+        if not isinstance(value, list):
+            logger.warning("Skipping malformed '%s' in a stored artifact (%s instead of a list)", field, type(value).__name__)
+            continue
+        skills.extend(s for s in value if isinstance(s, str) and 0 < len(s.strip()) <= 60)
+    return [normalize_skill(s) for s in skills]
+
+
+def _split_phrases(words, known):
+    # Greedily joins adjacent words into the longest known skill name; anything else is one word per skill
+    terms = []
+    start = 0
+    while start < len(words):
+        for end in range(min(len(words), start + SEARCH_MAX_PHRASE_WORDS), start, -1):
+            phrase = " ".join(words[start:end])
+            if end - start == 1 or skill_key(phrase) in known:
+                terms.append(phrase)
+                start = end
+                break
+    return terms
+
+
+def _tokenize(query, known):
+    tokens = []
+    words = []
+
+    def flush():
+        tokens.extend(("TERM", phrase) for phrase in _split_phrases(words, known))
+        words.clear()
+
+    for quoted, lparen, rparen, word in _TOKEN_RE.findall(query):
+        if word and word.lower() not in _OPERATORS:
+            words.append(word)
+            continue
+        flush()
+        if lparen:
+            tokens.append(("(", lparen))
+        elif rparen:
+            tokens.append((")", rparen))
+        elif word:
+            tokens.append((_OPERATORS[word.lower()], word))
+        elif quoted.strip():
+            tokens.append(("TERM", quoted))
+    flush()
+    return tokens
+
+
+def parse_query(query, known=frozenset()):
+    """
+    Parses a skills query into a tree of ("term", key), ("not", node),
+    ("and", left, right) and ("or", left, right). NOT binds tightest, then
+    AND, then OR; terms side by side are ANDed. Plain words are joined into
+    multi-word skills found in `known`; quote a name to force it.
+    Raises ValueError on bad syntax.
+    """
+    tokens = _tokenize(query, known)
+    if not tokens:
+        raise ValueError("The query is empty.")
+    if sum(1 for kind, _ in tokens if kind == "TERM") > SEARCH_MAX_QUERY_TERMS:
+        raise ValueError(f"A query may contain at most {SEARCH_MAX_QUERY_TERMS} skills.")
+    if len(tokens) > SEARCH_MAX_QUERY_TOKENS:
+        raise ValueError(f"A query may contain at most {SEARCH_MAX_QUERY_TOKENS} skills and operators.")
+    position = 0
+    depth = 0
+
+    def peek():
+        return tokens[position][0] if position < len(tokens) else None
+
+    def take(expected=None):
+        nonlocal position
+        if position >= len(tokens):
+            raise ValueError("The query ends unexpectedly.")
+        kind, value = tokens[position]
+        if expected and kind != expected:
+            raise ValueError(f"Expected '{expected}' but found '{value}'.")
+        position += 1
+        return kind, value
+
+    def parse_or():
+        node = parse_and()
+        while peek() == "OR":
+            take()
+            node = ("or", node, parse_and())
+        return node
+
+    def parse_and():
+        node = parse_not()
+        while peek() in ("AND", "NOT", "TERM", "("):
+            if peek() == "AND":
+                take()
+            node = ("and", node, parse_not())
+        return node
+
+    def nested(parse):
+        nonlocal depth
+        depth += 1
+        if depth > SEARCH_MAX_DEPTH:
+            raise ValueError(f"A query may nest NOT and parentheses at most {SEARCH_MAX_DEPTH} levels deep.")
+        try:
+            return parse()
+        finally:
+            depth -= 1
+
+    def parse_not():
+        if peek() == "NOT":
+            take()
+            return ("not", nested(parse_not))
+        if peek() == "(":
+            take()
+            node = nested(parse_or)
+            take(")")
+            return node
+        kind, value = take()
+        if kind != "TERM":
+            raise ValueError(f"Expected a skill but found '{value}'.")
+        return ("term", skill_key(value))
+
+    tree = parse_or()
+    if position < len(tokens):
+        raise ValueError(f"Unexpected '{tokens[position][1]}' in the query.")
+    return tree
+
+
+def _query_terms(node, negated=False, found=None):
+    # {key: negated} for every term, by whether it sits under an odd number of NOTs
+    found = {} if found is None else found
+    if node[0] == "term":
+        found.setdefault(node[1], negated)
+    elif node[0] == "not":
+        _query_terms(node[1], not negated, found)
+    else:
+        _query_terms(node[1], negated, found)
+        _query_terms(node[2], negated, found)
+    return found
+
+
+_GAZETTEER = frozenset(skill_key(name) for skill, aliases in SKILL_ALIASES.items() for name in (skill, *aliases))
+
+
+class SkillIndex:
+    """
+    An in-memory inverted index from canonical skill to the sorted ids of
+    candidates who have it. It catches up from the candidate store by
+    artifact id, so each worker picks up screenings saved by any worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._postings = {}
+        self._labels = {}
+        self._skills = {}
+        self._all = np.zeros(0, dtype=np.int64)
+        self._lengths = np.zeros(0, dtype=np.int32)
+        self._screened_at = np.zeros(0)
+        self._refreshed_at = None
+
+    def _ensure_capacity(self, max_id):
+        if max_id < len(self._lengths):
+            return
+        size = max(max_id + 1, 2 * len(self._lengths), 1024)
+        self._lengths = np.concatenate([self._lengths, np.zeros(size - len(self._lengths), dtype=np.int32)])
+        self._screened_at = np.concatenate([self._screened_at, np.full(size - len(self._screened_at), np.nan)])
+
+    def refresh(self):
+        """
+        Applies every indexed artifact written since the last refresh. Runs in the I/O pool.
+        """
+        with self._lock:
+            while True:
+                changes = get_artifact_changes(INDEXED_KINDS, self._last_id)
+                if not changes:
+                    break
+                try:
+                    self._apply(get_candidate_artifacts({candidate_id for _, candidate_id in changes}, INDEXED_KINDS))
+                except (TypeError, ValueError, AttributeError) as e:
+                    # A bad batch is skipped rather than retried forever on every search
+                    logger.warning("Skipping artifacts %d-%d in the skills index: %s", changes[0][0], changes[-1][0], e)
+                self._last_id = changes[-1][0]
+            self._refreshed_at = time.time()
+
+    def _apply(self, current):
+        added = {}
+        removed = {}
+        self._ensure_capacity(max(current))
+        for candidate_id, entry in current.items():
+            labels = [label for payload in entry["payloads"] for label in _payload_skills(payload)]
+            skills = frozenset(label.lower() for label in labels)
+            for label in labels:
+                self._labels.setdefault(label.lower(), label)
+            previous = self._skills.get(candidate_id, frozenset())
+            for key in skills - previous:
+                added.setdefault(key, []).append(candidate_id)
+            for key in previous - skills:
+                removed.setdefault(key, []).append(candidate_id)
+            self._skills[candidate_id] = skills
+            self._lengths[candidate_id] = len(skills)
+            self._screened_at[candidate_id] = entry["screened_at"] if entry["screened_at"] is not None else np.nan
+
+        for key in added.keys() | removed.keys():
+            posting = self._postings.get(key, np.zeros(0, dtype=np.int64))
+            if key in added:
+                posting = np.union1d(posting, np.array(added[key], dtype=np.int64))
+            if key in removed:
+                posting = np.setdiff1d(posting, np.array(removed[key], dtype=np.int64), assume_unique=True)
+            if len(posting):
+                self._postings[key] = posting
+            else:
+                self._postings.pop(key, None)
+        self._all = np.array(sorted(cid for cid, skills in self._skills.items() if skills), dtype=np.int64)
+
+    def _posting(self, key):
+        return self._postings.get(key, np.zeros(0, dtype=np.int64))
+
+    def _evaluate(self, node):
+        if node[0] == "term":
+            return self._posting(node[1])
+        if node[0] == "not":
+            return np.setdiff1d(self._all, self._evaluate(node[1]), assume_unique=True)
+        left = self._evaluate(node[1])
+        right = self._evaluate(node[2])
+        if node[0] == "and":
+            return np.intersect1d(left, right, assume_unique=True)
+        return np.union1d(left, right)
+
+    def _bm25(self, ids, keys):
+        count = len(self._all)
+        average = max(float(self._lengths[self._all].mean()), 1.0) if count else 1.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[ids] / average)
+        scores = np.zeros(len(ids))
+        for key in keys:
+            posting = self._posting(key)
+            if not len(posting):
+                continue
+            idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            has = np.isin(ids, posting, assume_unique=True)
+            scores += has * idf * (BM25_K1 + 1) / (1 + norm)
+        return scores
+
+    def search(self, tree, mode="boolean", since=None, limit=50):
+        """
+        Boolean mode returns the candidates matching the query, most recently
+        screened first. Ranked mode returns anyone with at least one wanted
+        skill (NOT terms still exclude), ordered by BM25 so rare skills weigh
+        more and long skill lists weigh less.
+        """
+        terms = _query_terms(tree)
+        wanted = [key for key, negated in terms.items() if not negated]
+        with self._lock:
+            if mode == "ranked":
+                ids = np.zeros(0, dtype=np.int64)
+                for key in wanted:
+                    ids = np.union1d(ids, self._posting(key))
+                for key in (k for k, negated in terms.items() if negated):
+                    ids = np.setdiff1d(ids, self._posting(key), assume_unique=True)
+            else:
+                ids = self._evaluate(tree)
+            if since is not None:
+                # NaN (never screened) compares False and drops out
+                ids = ids[self._screened_at[ids] >= since]
+
+            if mode == "ranked":
+                scores = self._bm25(ids, wanted)
+                order = np.lexsort((ids, -scores))[:limit]
+            else:
+                scores = None
+                order = np.argsort(-np.nan_to_num(self._screened_at[ids], nan=-np.inf), kind="stable")[:limit]
+
+            results = []
+            for position in order:
+                candidate_id = int(ids[position])
+                result = {
+                    "candidate_id": candidate_id,
+                    "matched_skills": [self._labels.get(key, key) for key in wanted if key in self._skills[candidate_id]],
+                    "screened_at": None if np.isnan(self._screened_at[candidate_id]) else float(self._screened_at[candidate_id]),
+                }
+                if scores is not None:
+                    result["score"] = round(float(scores[position]), 4)
+                results.append(result)
+            return {"total": int(len(ids)), "terms": {key: self._labels.get(key, key) for key in terms}, "results": results}
+
+    def known_skills(self):
+        with self._lock:
+            return _GAZETTEER | self._postings.keys()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "candidates": int(len(self._all)),
+                "skills": len(self._postings),
+                "last_artifact_id": self._last_id,
+                "refreshed_at": self._refreshed_at,
+            }
+
+
+index = SkillIndex()
+
+
+def refresh_skill_index():
+    index.refresh()
+
+
+def get_skill_index_stats():
+    return index.stats()
+
+
+def _search(query, mode, since, limit):
+    index.refresh()
+    tree = parse_query(query, index.known_skills())
+    started = time.perf_counter()
+    found = index.search(tree, mode, since, limit)
+    found["took_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    details = get_candidates([r["candidate_id"] for r in found["results"]])
+    for result in found["results"]:
+        candidate = details.get(result["candidate_id"], {})
+        result["filename"] = candidate.get("filename")
+        result["digest"] = candidate.get("digest")
+    return found
+
+
+async def search_candidates(query, mode="boolean", since=None, limit=50):
+    """
+    Searches screened candidates by skill, e.g. 'Kubernetes AND (Go OR Rust) AND NOT PHP'.
+    Raises ValueError on a bad query or mode.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"mode must be one of: {', '.join(SEARCH_MODES)}.")
+    if not 1 <= limit <= SEARCH_MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {SEARCH_MAX_LIMIT}.")
+    return await run_io(_search, query, mode, since, limit)
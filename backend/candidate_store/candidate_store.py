@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from ..helpers.executor import run_io
+from ..helpers.llm_cache import is_cache_bypassed
+
+CANDIDATE_DB = os.environ.get("CANDIDATE_DB", "candidates.db")
+
+_local = threading.local()
+
+
+def _init_schema(conn):
+    conn.executescript("""
+        -- One row per distinct resume (or pasted profile), keyed by the SHA-256 of its content.
+        CREATE TABLE IF NOT EXISTS candidates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            digest TEXT NOT NULL UNIQUE,
+            filename TEXT,
+            text TEXT,
+            created_at REAL NOT NULL,
+            screened_at REAL
+        );
+        CREATE TABLE IF NOT EXISTS jds (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            digest TEXT NOT NULL UNIQUE,
+            title TEXT,
+            text TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+
+        -- Derived results per candidate: ats_parsing, summary, and per-JD fit_analysis / job_fit.
+        -- Rewriting an artifact gives it a new id, so readers can follow changes with "id > last seen".
+        CREATE TABLE IF NOT EXISTS artifacts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            candidate_id INTEGER NOT NULL REFERENCES candidates (id),
+            kind TEXT NOT NULL,
+            jd_digest TEXT NOT NULL DEFAULT '',
+            version TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            UNIQUE (candidate_id, kind, jd_digest)
+        );
+        CREATE INDEX IF NOT EXISTS artifacts_kind ON artifacts (kind, id);
+    """)
+
+
+def _connect():
+    # One connection per thread, as in the analytics store.
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(CANDIDATE_DB, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _init_schema(conn)
+        _local.conn = conn
+    return conn
+
+
+def artifact_version(*parts):
+    """
+    Fingerprints whatever an artifact was produced from (a schema number, the
+    prompt template). Stored artifacts with another version are recomputed.
+    """
+    return hashlib.sha256("\x00".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:16]
+
+
+def text_digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def upsert_candidate(digest, text=None, filename=None):
+    """
+    Records a candidate by content hash and returns its id. Text and filename
+    are filled in when first known and never overwritten with nothing.
+    """
+    conn = _connect()
+    conn.execute(
+        """
+        INSERT INTO candidates (digest, filename, text, created_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT (digest) DO UPDATE SET
+            filename = COALESCE(excluded.filename, candidates.filename),
+            text = COALESCE(excluded.text, candidates.text)
+        """,
+        (digest, filename, text, time.time()),
+    )
+    return conn.execute("SELECT id FROM candidates WHERE digest = ?", (digest,)).fetchone()[0]
+
+
+def upsert_jd(digest, text, title=None):
+    conn = _connect()
+    conn.execute(
+        """
+        INSERT INTO jds (digest, title, text, created_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT (digest) DO UPDATE SET title = COALESCE(excluded.title, jds.title)
+        """,
+        (digest, title, text, time.time()),
+    )
+    return conn.execute("SELECT id FROM jds WHERE digest = ?", (digest,)).fetchone()[0]
+
+
+def get_jd(jd_id):
+    row = _connect().execute("SELECT id, digest, title, text, created_at FROM jds WHERE id = ?", (jd_id,)).fetchone()
+    if row is None:
+        return None
+    return {"id": row[0], "digest": row[1], "title": row[2], "text": row[3], "created_at": row[4]}
+
+
+def get_candidates(candidate_ids):
+    """
+    Returns {id: {"id", "digest", "filename", "screened_at"}} for the given ids.
+    """
+    if not candidate_ids:
+        return {}
+    conn = _connect()
+    found = {}
+    ids = list(candidate_ids)
+    # Stay under SQLite's bound-parameter limit
+    for start in range(0, len(ids), 900):
+        chunk = ids[start:start + 900]
+        rows = conn.execute(
+            f"SELECT id, digest, filename, screened_at FROM candidates WHERE id IN ({','.join('?' * len(chunk))})",
+            chunk,
+        ).fetchall()
+        for row in rows:
+            found[row[0]] = {"id": row[0], "digest": row[1], "filename": row[2], "screened_at": row[3]}
+    return found
+
+
+def get_candidate_texts(candidate_ids):
+    """
+    Returns {id: {"digest", "text"}} for the given ids that have stored text.
+    """
+    conn = _connect()
+    found = {}
+    ids = list(candidate_ids)
+    for start in range(0, len(ids), 900):
+        chunk = ids[start:start + 900]
+        rows = conn.execute(
+            f"SELECT id, digest, text FROM candidates WHERE id IN ({','.join('?' * len(chunk))}) AND text IS NOT NULL",
+            chunk,
+        ).fetchall()
+        for row in rows:
+            found[row[0]] = {"digest": row[1], "text": row[2]}
+    return found
+
+
+def get_candidate_texts_after(after_id, limit=256):
+    """
+    Returns [(id, text)] for candidates with stored text and an id above `after_id`, oldest first.
+    """
+    return _connect().execute(
+        "SELECT id, text FROM candidates WHERE id > ? AND text IS NOT NULL ORDER BY id LIMIT ?",
+        (after_id, limit),
+    ).fetchall()
+
+
+def get_artifact(digest, kind, version, jd_digest=""):
+    row = _connect().execute(
+        """
+        SELECT a.payload FROM artifacts a JOIN candidates c ON c.id = a.candidate_id
+        WHERE c.digest = ? AND a.kind = ? AND a.jd_digest = ? AND a.version = ?
+        """,
+        (digest, kind, jd_digest, version),
+    ).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def put_artifact(digest, kind, version, payload, jd_digest=""):
+    conn = _connect()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        candidate_id = upsert_candidate(digest)
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO artifacts (candidate_id, kind, jd_digest, version, payload, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (candidate_id, kind, jd_digest, version, json.dumps(payload), now),
+        )
+        if kind == "fit_analysis":
+            conn.execute("UPDATE candidates SET screened_at = ? WHERE id = ?", (now, candidate_id))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def get_artifact_changes(kinds, after_id, limit=5000):
+    """
+    Returns [(artifact_id, candidate_id)] for artifacts of the given kinds
+    written after `after_id`, oldest first, so readers can catch up in pages.
+    """
+    return _connect().execute(
+        f"SELECT id, candidate_id FROM artifacts WHERE kind IN ({','.join('?' * len(kinds))}) AND id > ? ORDER BY id LIMIT ?",
+        (*kinds, after_id, limit),
+    ).fetchall()
+
+
+def get_candidate_artifacts(candidate_ids, kinds):
+    """
+    Returns {candidate_id: {"screened_at": ..., "payloads": [...]}} with the
+    current payloads of the given kinds for each candidate.
+    """
+    conn = _connect()
+    found = {}
+    ids = list(candidate_ids)
+    for start in range(0, len(ids), 900):
+        chunk = ids[start:start + 900]
+        marks = ",".join("?" * len(chunk))
+        for candidate_id, screened_at in conn.execute(f"SELECT id, screened_at FROM candidates WHERE id IN ({marks})", chunk):
+            found[candidate_id] = {"screened_at": screened_at, "payloads": []}
+        rows = conn.execute(
+            f"SELECT candidate_id, payload FROM artifacts WHERE candidate_id IN ({marks}) AND kind IN ({','.join('?' * len(kinds))})",
+            (*chunk, *kinds),
+        )
+        for candidate_id, payload in rows:
+            found[candidate_id]["payloads"].append(json.loads(payload))
+    return found
+
+
+def get_candidate_store_stats():
+    conn = _connect()
+    kinds = dict(conn.execute("SELECT kind, COUNT(*) FROM artifacts GROUP BY kind").fetchall())
+    return {
+        "candidates": conn.execute("SELECT COUNT(*) FROM candidates").fetchone()[0],
+        "jds": conn.execute("SELECT COUNT(*) FROM jds").fetchone()[0],
+        "artifacts": kinds,
+    }
+
+
+async def load_artifact(doc_digest, kind, version, jd_digest=""):
+    """
+    Returns a stored artifact produced with the current version, or None.
+    Honours the per-request cache bypass so callers can force recomputation.
+    """
+    if is_cache_bypassed():
+        return None
+    return await run_io(get_artifact, doc_digest, kind, version, jd_digest)
+
+
+async def save_artifact(doc_digest, kind, version, payload, jd_digest=""):
+    await run_io(put_artifact, doc_digest, kind, version, payload, jd_digest)
+
+
+async def remember_candidate(doc, filename=None):
+    """
+    Persists a candidate's extracted text so later searches and matches can use it.
+    """
+    return await run_io(upsert_candidate, doc.digest, doc.text, filename)
+
+
+async def remember_jd(doc, title=None):
+    return await run_io(upsert_jd, doc.digest, doc.text, title)
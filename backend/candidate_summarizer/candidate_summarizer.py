@@ -1,23 +1,44 @@
-from ..helpers.llm_helper import get_groq_response
-import fitz # PyMuPDF
+from ..helpers.llm_helper import get_llm_response
+from ..helpers.model_router import get_route
+from ..helpers.llm_scheduler import LLMError
+from ..helpers.executor import ExecutorSaturatedError
+from ..helpers.text_cache import load_document
+from ..candidate_store.candidate_store import artifact_version, load_artifact, save_artifact, remember_candidate
 
-def summarize_candidate(resume_path):
+def build_summary_prompt(resume_text):
     """
-    Generates a concise summary of a candidate's resume.
+    Builds the candidate summary prompt.
     """
-    try:
-        with fitz.open(resume_path) as resume_doc:
-            resume_text = ""
-            for page in resume_doc:
-                resume_text += page.get_text()
+    return f"""
+    Based on the following resume, please provide a concise, one-paragraph summary highlighting the candidate's key qualifications, experience, and skills. This summary is for a busy hiring manager.
+
+    Resume:
+    {resume_text}
+    """
+
+SUMMARY_PROMPT_VERSION = artifact_version(build_summary_prompt(""))
 
-        prompt = f"""
-        Based on the following resume, please provide a concise, one-paragraph summary highlighting the candidate's key qualifications, experience, and skills. This summary is for a busy hiring manager.
+def summary_version():
+    # Routes can be switched at runtime, so the models are read on every call
+    return artifact_version(SUMMARY_PROMPT_VERSION, *get_route("candidate_summary").models)
+
+async def summarize_candidate(resume):
+    """
+    Generates a concise summary of a candidate's resume, reusing the stored
+    summary when this resume has been summarized before.
+    """
+    try:
+        doc = await load_document(resume)
+        version = summary_version()
+        stored = await load_artifact(doc.digest, "summary", version)
+        if stored is not None:
+            return stored
 
-        Resume:
-        {resume_text}
-        """
-        response = get_groq_response(prompt)
+        await remember_candidate(doc, getattr(resume, "filename", None))
+        response = await get_llm_response(build_summary_prompt(doc.text), task="candidate_summary")
+        await save_artifact(doc.digest, "summary", version, response)
         return response
+    except (ExecutorSaturatedError, LLMError):
+        raise
     except Exception as e:
         return f"An error occurred: {e}"
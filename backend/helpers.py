@@ -1,17 +0,0 @@
-import os
-import docx
-import io
-import pdfplumber
-
-def extract_text(file_bytes: bytes, filename: str) -> str:
-    ext = os.path.splitext(filename)[1].lower()
-    if ext == ".pdf":
-        with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-            return "\n".join([page.extract_text() for page in pdf.pages if page.extract_text()])
-    elif ext == ".docx":
-        doc = docx.Document(io.BytesIO(file_bytes))
-        return "\n".join([para.text for para in doc.paragraphs])
-    elif ext == ".txt":
-        return file_bytes.decode("utf-8")
-    else:
-        raise ValueError(f"Unsupported file format: {ext}")
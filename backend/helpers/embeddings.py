@@ -0,0 +1,42 @@
+import os
+import numpy as np
+
+from .executor import run_cpu
+
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", "32"))
+
+# Loaded lazily and kept per process; each CPU pool worker holds its own copy.
+_model = None
+
+
+def get_embedding_model():
+    global _model
+    if _model is None:
+        from sentence_transformers import SentenceTransformer
+        _model = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+    return _model
+
+
+def embed_texts(texts):
+    """
+    Embeds texts on CPU into an (n, dim) float32 matrix of unit-length rows,
+    so cosine similarity is a plain dot product.
+    """
+    if not texts:
+        return np.zeros((0, get_embedding_model().get_sentence_embedding_dimension()), dtype=np.float32)
+    vectors = get_embedding_model().encode(
+        list(texts),
+        batch_size=EMBEDDING_BATCH_SIZE,
+        normalize_embeddings=True,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+    )
+    return vectors.astype(np.float32, copy=False)
+
+
+async def embed_query(text):
+    """
+    Embeds a single query on the CPU pool and returns its unit-length vector.
+    """
+    return (await run_cpu(embed_texts, [text]))[0]
@@ -0,0 +1,122 @@
+import os
+import time
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+IO_POOL_WORKERS = int(os.environ.get("IO_POOL_WORKERS", "16"))
+IO_POOL_QUEUE = int(os.environ.get("IO_POOL_QUEUE", "256"))
+CPU_POOL_WORKERS = int(os.environ.get("CPU_POOL_WORKERS", str(os.cpu_count() or 2)))
+CPU_POOL_QUEUE = int(os.environ.get("CPU_POOL_QUEUE", "64"))
+RETRY_AFTER_SECONDS = int(os.environ.get("EXECUTOR_RETRY_AFTER_SECONDS", "5"))
+
+
+class ExecutorSaturatedError(Exception):
+    """
+    Raised when a pool's admission queue is full. Surfaced as a 503 by main.py.
+    """
+
+    def __init__(self, pool_name, retry_after):
+        super().__init__(f"The {pool_name} pool is saturated, please retry later.")
+        self.pool_name = pool_name
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """
+    Wraps a concurrent.futures executor with a bounded admission queue.
+
+    At most `max_workers` jobs run at once and at most `max_queue` more may wait
+    for a slot; anything beyond that is rejected immediately instead of piling up.
+    """
+
+    def __init__(self, name, executor_class, max_workers, max_queue, retry_after=RETRY_AFTER_SECONDS):
+        self.name = name
+        self.executor_class = executor_class
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._executor = None
+        self._slots = asyncio.Semaphore(max_workers)
+        self.queue_depth = 0
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = self.executor_class(max_workers=self.max_workers)
+        return self._executor
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Runs `func(*args, **kwargs)` in the pool, waiting for a free slot if needed.
+        """
+        if self._slots.locked() and self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            raise ExecutorSaturatedError(self.name, self.retry_after)
+
+        self.submitted += 1
+        self.queue_depth += 1
+        enqueued_at = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queue_depth -= 1
+
+        waited = time.perf_counter() - enqueued_at
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), functools.partial(func, *args, **kwargs))
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._slots.release()
+
+    def stats(self):
+        admitted = self.submitted - self.queue_depth
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "queue_depth": self.queue_depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(1000 * self.total_wait_seconds / admitted, 2) if admitted > 0 else 0,
+            "max_wait_ms": round(1000 * self.max_wait_seconds, 2),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Blocking file and network I/O goes to threads; CPU-bound parsing goes to processes.
+io_pool = BoundedExecutor("io", ThreadPoolExecutor, IO_POOL_WORKERS, IO_POOL_QUEUE)
+cpu_pool = BoundedExecutor("cpu", ProcessPoolExecutor, CPU_POOL_WORKERS, CPU_POOL_QUEUE)
+
+
+async def run_io(func, *args, **kwargs):
+    return await io_pool.run(func, *args, **kwargs)
+
+
+async def run_cpu(func, *args, **kwargs):
+    return await cpu_pool.run(func, *args, **kwargs)
+
+
+def get_executor_stats():
+    return {"io": io_pool.stats(), "cpu": cpu_pool.stats()}
+
+
+def shutdown_executors():
+    io_pool.shutdown()
+    cpu_pool.shutdown()
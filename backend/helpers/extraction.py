@@ -0,0 +1,142 @@
+import os
+import io
+import zipfile
+from contextlib import closing
+from dataclasses import dataclass, field
+from typing import List
+import fitz # PyMuPDF
+import docx
+
+# Hard limits so a hostile or huge upload cannot monopolise a worker.
+EXTRACT_MAX_PAGES = int(os.environ.get("EXTRACT_MAX_PAGES", "500"))
+EXTRACT_MAX_CHARS = int(os.environ.get("EXTRACT_MAX_CHARS", "2000000"))
+# DOCX and TXT have no real pages; their text is yielded in chunks of roughly this size.
+TEXT_PAGE_CHARS = 4000
+
+
+@dataclass
+class ExtractedDocument:
+    digest: str
+    text: str
+    page_offsets: List[int] = field(default_factory=list)
+    truncated: bool = False
+
+    def page(self, index):
+        start = self.page_offsets[index]
+        end = self.page_offsets[index + 1] if index + 1 < len(self.page_offsets) else len(self.text)
+        return self.text[start:end]
+
+    @property
+    def page_count(self):
+        return len(self.page_offsets)
+
+
+def _read_source(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return source
+    with open(source, "rb") as f:
+        return f.read()
+
+def detect_format(data, filename=None):
+    """
+    Sniffs the document format from its leading bytes, falling back to the extension.
+    Raises ValueError for zip archives that are not Word documents.
+    """
+    head = bytes(data[:8])
+    if head.startswith(b"%PDF"):
+        return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        # XLSX, PPTX and plain zips share the signature; only DOCX has a main document part
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                is_docx = "word/document.xml" in archive.namelist()
+        except zipfile.BadZipFile:
+            is_docx = False
+        if not is_docx:
+            raise ValueError("Unsupported document: the file is a zip archive but not a Word (.docx) document.")
+        return "docx"
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext in (".pdf", ".docx"):
+        return ext[1:]
+    return "txt"
+
+def _iter_pdf_pages(data):
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        for page in doc:
+            yield page.get_text()
+
+def _chunk_lines(lines):
+    chunk = []
+    size = 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line) + 1
+        if size >= TEXT_PAGE_CHARS:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+            size = 0
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+def _iter_docx_pages(data):
+    doc = docx.Document(io.BytesIO(data))
+    yield from _chunk_lines(para.text for para in doc.paragraphs)
+
+def _iter_txt_pages(data):
+    text = bytes(data).decode("utf-8", errors="replace")
+    for page in text.split("\f"):
+        yield from _chunk_lines(page.splitlines())
+
+_PAGE_ITERATORS = {
+    "pdf": _iter_pdf_pages,
+    "docx": _iter_docx_pages,
+    "txt": _iter_txt_pages,
+}
+
+def iter_pages(source, filename=None, max_pages=EXTRACT_MAX_PAGES):
+    """
+    Yields the text of each page of a PDF, DOCX or plain-text document.
+    `source` may be bytes, a memoryview or a file path.
+    """
+    data = _read_source(source)
+    if filename is None and not isinstance(source, (bytes, bytearray, memoryview)):
+        filename = os.fspath(source)
+    pages = _PAGE_ITERATORS[detect_format(data, filename)](data)
+    for index, page in enumerate(pages):
+        if index >= max_pages:
+            break
+        yield page
+
+def normalize_page(page):
+    return page.replace("\r\n", "\n").replace("\r", "\n").replace("\x00", "")
+
+def extract_document(source, filename=None, digest="", max_pages=EXTRACT_MAX_PAGES, max_chars=EXTRACT_MAX_CHARS):
+    """
+    Extracts and normalizes a document's text, stopping early at the page or
+    character limit. Runs inside the CPU process pool, so it must stay top-level.
+    """
+    pages = []
+    offsets = []
+    total = 0
+    truncated = False
+    with closing(iter_pages(source, filename, max_pages=max_pages + 1)) as page_iter:
+        for index, page in enumerate(page_iter):
+            if index >= max_pages:
+                truncated = True
+                break
+            page = normalize_page(page)
+            if total + len(page) > max_chars:
+                page = page[:max_chars - total]
+                truncated = True
+            offsets.append(total)
+            pages.append(page)
+            total += len(page)
+            if truncated:
+                break
+    return ExtractedDocument(digest, "".join(pages), offsets, truncated)
+
+def extract_text(source, filename=None):
+    """
+    Convenience wrapper returning only the extracted text.
+    """
+    return extract_document(source, filename).text
@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+
+from .executor import run_io
+
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_TTL_SECONDS = int(os.environ.get("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Set LLM_CACHE_DB to an empty string to keep the cache in memory only.
+LLM_CACHE_DB = os.environ.get("LLM_CACHE_DB", "llm_cache.sqlite3")
+# Comma-separated endpoint paths that must always reach the LLM, e.g. "/jdgenerate".
+LLM_CACHE_BYPASS_PATHS = {p.strip() for p in os.environ.get("LLM_CACHE_BYPASS_PATHS", "").split(",") if p.strip()}
+
+_bypass = ContextVar("llm_cache_bypass", default=False)
+
+
+def set_cache_bypass(bypass=True):
+    """
+    Makes every LLM call in the current request skip the cache.
+    """
+    _bypass.set(bypass)
+
+
+def is_cache_bypassed():
+    return _bypass.get()
+
+
+def make_cache_key(model, prompt, params):
+    """
+    Content-addresses a completion by model, prompt and sampling parameters.
+    """
+    payload = json.dumps({"model": model, "prompt": prompt, "params": params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Two-tier completion cache: a bounded in-memory LRU in front of a SQLite table.
+    Entries in both tiers expire after `ttl_seconds`.
+    """
+
+    def __init__(self, max_entries, ttl_seconds, db_path=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.bypassed = 0
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def get_memory(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._memory[key]
+                self.expirations += 1
+                return None
+            self._memory.move_to_end(key)
+            self.hits_memory += 1
+            return value
+
+    def put_memory(self, key, value, expires_at=None):
+        with self._lock:
+            self._memory[key] = (value, expires_at or time.time() + self.ttl_seconds)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self.evictions += 1
+
+    def get_disk(self, key):
+        """
+        Blocking SQLite lookup; promotes hits into the memory tier.
+        """
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at < time.time():
+            conn = self._connection()
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            conn.commit()
+            self.expirations += 1
+            return None
+        self.hits_disk += 1
+        self.put_memory(key, value, expires_at)
+        return value
+
+    def put_disk(self, key, value):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + self.ttl_seconds),
+        )
+        conn.commit()
+
+    def stats(self):
+        lookups = self.hits_memory + self.hits_disk + self.misses
+        return {
+            "entries_in_memory": len(self._memory),
+            "max_entries": self.max_entries,
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": round((self.hits_memory + self.hits_disk) / lookups, 4) if lookups > 0 else 0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "bypassed": self.bypassed,
+        }
+
+
+llm_cache = LLMCache(LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS, LLM_CACHE_DB or None)
+
+
+async def cache_get(key):
+    """
+    Looks a completion up in memory, then on disk. Returns None on a miss.
+    """
+    if is_cache_bypassed():
+        llm_cache.bypassed += 1
+        return None
+    value = llm_cache.get_memory(key)
+    if value is None and llm_cache.db_path:
+        value = await run_io(llm_cache.get_disk, key)
+    if value is None:
+        llm_cache.misses += 1
+    return value
+
+
+async def cache_put(key, value):
+    if value is None or is_cache_bypassed():
+        return
+    llm_cache.put_memory(key, value)
+    if llm_cache.db_path:
+        await run_io(llm_cache.put_disk, key, value)
+
+
+def get_llm_cache_stats():
+    return llm_cache.stats()
@@ -1,25 +1,193 @@
 import os
-from groq import Groq
+import time
+import logging
+import httpx
+from groq import AsyncGroq
 from dotenv import load_dotenv
 
+from .llm_cache import make_cache_key, cache_get, cache_put
+from .llm_scheduler import scheduler, LLMError
+from .prompt_budget import count_tokens
+from .executor import run_io
+from .model_router import router, get_route
+
 load_dotenv()
 
-def get_groq_response(prompt):
-    """
-    Gets a response from the Groq LLM.
-    """
-    try:
-        client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model="llama3-70b-8192",
-        )
-        return chat_completion.choices[0].message.content
-    except Exception as e:
-        print(f"An error occurred: {e}")
-        return None
\ No newline at end of file
+logger = logging.getLogger(__name__)
+
+LLM_TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", "60"))
+LLM_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+# Completion length assumed for rate limiting when a call sets no max_tokens.
+LLM_EXPECTED_OUTPUT_TOKENS = int(os.environ.get("LLM_EXPECTED_OUTPUT_TOKENS", "1024"))
+# Share of the route timeout a model gets when another model is still left to fall back on.
+LLM_FAILOVER_TIMEOUT_FRACTION = float(os.environ.get("LLM_FAILOVER_TIMEOUT_FRACTION", "0.5"))
+
+# One pooled client per process, created in the app lifespan (or lazily on first use).
+_client = None
+
+
+def _create_client():
+    http_client = httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+        timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=10.0),
+    )
+    return AsyncGroq(
+        api_key=os.environ.get("GROQ_API_KEY"),
+        http_client=http_client,
+        timeout=LLM_TIMEOUT_SECONDS,
+        # Retries are owned by the scheduler, which knows about the shared rate limit
+        max_retries=0,
+    )
+
+
+def get_llm_client():
+    """
+    Returns the shared async Groq client, creating it on first use.
+    """
+    global _client
+    if _client is None:
+        _client = _create_client()
+    return _client
+
+
+async def init_llm_client():
+    """
+    Opens the shared client. Called once from the FastAPI lifespan.
+    """
+    get_llm_client()
+
+
+async def close_llm_client():
+    """
+    Closes the shared client and its connection pool.
+    """
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def _sampling_params(temperature, max_tokens):
+    return {k: v for k, v in {"temperature": temperature, "max_tokens": max_tokens}.items() if v is not None}
+
+
+async def _estimate_tokens(prompt, max_tokens):
+    return await run_io(count_tokens, prompt) + (max_tokens or LLM_EXPECTED_OUTPUT_TOKENS)
+
+
+async def _cached_completion(models, prompt, params):
+    for model in models:
+        cached = await cache_get(make_cache_key(model, prompt, params))
+        if cached is not None:
+            return cached
+    return None
+
+
+async def _call_with_failover(route, prompt, params, timeout, stream=False):
+    """
+    Sends the prompt to the route's models in order until one succeeds.
+    Earlier models get no retries and a shortened timeout so a slow or failing
+    one is left quickly; the last gets the full timeout and the scheduler's
+    retry budget. Returns (model, result).
+    """
+    full_timeout = timeout or route.timeout or LLM_TIMEOUT_SECONDS
+    estimated_tokens = await _estimate_tokens(prompt, params.get("max_tokens"))
+    models = router.candidates(route)
+    last_error = None
+    for position, model in enumerate(models):
+        is_last = position == len(models) - 1
+        attempt_timeout = full_timeout if is_last else full_timeout * LLM_FAILOVER_TIMEOUT_FRACTION
+        client = get_llm_client().with_options(timeout=attempt_timeout)
+
+        async def send(model=model, client=client):
+            started = time.monotonic()
+            try:
+                result = await client.chat.completions.create(
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": prompt,
+                        }
+                    ],
+                    model=model,
+                    stream=stream,
+                    **params,
+                )
+            except Exception as e:
+                router.record(model, time.monotonic() - started, e)
+                raise
+            router.record(model, time.monotonic() - started)
+            return result
+
+        try:
+            result = await scheduler.call(send, estimated_tokens, model=model, max_retries=None if is_last else 0)
+        except LLMError as e:
+            last_error = e
+            if not is_last:
+                logger.warning("Model %s failed for task '%s'; falling back to %s", model, route.task, models[position + 1])
+            continue
+        if not stream:
+            usage = getattr(result, "usage", None)
+            scheduler.settle(estimated_tokens, getattr(usage, "total_tokens", None))
+        return model, result
+    raise last_error
+
+
+def _route_params(task, temperature, max_tokens):
+    route = get_route(task)
+    params = _sampling_params(
+        route.temperature if temperature is None else temperature,
+        route.max_tokens if max_tokens is None else max_tokens,
+    )
+    return route, params
+
+
+async def get_llm_response(prompt, task="default", timeout=None, temperature=None, max_tokens=None, stream=False):
+    """
+    Gets a response from the Groq LLM without blocking the event loop.
+    The model, fallbacks and sampling settings come from the task's route;
+    explicit arguments override the route. Identical requests are answered
+    from the LLM response cache; the rest are queued by the rate-limit
+    scheduler. Raises LLMError if every model fails.
+    With stream=True, returns an async iterator of text deltas instead.
+    """
+    if stream:
+        return stream_llm_response(prompt, task, timeout, temperature, max_tokens)
+
+    route, params = _route_params(task, temperature, max_tokens)
+    cached = await _cached_completion(route.models, prompt, params)
+    if cached is not None:
+        return cached
+
+    model, chat_completion = await _call_with_failover(route, prompt, params, timeout)
+    response = chat_completion.choices[0].message.content or ""
+
+    await cache_put(make_cache_key(model, prompt, params), response)
+    return response
+
+
+async def stream_llm_response(prompt, task="default", timeout=None, temperature=None, max_tokens=None):
+    """
+    Yields the completion as it is generated. A cached completion is yielded
+    in one piece; a freshly streamed one is cached once it finishes.
+    """
+    route, params = _route_params(task, temperature, max_tokens)
+    cached = await _cached_completion(route.models, prompt, params)
+    if cached is not None:
+        yield cached
+        return
+
+    # Rate limits and outages surface before the first token, so only opening the stream fails over
+    model, stream = await _call_with_failover(route, prompt, params, timeout, stream=True)
+    parts = []
+    async for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            parts.append(delta)
+            yield delta
+    await cache_put(make_cache_key(model, prompt, params), "".join(parts))
@@ -0,0 +1,276 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import itertools
+from collections import deque
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+
+import groq
+
+logger = logging.getLogger(__name__)
+
+# Match these to the Groq plan's limits for the model in use.
+LLM_REQUESTS_PER_MINUTE = int(os.environ.get("LLM_REQUESTS_PER_MINUTE", "30"))
+LLM_TOKENS_PER_MINUTE = int(os.environ.get("LLM_TOKENS_PER_MINUTE", "15000"))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE_SECONDS = float(os.environ.get("LLM_RETRY_BASE_SECONDS", "1"))
+LLM_RETRY_MAX_SECONDS = float(os.environ.get("LLM_RETRY_MAX_SECONDS", "30"))
+# Endpoints whose LLM calls jump ahead of everything else, e.g. the chat-style Q&A.
+LLM_INTERACTIVE_PATHS = {
+    p.strip() for p in os.environ.get("LLM_INTERACTIVE_PATHS", "/policyqa,/onboardingqa").split(",") if p.strip()
+}
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_BATCH = 2
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_DEFAULT: "default", PRIORITY_BATCH: "batch"}
+
+_priority = ContextVar("llm_priority", default=PRIORITY_DEFAULT)
+
+
+def set_llm_priority(priority):
+    """
+    Sets the scheduling class for every LLM call in the current request or task.
+    """
+    _priority.set(priority)
+
+
+def get_llm_priority():
+    return _priority.get()
+
+
+class LLMError(Exception):
+    """
+    Raised when the LLM could not produce a completion, after retries where
+    the failure was transient.
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Refills continuously at `per_minute` units a minute up to one minute's worth.
+    Requests larger than the bucket are charged the full bucket, so they wait
+    for it to fill instead of waiting forever.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def credit(self, amount):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class _WaitStats:
+    def __init__(self):
+        self.requests = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent = deque(maxlen=1000)
+
+    def record(self, wait):
+        self.requests += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.recent.append(wait)
+
+    def summary(self, queued):
+        recent = sorted(self.recent)
+        return {
+            "requests": self.requests,
+            "queued": queued,
+            "mean_wait_seconds": round(self.total_wait / self.requests, 4) if self.requests else 0,
+            "p95_wait_seconds": round(recent[int(0.95 * (len(recent) - 1))], 4) if recent else 0,
+            "max_wait_seconds": round(self.max_wait, 4),
+        }
+
+
+def _retry_after_seconds(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_retryable(error):
+    if isinstance(error, (groq.RateLimitError, groq.APIConnectionError)):
+        return True
+    return isinstance(error, groq.APIStatusError) and error.status_code >= 500
+
+
+class LLMScheduler:
+    """
+    Admits LLM calls under request-per-minute and token-per-minute buckets,
+    strictly in priority order (FIFO within a class), and retries transient
+    failures with exponential backoff and full jitter. A 429 pauses every
+    caller of that model until its Retry-After has passed, rather than
+    letting each one rediscover the limit.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute, max_retries, retry_base, retry_max):
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        # (priority, arrival order, tokens, future, model); the smallest eligible tuple goes next
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._wakeup = None
+        self._dispatcher = None
+        # Groq rate-limits each model separately
+        self._paused_until = {}
+        self._wait_stats = {priority: _WaitStats() for priority in PRIORITY_NAMES}
+        self.retries = 0
+        self.rate_limited = 0
+        self.failures = 0
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    async def _dispatch(self):
+        while True:
+            # Drop callers cancelled while queued
+            self._waiters = [waiter for waiter in self._waiters if not waiter[3].done()]
+            if not self._waiters:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            now = time.monotonic()
+            # Callers of a rate-limited model step aside for those of other models
+            eligible = [waiter for waiter in self._waiters if self._paused_until.get(waiter[4], 0.0) <= now]
+            if eligible:
+                head = min(eligible)
+                delay = max(self._requests.wait_time(1, now), self._tokens.wait_time(head[2], now))
+            else:
+                head = None
+                delay = min(self._paused_until[waiter[4]] for waiter in self._waiters) - now
+            if delay > 0:
+                # Sleep until the buckets refill, or until a more urgent caller arrives
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._waiters.remove(head)
+            self._requests.take(1, now)
+            self._tokens.take(head[2], now)
+            head[3].set_result(None)
+
+    async def acquire(self, tokens, priority=None, model=None):
+        """
+        Waits until a call estimated at `tokens` may be sent.
+        """
+        priority = get_llm_priority() if priority is None else priority
+        self._ensure_dispatcher()
+        future = asyncio.get_running_loop().create_future()
+        started = time.monotonic()
+        self._waiters.append((priority, next(self._sequence), tokens, future, model))
+        self._wakeup.set()
+        await future
+        self._wait_stats.get(priority, self._wait_stats[PRIORITY_DEFAULT]).record(time.monotonic() - started)
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """
+        Refunds the difference once the provider reports the real usage.
+        """
+        if actual_tokens is not None and actual_tokens < estimated_tokens:
+            self._tokens.credit(estimated_tokens - actual_tokens)
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.retry_max, self.retry_base * 2 ** attempt))
+
+    async def call(self, send, tokens, priority=None, model=None, max_retries=None):
+        """
+        Runs `send()` once admitted, retrying rate limits, timeouts and 5xx
+        responses up to `max_retries` times. Raises LLMError when the call
+        cannot succeed.
+        """
+        max_retries = self.max_retries if max_retries is None else max_retries
+        for attempt in range(max_retries + 1):
+            await self.acquire(tokens, priority, model)
+            try:
+                return await send()
+            except Exception as e:
+                retry_after = _retry_after_seconds(e)
+                if isinstance(e, groq.RateLimitError):
+                    self.rate_limited += 1
+                    now = time.monotonic()
+                    resume_at = now + (retry_after or self._backoff(attempt))
+                    self._paused_until[model] = max(self._paused_until.get(model, 0.0), resume_at)
+                if not _is_retryable(e) or attempt == max_retries:
+                    self.failures += 1
+                    logger.error("LLM call failed after %d attempt(s): %s", attempt + 1, e)
+                    raise LLMError(f"The language model is unavailable: {e}", retry_after if _is_retryable(e) else None) from e
+                self.retries += 1
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+                logger.warning("LLM call failed (%s); retrying in %.1fs", e, delay)
+                await asyncio.sleep(delay)
+
+    def stats(self):
+        queued = {priority: 0 for priority in PRIORITY_NAMES}
+        for priority, _, _, future, _ in self._waiters:
+            if not future.done():
+                queued[priority] = queued.get(priority, 0) + 1
+        now = time.monotonic()
+        return {
+            "priorities": {
+                name: self._wait_stats[priority].summary(queued[priority]) for priority, name in PRIORITY_NAMES.items()
+            },
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "failures": self.failures,
+            "paused_models": {
+                model: round(until - now, 2) for model, until in self._paused_until.items() if until > now
+            },
+            "request_bucket": round(self._requests.level, 1),
+            "token_bucket": round(self._tokens.level, 1),
+        }
+
+
+scheduler = LLMScheduler(
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_SECONDS,
+    LLM_RETRY_MAX_SECONDS,
+)
+
+
+def get_llm_scheduler_stats():
+    return scheduler.stats()
@@ -0,0 +1,212 @@
+import os
+import json
+import math
+import time
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Optional JSON file of {task: {"models": [...], "max_tokens": ..., "temperature": ..., "timeout": ...}}
+# merged over the defaults below. It is re-read whenever it changes, so routes can be switched without a restart.
+MODEL_ROUTES_FILE = os.environ.get("MODEL_ROUTES_FILE", "")
+MODEL_ROUTES_CHECK_SECONDS = 5.0
+# Consecutive failures that take a model out of rotation, and for how long.
+MODEL_FAILURE_THRESHOLD = int(os.environ.get("MODEL_FAILURE_THRESHOLD", "3"))
+MODEL_COOLDOWN_SECONDS = float(os.environ.get("MODEL_COOLDOWN_SECONDS", "60"))
+
+LARGE_MODEL = "llama3-70b-8192"
+LARGE_FALLBACK_MODEL = "llama-3.3-70b-versatile"
+SMALL_MODEL = "llama-3.1-8b-instant"
+
+DEFAULT_ROUTES = {
+    "default": {"models": [LARGE_MODEL, LARGE_FALLBACK_MODEL]},
+    "resume_screening": {"models": [LARGE_MODEL, LARGE_FALLBACK_MODEL], "max_tokens": 2048, "temperature": 0.2, "timeout": 60},
+    "resume_parsing": {"models": [SMALL_MODEL, LARGE_MODEL], "max_tokens": 1536, "temperature": 0.0, "timeout": 30},
+    "job_fit": {"models": [LARGE_MODEL, LARGE_FALLBACK_MODEL], "max_tokens": 1024, "temperature": 0.2, "timeout": 45},
+    "candidate_summary": {"models": [SMALL_MODEL, LARGE_MODEL], "max_tokens": 512, "temperature": 0.3, "timeout": 20},
+    "inclusivity_check": {"models": [SMALL_MODEL, LARGE_MODEL], "max_tokens": 1024, "temperature": 0.2, "timeout": 30},
+    "interview_questions": {"models": [LARGE_MODEL, LARGE_FALLBACK_MODEL], "max_tokens": 1536, "temperature": 0.7, "timeout": 60},
+    "jd_generation": {"models": [LARGE_MODEL, LARGE_FALLBACK_MODEL], "max_tokens": 1536, "temperature": 0.7, "timeout": 60},
+    "offer_letter": {"models": [LARGE_MODEL, LARGE_FALLBACK_MODEL], "max_tokens": 1536, "temperature": 0.5, "timeout": 60},
+    "performance_review": {"models": [LARGE_MODEL, LARGE_FALLBACK_MODEL], "max_tokens": 1536, "temperature": 0.6, "timeout": 60},
+    "policy_qa": {"models": [LARGE_MODEL, LARGE_FALLBACK_MODEL], "max_tokens": 1024, "temperature": 0.1, "timeout": 30},
+    "onboarding_qa": {"models": [LARGE_MODEL, LARGE_FALLBACK_MODEL], "max_tokens": 1024, "temperature": 0.4, "timeout": 30},
+}
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    task: str
+    models: Tuple[str, ...]
+    max_tokens: Optional[int] = None
+    temperature: Optional[float] = None
+    # Per-attempt timeout; a model slower than this is treated as failed and the next one is tried
+    timeout: Optional[float] = None
+
+    @property
+    def primary(self):
+        return self.models[0]
+
+
+def _parse_routes(config):
+    if not isinstance(config, dict):
+        raise ValueError("The routing table must map task names to route settings.")
+    routes = {}
+    for task, spec in config.items():
+        if not isinstance(spec, dict):
+            raise ValueError(f"Route '{task}' must be an object.")
+        models = spec.get("models")
+        if not isinstance(models, (list, tuple)) or not models or not all(isinstance(m, str) and m.strip() for m in models):
+            raise ValueError(f"Route '{task}' needs a non-empty list of model names.")
+        max_tokens = spec.get("max_tokens")
+        if max_tokens is not None and (not _is_number(max_tokens) or not isinstance(max_tokens, int) or max_tokens <= 0):
+            raise ValueError(f"Route '{task}': max_tokens must be a positive integer.")
+        temperature = spec.get("temperature")
+        if temperature is not None and (not _is_number(temperature) or not 0 <= temperature <= 2):
+            raise ValueError(f"Route '{task}': temperature must be a number between 0 and 2.")
+        timeout = spec.get("timeout")
+        if timeout is not None and (not _is_number(timeout) or timeout <= 0):
+            raise ValueError(f"Route '{task}': timeout must be a positive number of seconds.")
+        routes[task] = ModelRoute(
+            task=task,
+            models=tuple(models),
+            max_tokens=max_tokens,
+            temperature=temperature,
+            timeout=timeout,
+        )
+    return routes
+
+
+def _is_number(value):
+    # JSON booleans arrive as bool, which is an int subclass
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+class _ModelHealth:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.latencies = deque(maxlen=200)
+        self.last_error = None
+
+    def summary(self, now):
+        latencies = sorted(self.latencies)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.calls, 4) if self.calls else 0,
+            "p50_latency_seconds": round(latencies[len(latencies) // 2], 3) if latencies else None,
+            "p95_latency_seconds": round(latencies[int(0.95 * (len(latencies) - 1))], 3) if latencies else None,
+            "available": self.open_until <= now,
+            "last_error": self.last_error,
+        }
+
+
+class ModelRouter:
+    """
+    Maps each task to an ordered list of models plus sampling settings, and
+    tracks per-model latency and errors. A model that fails repeatedly is
+    skipped for a cooldown period (a simple circuit breaker).
+    """
+
+    def __init__(self, defaults, routes_file=""):
+        self._defaults = _parse_routes(defaults)
+        self._routes_file = routes_file
+        self._file_routes = {}
+        self._file_mtime = None
+        self._checked_at = 0.0
+        self._overrides = {}
+        self._health = {}
+        self._lock = threading.Lock()
+
+    def _reload_file(self):
+        now = time.monotonic()
+        if not self._routes_file or now - self._checked_at < MODEL_ROUTES_CHECK_SECONDS:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self._routes_file)
+        except OSError:
+            return
+        if mtime == self._file_mtime:
+            return
+        try:
+            with open(self._routes_file, "r", encoding="utf-8") as f:
+                self._file_routes = _parse_routes(json.load(f))
+            logger.info("Loaded model routes from %s", self._routes_file)
+        except (OSError, ValueError) as e:
+            # Keep serving the previous table rather than breaking every request
+            logger.error("Ignoring invalid model routes file %s: %s", self._routes_file, e)
+        self._file_mtime = mtime
+
+    def routes(self):
+        with self._lock:
+            self._reload_file()
+            return {**self._defaults, **self._file_routes, **self._overrides}
+
+    def get_route(self, task):
+        routes = self.routes()
+        return routes.get(task) or routes["default"]
+
+    def set_routes(self, config):
+        """
+        Replaces the runtime overrides; raises ValueError on a malformed table.
+        """
+        routes = _parse_routes(config)
+        with self._lock:
+            self._overrides = routes
+
+    def candidates(self, route):
+        """
+        The route's models in order, skipping those whose circuit is open
+        (unless that would leave nothing to try).
+        """
+        now = time.monotonic()
+        with self._lock:
+            healthy = [m for m in route.models if self._health.get(m, _ModelHealth()).open_until <= now]
+        return healthy or list(route.models)
+
+    def record(self, model, latency, error=None):
+        with self._lock:
+            health = self._health.setdefault(model, _ModelHealth())
+            health.calls += 1
+            if error is None:
+                health.latencies.append(latency)
+                health.consecutive_failures = 0
+                return
+            health.errors += 1
+            health.consecutive_failures += 1
+            health.last_error = str(error)[:200]
+            if health.consecutive_failures >= MODEL_FAILURE_THRESHOLD:
+                health.open_until = time.monotonic() + MODEL_COOLDOWN_SECONDS
+                logger.warning("Model %s failed %d times in a row; skipping it for %.0fs", model, health.consecutive_failures, MODEL_COOLDOWN_SECONDS)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {model: health.summary(now) for model, health in self._health.items()}
+
+
+router = ModelRouter(DEFAULT_ROUTES, MODEL_ROUTES_FILE)
+
+
+def get_route(task):
+    return router.get_route(task)
+
+
+def get_model_routes():
+    return {task: asdict(route) for task, route in router.routes().items()}
+
+
+def set_model_routes(config):
+    router.set_routes(config)
+
+
+def get_model_stats():
+    return router.stats()
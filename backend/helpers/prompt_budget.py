@@ -0,0 +1,295 @@
+import os
+import re
+import math
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Llama 3 models share one tokenizer; the meta-llama repos are gated, so set
+# HF_TOKEN or point PROMPT_TOKENIZER at a local copy. Without it we estimate.
+PROMPT_TOKENIZER = os.environ.get("PROMPT_TOKENIZER", "meta-llama/Meta-Llama-3-8B-Instruct")
+LLM_CONTEXT_WINDOW = int(os.environ.get("LLM_CONTEXT_WINDOW", "8192"))
+# Conservative characters-per-token used when the real tokenizer is unavailable.
+FALLBACK_CHARS_PER_TOKEN = 3.5
+
+# Section headings by how much they matter to the model, per kind of document.
+SECTION_PRIORITIES = {
+    "resume": {
+        "summary": 0, "profile": 0, "objective": 1,
+        "experience": 0, "employment": 0, "work history": 0,
+        "skills": 0, "technical skills": 0,
+        "projects": 1, "education": 1, "certifications": 1,
+        "publications": 2, "awards": 2, "languages": 2, "volunteer": 3,
+        "interests": 4, "hobbies": 4, "references": 4,
+    },
+    "jd": {
+        "responsibilities": 0, "requirements": 0, "qualifications": 0, "skills": 0,
+        "what you'll do": 0, "what you will do": 0, "about the role": 1, "job summary": 1,
+        "nice to have": 1, "preferred": 1,
+        "about us": 3, "company": 3, "benefits": 3, "perks": 3,
+        "equal opportunity": 4, "eeo": 4, "how to apply": 4,
+    },
+}
+DEFAULT_PRIORITY = 2
+
+_tokenizer = None
+_tokenizer_failed = False
+# fit_prompt runs on I/O pool threads; only the first of them loads the tokenizer.
+_tokenizer_lock = threading.Lock()
+_budget_stats = {}
+_budget_stats_lock = threading.Lock()
+
+
+def _get_tokenizer():
+    global _tokenizer, _tokenizer_failed
+    if _tokenizer is None and not _tokenizer_failed:
+        with _tokenizer_lock:
+            if _tokenizer is None and not _tokenizer_failed:
+                try:
+                    from transformers import AutoTokenizer
+                    _tokenizer = AutoTokenizer.from_pretrained(PROMPT_TOKENIZER)
+                except Exception as e:
+                    _tokenizer_failed = True
+                    logger.warning("Could not load tokenizer '%s' (%s); estimating token counts.", PROMPT_TOKENIZER, e)
+    return _tokenizer
+
+
+def count_tokens(text):
+    """
+    Counts tokens with the target model's tokenizer, or estimates them.
+    """
+    if not text:
+        return 0
+    tokenizer = _get_tokenizer()
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+    return math.ceil(len(text) / FALLBACK_CHARS_PER_TOKEN)
+
+
+@dataclass
+class PromptSlot:
+    text: str
+    kind: str = "generic"
+    weight: float = 1.0
+    page_offsets: Optional[List[int]] = None
+
+
+@dataclass
+class SlotReport:
+    budget_tokens: int
+    original_tokens: int
+    final_tokens: int = 0
+    steps: List[str] = field(default_factory=list)
+    dropped_sections: List[str] = field(default_factory=list)
+    removed_lines: List[str] = field(default_factory=list)
+
+
+def collapse_whitespace(text):
+    text = re.sub(r"[ \t ]+", " ", text)
+    text = re.sub(r" *\n *", "\n", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def _edge_key(line):
+    # Digits are masked so "Page 3 of 9" matches across pages
+    return re.sub(r"\d+", "#", line.strip())
+
+
+def remove_repeated_headers(text, page_offsets, edge_lines=2):
+    """
+    Drops short lines that open or close at least half of the pages (running
+    headers, footers, page numbers). Returns (text, removed lines).
+    """
+    if not page_offsets or len(page_offsets) < 3:
+        return text, []
+    bounds = list(page_offsets) + [len(text)]
+    pages = [text[bounds[i]:bounds[i + 1]].splitlines() for i in range(len(page_offsets))]
+
+    def edges(lines):
+        filled = [i for i, line in enumerate(lines) if line.strip()]
+        return filled[:edge_lines] + filled[-edge_lines:]
+
+    counts = Counter()
+    for lines in pages:
+        counts.update({_edge_key(lines[i]) for i in edges(lines)})
+    repeated = {
+        key for key, count in counts.items()
+        if count >= len(pages) / 2 and len(key) <= 80 and not _is_heading(key)
+    }
+    if not repeated:
+        return text, []
+    kept_pages = []
+    for lines in pages:
+        drop = {i for i in edges(lines) if _edge_key(lines[i]) in repeated}
+        kept_pages.append("\n".join(line for i, line in enumerate(lines) if i not in drop))
+    return "\n".join(kept_pages), sorted(repeated)
+
+
+def _is_heading(line):
+    stripped = line.strip().rstrip(":")
+    if not stripped or len(stripped) > 40 or len(stripped.split()) > 5:
+        return False
+    return stripped.isupper() or line.strip().endswith(":") or stripped.lower() in _ALL_HEADINGS
+
+
+_ALL_HEADINGS = {heading for priorities in SECTION_PRIORITIES.values() for heading in priorities}
+
+
+def split_sections(text):
+    """
+    Splits text at heading-like lines into (heading, body) pairs; the text
+    before the first heading gets the heading "".
+    """
+    sections = []
+    heading, lines = "", []
+    for line in text.splitlines():
+        if _is_heading(line):
+            if lines or heading:
+                sections.append((heading, "\n".join(lines)))
+            heading, lines = line.strip().rstrip(":"), []
+        else:
+            lines.append(line)
+    sections.append((heading, "\n".join(lines)))
+    return sections
+
+
+def _section_priority(kind, heading):
+    if not heading:
+        return 0 # The preamble carries names, contact details and job titles
+    priorities = SECTION_PRIORITIES.get(kind, {})
+    lowered = heading.lower()
+    for key, priority in priorities.items():
+        if key in lowered:
+            return priority
+    return DEFAULT_PRIORITY
+
+
+def _truncate_to_tokens(text, max_tokens):
+    if count_tokens(text) <= max_tokens:
+        return text
+    # Binary search on characters, since token counts are not additive across cuts.
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low]
+
+
+def fit_text(text, max_tokens, kind="generic", page_offsets=None):
+    """
+    Shrinks text to at most max_tokens: collapses whitespace, removes running
+    headers/footers, then keeps the highest-value sections first (in their
+    original order) and truncates whatever still does not fit.
+    """
+    report = SlotReport(budget_tokens=max_tokens, original_tokens=count_tokens(text))
+    if report.original_tokens <= max_tokens:
+        report.final_tokens = report.original_tokens
+        return text, report
+
+    text, report.removed_lines = remove_repeated_headers(text, page_offsets)
+    if report.removed_lines:
+        report.steps.append("removed_repeated_headers")
+    text = collapse_whitespace(text)
+    report.steps.append("collapsed_whitespace")
+
+    if count_tokens(text) > max_tokens:
+        sections = split_sections(text)
+        ranked = sorted(range(len(sections)), key=lambda i: _section_priority(kind, sections[i][0]))
+        kept = {}
+        remaining = max_tokens
+        for i in ranked:
+            heading, body = sections[i]
+            section_text = f"{heading}\n{body}".strip() if heading else body.strip()
+            cost = count_tokens(section_text) + 1
+            if cost <= remaining:
+                kept[i] = section_text
+                remaining -= cost
+            elif remaining > 50:
+                kept[i] = _truncate_to_tokens(section_text, remaining - 1)
+                remaining = 0
+                report.steps.append(f"truncated_section:{heading or 'preamble'}")
+            else:
+                report.dropped_sections.append(heading or "preamble")
+        text = "\n".join(kept[i] for i in sorted(kept))
+        if report.dropped_sections:
+            report.steps.append("dropped_low_priority_sections")
+        text = _truncate_to_tokens(text, max_tokens)
+
+    report.final_tokens = count_tokens(text)
+    return text, report
+
+
+def fit_prompt(build_prompt, slots, reserve_output_tokens, context_window=LLM_CONTEXT_WINDOW):
+    """
+    Builds a prompt whose variable slots fit the model's context window.
+
+    `build_prompt` is called with one keyword argument per slot. The tokens
+    left after the fixed instructions and `reserve_output_tokens` are split
+    between slots by weight; any share a short slot does not need is handed
+    to the others. Returns (prompt, {slot name: SlotReport}).
+    """
+    fixed_tokens = count_tokens(build_prompt(**{name: "" for name in slots}))
+    available = max(context_window - reserve_output_tokens - fixed_tokens, 0)
+
+    sizes = {name: count_tokens(slot.text) for name, slot in slots.items()}
+    budgets = {}
+    pending = dict(slots)
+    while pending:
+        total_weight = sum(slot.weight for slot in pending.values())
+        shares = {name: int(available * slot.weight / total_weight) for name, slot in pending.items()}
+        fitting = [name for name in pending if sizes[name] <= shares[name]]
+        if not fitting:
+            budgets.update(shares)
+            break
+        for name in fitting:
+            budgets[name] = sizes[name]
+            available -= sizes[name]
+            del pending[name]
+
+    texts = {}
+    reports = {}
+    for name, slot in slots.items():
+        texts[name], reports[name] = fit_text(slot.text, budgets[name], slot.kind, slot.page_offsets)
+        if reports[name].final_tokens < reports[name].original_tokens:
+            logger.info(
+                "Prompt slot '%s' shrunk from %d to %d tokens (steps: %s; dropped sections: %s; removed lines: %s)",
+                name, reports[name].original_tokens, reports[name].final_tokens,
+                ", ".join(reports[name].steps), ", ".join(reports[name].dropped_sections) or "none",
+                len(reports[name].removed_lines),
+            )
+    return build_prompt(**texts), reports
+
+
+def record_prompt_budget(task, reports):
+    """
+    Adds one prompt's slot reports to the per-task counters shown in /stats.
+    Returns {slot name: summary} for the slots that had to be shrunk, or {}.
+    """
+    shrunk = {
+        name: {
+            "original_tokens": report.original_tokens,
+            "final_tokens": report.final_tokens,
+            # Repeated headings are listed once, and a long tail is cut off
+            "dropped_sections": list(dict.fromkeys(report.dropped_sections))[:20],
+        }
+        for name, report in reports.items() if report.final_tokens < report.original_tokens
+    }
+    with _budget_stats_lock:
+        stats = _budget_stats.setdefault(task, {"prompts": 0, "shrunk_prompts": 0, "tokens_removed": 0, "dropped_sections": 0})
+        stats["prompts"] += 1
+        stats["shrunk_prompts"] += bool(shrunk)
+        stats["tokens_removed"] += sum(slot["original_tokens"] - slot["final_tokens"] for slot in shrunk.values())
+        stats["dropped_sections"] += sum(len(reports[name].dropped_sections) for name in shrunk)
+    return shrunk
+
+
+def get_prompt_budget_stats():
+    with _budget_stats_lock:
+        return {task: dict(stats) for task, stats in _budget_stats.items()}
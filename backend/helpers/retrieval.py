@@ -0,0 +1,132 @@
+import os
+import json
+import asyncio
+from collections import OrderedDict
+import numpy as np
+
+from .executor import run_cpu, run_io
+from .embeddings import embed_texts, embed_query
+
+RETRIEVAL_INDEX_DIR = os.environ.get("RETRIEVAL_INDEX_DIR", "retrieval_index")
+RETRIEVAL_CHUNK_CHARS = int(os.environ.get("RETRIEVAL_CHUNK_CHARS", "1200"))
+RETRIEVAL_CHUNK_OVERLAP = int(os.environ.get("RETRIEVAL_CHUNK_OVERLAP", "200"))
+RETRIEVAL_TOP_K = int(os.environ.get("RETRIEVAL_TOP_K", "4"))
+# Documents shorter than this are sent whole; retrieval only pays off on long handbooks.
+RETRIEVAL_MIN_CHARS = int(os.environ.get("RETRIEVAL_MIN_CHARS", "6000"))
+RETRIEVAL_MAX_OPEN_INDEXES = 64
+
+
+def chunk_text(text, chunk_chars=RETRIEVAL_CHUNK_CHARS, overlap=RETRIEVAL_CHUNK_OVERLAP):
+    """
+    Splits text into overlapping chunks, preferring to break at paragraph or
+    sentence boundaries in the second half of each window.
+    """
+    chunks = []
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + chunk_chars, length)
+        if end < length:
+            window = text[start:end]
+            cut = max(window.rfind("\n\n"), window.rfind(". "), window.rfind("\n"))
+            if cut > chunk_chars // 2:
+                end = start + cut + 1
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= length:
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+def _index_paths(digest):
+    base = os.path.join(RETRIEVAL_INDEX_DIR, digest)
+    return f"{base}.npy", f"{base}.chunks.json"
+
+
+def build_index(digest, text):
+    """
+    Chunks and embeds a document and writes the index to disk. Runs in the CPU pool.
+    """
+    os.makedirs(RETRIEVAL_INDEX_DIR, exist_ok=True)
+    vectors_path, chunks_path = _index_paths(digest)
+    chunks = chunk_text(text)
+    vectors = embed_texts(chunks)
+    # Write to temp names and rename so concurrent readers never see a partial index.
+    np.save(f"{vectors_path}.tmp.npy", vectors)
+    with open(f"{chunks_path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(chunks, f)
+    os.replace(f"{chunks_path}.tmp", chunks_path)
+    os.replace(f"{vectors_path}.tmp.npy", vectors_path)
+
+
+class DocumentIndex:
+    """
+    Chunk texts plus a memory-mapped matrix of their unit-length embeddings.
+    """
+
+    def __init__(self, chunks, vectors):
+        self.chunks = chunks
+        self.vectors = vectors
+
+    @classmethod
+    def load(cls, digest):
+        vectors_path, chunks_path = _index_paths(digest)
+        if not (os.path.exists(vectors_path) and os.path.exists(chunks_path)):
+            return None
+        with open(chunks_path, "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+        return cls(chunks, np.load(vectors_path, mmap_mode="r"))
+
+    def search(self, query_vector, k=RETRIEVAL_TOP_K):
+        """
+        Returns the k most similar chunks, in document order.
+        """
+        if not self.chunks:
+            return []
+        scores = np.asarray(self.vectors @ query_vector)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return [self.chunks[i] for i in sorted(top)]
+
+
+_open_indexes = OrderedDict()
+_build_locks = {}
+
+
+async def get_document_index(doc):
+    """
+    Returns the retrieval index for an extracted document, building it once per content hash.
+    """
+    index = _open_indexes.get(doc.digest)
+    if index is not None:
+        _open_indexes.move_to_end(doc.digest)
+        return index
+
+    lock = _build_locks.setdefault(doc.digest, asyncio.Lock())
+    async with lock:
+        index = _open_indexes.get(doc.digest)
+        if index is None:
+            index = await run_io(DocumentIndex.load, doc.digest)
+        if index is None:
+            await run_cpu(build_index, doc.digest, doc.text)
+            index = await run_io(DocumentIndex.load, doc.digest)
+        _open_indexes[doc.digest] = index
+        while len(_open_indexes) > RETRIEVAL_MAX_OPEN_INDEXES:
+            _open_indexes.popitem(last=False)
+    _build_locks.pop(doc.digest, None)
+    return index
+
+
+async def retrieve_context(doc, question, k=RETRIEVAL_TOP_K, query_vector=None):
+    """
+    Returns the parts of a document relevant to a question: the whole text for
+    short documents, otherwise the top-k chunks joined with separators.
+    """
+    if len(doc.text) <= RETRIEVAL_MIN_CHARS:
+        return doc.text
+    index = await get_document_index(doc)
+    if query_vector is None:
+        query_vector = await embed_query(question)
+    return "\n...\n".join(index.search(query_vector, k))
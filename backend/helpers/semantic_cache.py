@@ -0,0 +1,136 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from .llm_cache import is_cache_bypassed
+
+# Cosine similarity a new question needs with a previous one to reuse its answer.
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_TTL_SECONDS = int(os.environ.get("SEMANTIC_CACHE_TTL_SECONDS", str(24 * 3600)))
+SEMANTIC_CACHE_MAX_DOCUMENTS = int(os.environ.get("SEMANTIC_CACHE_MAX_DOCUMENTS", "256"))
+SEMANTIC_CACHE_MAX_ENTRIES_PER_DOCUMENT = int(os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES_PER_DOCUMENT", "512"))
+
+
+class _DocumentAnswers:
+    """
+    Previous questions about one document: a matrix of their embeddings plus
+    the answers and insertion times, kept in insertion order.
+    """
+
+    def __init__(self):
+        self.vectors = None
+        self.questions = []
+        self.answers = []
+        self.created_at = []
+
+    def drop_expired(self, cutoff):
+        keep = [i for i, t in enumerate(self.created_at) if t >= cutoff]
+        if len(keep) < len(self.created_at):
+            self._keep(keep)
+
+    def _keep(self, keep):
+        self.vectors = self.vectors[keep] if keep else None
+        self.questions = [self.questions[i] for i in keep]
+        self.answers = [self.answers[i] for i in keep]
+        self.created_at = [self.created_at[i] for i in keep]
+
+    def add(self, question, vector, answer, max_entries):
+        vector = np.asarray(vector, dtype=np.float32)[None, :]
+        self.vectors = vector if self.vectors is None else np.vstack([self.vectors, vector])
+        self.questions.append(question)
+        self.answers.append(answer)
+        self.created_at.append(time.time())
+        if len(self.questions) > max_entries:
+            self._keep(list(range(len(self.questions) - max_entries, len(self.questions))))
+
+
+class SemanticCache:
+    """
+    Answer cache scoped by (namespace, document content hash). A question hits
+    when its embedding is close enough to one asked before about the same
+    document. Documents are evicted LRU and entries expire after a TTL; an
+    edited document has a new hash, so its old answers simply age out.
+    """
+
+    def __init__(self, threshold, ttl_seconds, max_documents, max_entries_per_document):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_documents = max_documents
+        self.max_entries_per_document = max_entries_per_document
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, namespace, digest, vector):
+        """
+        Returns (answer, similarity) for the closest previous question, or (None, best similarity).
+        """
+        with self._lock:
+            entry = self._documents.get((namespace, digest))
+            if entry is None:
+                self.misses += 1
+                return None, 0.0
+            self._documents.move_to_end((namespace, digest))
+            entry.drop_expired(time.time() - self.ttl_seconds)
+            if entry.vectors is None:
+                self.misses += 1
+                return None, 0.0
+            scores = entry.vectors @ np.asarray(vector, dtype=np.float32)
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+            if similarity >= self.threshold:
+                self.hits += 1
+                return entry.answers[best], similarity
+            self.misses += 1
+            return None, similarity
+
+    def store(self, namespace, digest, question, vector, answer):
+        with self._lock:
+            entry = self._documents.get((namespace, digest))
+            if entry is None:
+                entry = self._documents[(namespace, digest)] = _DocumentAnswers()
+            self._documents.move_to_end((namespace, digest))
+            entry.add(question, vector, answer, self.max_entries_per_document)
+            while len(self._documents) > self.max_documents:
+                self._documents.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "documents": len(self._documents),
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups > 0 else 0,
+            "evictions": self.evictions,
+        }
+
+
+answer_cache = SemanticCache(
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_TTL_SECONDS,
+    SEMANTIC_CACHE_MAX_DOCUMENTS,
+    SEMANTIC_CACHE_MAX_ENTRIES_PER_DOCUMENT,
+)
+
+
+def lookup_answer(namespace, doc, vector):
+    if is_cache_bypassed():
+        return None
+    answer, _ = answer_cache.lookup(namespace, doc.digest, vector)
+    return answer
+
+
+def store_answer(namespace, doc, question, vector, answer):
+    if answer is None or is_cache_bypassed():
+        return
+    answer_cache.store(namespace, doc.digest, question, vector, answer)
+
+
+def get_semantic_cache_stats():
+    return answer_cache.stats()
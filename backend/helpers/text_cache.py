@@ -0,0 +1,129 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from .executor import run_io, run_cpu
+from .extraction import ExtractedDocument, extract_document
+from .upload_store import StoredUpload
+
+# Upper bound on the characters held in memory across all cached documents.
+TEXT_CACHE_MAX_CHARS = int(os.environ.get("TEXT_CACHE_MAX_CHARS", str(50_000_000)))
+# Set TEXT_CACHE_DIR to persist extracted text across restarts.
+TEXT_CACHE_DIR = os.environ.get("TEXT_CACHE_DIR", "")
+
+
+class TextCache:
+    """
+    LRU cache of extracted document text keyed by the SHA-256 of the file bytes,
+    bounded by total characters, with an optional JSON-per-document disk tier.
+    """
+
+    def __init__(self, max_chars, cache_dir=None):
+        self.max_chars = max_chars
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, digest):
+        with self._lock:
+            doc = self._entries.get(digest)
+            if doc is not None:
+                self._entries.move_to_end(digest)
+                self.hits += 1
+            return doc
+
+    def put(self, doc):
+        with self._lock:
+            if doc.digest in self._entries:
+                return
+            self._entries[doc.digest] = doc
+            self._chars += len(doc.text)
+            while self._chars > self.max_chars and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._chars -= len(evicted.text)
+                self.evictions += 1
+
+    def _disk_path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def load_from_disk(self, digest):
+        path = self._disk_path(digest)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        doc = ExtractedDocument(digest, data["text"], data["page_offsets"], data.get("truncated", False))
+        self.put(doc)
+        return doc
+
+    def save_to_disk(self, doc):
+        path = self._disk_path(doc.digest)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"text": doc.text, "page_offsets": doc.page_offsets, "truncated": doc.truncated}, f)
+        os.replace(tmp_path, path)
+
+    def stats(self):
+        return {
+            "documents": len(self._entries),
+            "chars": self._chars,
+            "max_chars": self.max_chars,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+text_cache = TextCache(TEXT_CACHE_MAX_CHARS, TEXT_CACHE_DIR or None)
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def load_document(source, filename=None):
+    """
+    Returns the extracted text of a document given as an upload handle, a path
+    or bytes, parsing it at most once per distinct file content across all
+    feature modules.
+    """
+    file_bytes = None
+    if isinstance(source, StoredUpload):
+        # The upload store already hashed the content while writing it.
+        digest = source.digest
+        filename = filename or source.filename
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        file_bytes = bytes(source)
+        digest = hashlib.sha256(file_bytes).hexdigest()
+    else:
+        filename = filename or os.fspath(source)
+        file_bytes = await run_io(_read_file, source)
+        digest = hashlib.sha256(file_bytes).hexdigest()
+
+    doc = text_cache.get(digest)
+    if doc is None and text_cache.cache_dir:
+        doc = await run_io(text_cache.load_from_disk, digest)
+    if doc is not None:
+        return doc
+
+    text_cache.misses += 1
+    if file_bytes is None:
+        file_bytes = await run_io(source.read_bytes)
+    doc = await run_cpu(extract_document, file_bytes, filename, digest)
+    text_cache.put(doc)
+    if text_cache.cache_dir:
+        await run_io(text_cache.save_to_disk, doc)
+    return doc
+
+
+def get_text_cache_stats():
+    return text_cache.stats()
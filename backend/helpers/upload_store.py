@@ -0,0 +1,190 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import tempfile
+import zipfile
+from dataclasses import dataclass
+
+from .executor import run_io
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "temp_uploads")
+UPLOAD_MAX_FILE_BYTES = int(os.environ.get("UPLOAD_MAX_FILE_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_MAX_TOTAL_BYTES = int(os.environ.get("UPLOAD_MAX_TOTAL_BYTES", str(1024 * 1024 * 1024)))
+UPLOAD_MAX_AGE_SECONDS = int(os.environ.get("UPLOAD_MAX_AGE_SECONDS", str(24 * 3600)))
+UPLOAD_GC_INTERVAL_SECONDS = int(os.environ.get("UPLOAD_GC_INTERVAL_SECONDS", "600"))
+# Files touched more recently than this are never evicted for size, so in-flight requests keep their inputs.
+UPLOAD_GC_GRACE_SECONDS = 300
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """
+    Raised when an upload exceeds UPLOAD_MAX_FILE_BYTES. Surfaced as a 413 by main.py.
+    """
+
+    def __init__(self, filename, limit):
+        super().__init__(f"'{filename}' exceeds the {limit // (1024 * 1024)} MB upload limit.")
+        self.filename = filename
+        self.limit = limit
+
+
+@dataclass
+class StoredUpload:
+    """
+    Handle to a content-addressed upload. Feature modules receive this instead of a path.
+    """
+    digest: str
+    filename: str
+    path: str
+    size: int
+
+    def read_bytes(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+class UploadStore:
+    """
+    Stores uploads under their SHA-256 so identical files are written once and
+    same-named files from different clients never collide.
+    """
+
+    def __init__(self, root, max_file_bytes, max_total_bytes, max_age_seconds):
+        self.root = root
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self.max_age_seconds = max_age_seconds
+        self.stored = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.evicted = 0
+        os.makedirs(root, exist_ok=True)
+
+    def _store(self, fileobj, filename):
+        # Hash while streaming to a temp file, then move it into place under its digest.
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".incoming-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = fileobj.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_file_bytes:
+                        self.rejected += 1
+                        raise UploadTooLargeError(filename, self.max_file_bytes)
+                    hasher.update(chunk)
+                    out.write(chunk)
+
+            digest = hasher.hexdigest()
+            ext = os.path.splitext(filename or "")[1].lower()
+            path = os.path.join(self.root, digest + ext)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+                os.utime(path)
+                self.deduplicated += 1
+            else:
+                os.replace(tmp_path, path)
+                self.stored += 1
+            return StoredUpload(digest, filename, path, size)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    async def save(self, upload):
+        """
+        Streams a FastAPI UploadFile into the store and returns its handle.
+        """
+        if upload.size is not None and upload.size > self.max_file_bytes:
+            self.rejected += 1
+            raise UploadTooLargeError(upload.filename, self.max_file_bytes)
+        return await run_io(self._store, upload.file, upload.filename)
+
+    def _store_zip(self, fileobj, max_files):
+        handles = []
+        with zipfile.ZipFile(fileobj) as archive:
+            members = [
+                m for m in archive.infolist()
+                if not m.is_dir() and not m.filename.startswith("__MACOSX/") and not os.path.basename(m.filename).startswith(".")
+            ]
+            if len(members) > max_files:
+                raise ValueError(f"The archive contains {len(members)} files; the limit is {max_files}.")
+            for member in members:
+                # _store enforces the per-file limit while decompressing, so zip bombs stop early
+                with archive.open(member) as f:
+                    handles.append(self._store(f, os.path.basename(member.filename)))
+        return handles
+
+    async def save_zip(self, upload, max_files):
+        """
+        Stores every file inside an uploaded zip archive and returns their handles.
+        """
+        return await run_io(self._store_zip, upload.file, max_files)
+
+    def collect_garbage(self):
+        """
+        Deletes uploads older than max_age, then the least recently used ones
+        until the store fits in max_total_bytes.
+        """
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.root):
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            if now - stat.st_mtime > self.max_age_seconds:
+                os.remove(entry.path)
+                self.evicted += 1
+            else:
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_total_bytes or now - mtime < UPLOAD_GC_GRACE_SECONDS:
+                break
+            os.remove(path)
+            total -= size
+            self.evicted += 1
+        return total
+
+    def stats(self):
+        return {
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+            "evicted": self.evicted,
+        }
+
+
+upload_store = UploadStore(UPLOAD_DIR, UPLOAD_MAX_FILE_BYTES, UPLOAD_MAX_TOTAL_BYTES, UPLOAD_MAX_AGE_SECONDS)
+
+
+async def save_upload(upload):
+    return await upload_store.save(upload)
+
+
+async def save_zip_upload(upload, max_files):
+    return await upload_store.save_zip(upload, max_files)
+
+
+async def run_upload_gc(interval=UPLOAD_GC_INTERVAL_SECONDS):
+    """
+    Background task started from the app lifespan.
+    """
+    while True:
+        try:
+            await run_io(upload_store.collect_garbage)
+        except Exception as e:
+            logger.error("Upload GC failed: %s", e)
+        await asyncio.sleep(interval)
+
+
+def get_upload_store_stats():
+    return upload_store.stats()
@@ -1,30 +1,43 @@
-from ..helpers.llm_helper import get_groq_response
-import fitz # PyMuPDF
+from ..helpers.llm_helper import get_llm_response, stream_llm_response
+from ..helpers.llm_scheduler import LLMError
+from ..helpers.executor import ExecutorSaturatedError
+from ..helpers.text_cache import load_document
 
-def generate_interview_questions(jd_path):
+def build_interview_prompt(jd_text):
     """
-    Generates interview questions based on a job description.
+    Builds the interview question prompt for an extracted job description.
     """
-    try:
-        with fitz.open(jd_path) as jd_doc:
-            jd_text = ""
-            for page in jd_doc:
-                jd_text += page.get_text()
+    prompt = f"""
+    Based on the following job description, generate a list of 10-15 insightful interview questions.
+    The questions should cover technical skills, behavioral aspects, and cultural fit.
 
-        prompt = f"""
-        Based on the following job description, generate a list of 10-15 insightful interview questions.
-        The questions should cover technical skills, behavioral aspects, and cultural fit.
+    Job Description:
+    {jd_text}
 
-        Job Description:
-        {jd_text}
+    Categorize the questions into:
+    - Technical Questions
+    - Behavioral Questions
+    - Situational Questions
+    """
+    return prompt
 
-        Categorize the questions into:
-        - Technical Questions
-        - Behavioral Questions
-        - Situational Questions
-        """
-        response = get_groq_response(prompt)
+async def generate_interview_questions(jd):
+    """
+    Generates interview questions based on a job description.
+    """
+    try:
+        jd_text = (await load_document(jd)).text
+        response = await get_llm_response(build_interview_prompt(jd_text), task="interview_questions")
         return response
+    except (ExecutorSaturatedError, LLMError):
+        raise
     except Exception as e:
         return f"An error occurred: {e}"
 
+async def stream_interview_questions(jd):
+    """
+    Streams interview questions for a job description token by token.
+    """
+    jd_text = (await load_document(jd)).text
+    async for token in stream_llm_response(build_interview_prompt(jd_text), task="interview_questions"):
+        yield token
@@ -0,0 +1,251 @@
+import re
+from collections import deque
+
+# category -> [(phrase, suggestion, reason, conclusive)]. Phrases are matched case-insensitively on
+# whole words, with hyphens and other punctuation treated as spaces ("self-starter" == "self starter").
+# Entries marked inconclusive depend on context (a warehouse role may really need lifting) and are
+# left to the LLM review to judge.
+INCLUSIVITY_LEXICON = {
+    "gendered": [
+        ("rockstar", "skilled professional", "Coded as masculine and informal; can discourage women from applying.", True),
+        ("rock star", "skilled professional", "Coded as masculine and informal; can discourage women from applying.", True),
+        ("ninja", "expert", "Coded as masculine; describe the actual skill level instead.", True),
+        ("guru", "expert", "Informal jargon that reads as masculine-coded.", True),
+        ("superhero", "expert", "Coded as masculine; describe the actual skill level instead.", True),
+        ("manpower", "workforce", "Gendered term.", True),
+        ("man hours", "person-hours", "Gendered term.", True),
+        ("manhours", "person-hours", "Gendered term.", True),
+        ("man power", "workforce", "Gendered term.", True),
+        ("manned", "staffed", "Gendered term.", True),
+        ("mankind", "humanity", "Gendered term.", True),
+        ("chairman", "chair", "Gendered job title.", True),
+        ("salesman", "salesperson", "Gendered job title.", True),
+        ("salesmen", "salespeople", "Gendered job title.", True),
+        ("businessman", "businessperson", "Gendered term.", True),
+        ("businessmen", "businesspeople", "Gendered term.", True),
+        ("foreman", "supervisor", "Gendered job title.", True),
+        ("craftsman", "craftsperson", "Gendered job title.", True),
+        ("craftsmen", "craftspeople", "Gendered job title.", True),
+        ("workmanship", "quality of work", "Gendered term.", True),
+        ("spokesman", "spokesperson", "Gendered job title.", True),
+        ("middleman", "intermediary", "Gendered term.", True),
+        ("journeyman", "experienced tradesperson", "Gendered job title.", True),
+        ("cameraman", "camera operator", "Gendered job title.", True),
+        ("fireman", "firefighter", "Gendered job title.", True),
+        ("policeman", "police officer", "Gendered job title.", True),
+        ("waitress", "server", "Gendered job title.", True),
+        ("stewardess", "flight attendant", "Gendered job title.", True),
+        ("headmaster", "head teacher", "Gendered job title.", True),
+        ("he or she", "they", "Excludes non-binary applicants; address the reader as \"you\" or use \"they\".", True),
+        ("his or her", "their", "Excludes non-binary applicants; use \"your\" or \"their\".", True),
+        ("he/she", "they", "Excludes non-binary applicants; use \"you\" or \"they\".", True),
+        ("s/he", "they", "Excludes non-binary applicants; use \"you\" or \"they\".", True),
+        ("his/her", "their", "Excludes non-binary applicants; use \"your\" or \"their\".", True),
+        ("guys", "everyone", "Gendered form of address.", True),
+        ("gentleman's agreement", "informal agreement", "Gendered term.", True),
+        ("brotherhood", "community", "Gendered term.", True),
+        ("killer instinct", "drive to succeed", "Aggressive, masculine-coded phrasing.", True),
+        ("aggressive", "ambitious", "Masculine-coded; may be fine when describing targets or timelines.", False),
+        ("dominant", "leading", "Masculine-coded; may be fine when describing market position.", False),
+        ("dominate", "lead", "Masculine-coded; may be fine when describing market position.", False),
+        ("fearless", "confident", "Masculine-coded language.", False),
+        ("competitive personality", "motivated", "Masculine-coded personality requirement.", True),
+    ],
+    "age": [
+        ("young", "motivated", "Signals a preference for younger applicants, which may be age discrimination.", False),
+        ("young and dynamic", "dynamic", "Signals a preference for younger applicants.", True),
+        ("young team", "motivated team", "Signals a preference for younger applicants.", True),
+        ("youthful", "enthusiastic", "Signals a preference for younger applicants.", True),
+        ("digital native", "proficient with digital tools", "Age-coded; describe the skills needed instead.", True),
+        ("digital natives", "people proficient with digital tools", "Age-coded; describe the skills needed instead.", True),
+        ("recent graduate", "early-career candidate", "Acts as an age filter; say \"early-career\" or list the skills needed.", True),
+        ("recent graduates", "early-career candidates", "Acts as an age filter; say \"early-career\" or list the skills needed.", True),
+        ("recent college graduate", "early-career candidate", "Acts as an age filter.", True),
+        ("fresh graduate", "early-career candidate", "Acts as an age filter.", True),
+        ("fresh graduates", "early-career candidates", "Acts as an age filter.", True),
+        ("new grads only", "early-career candidates", "Acts as an age filter.", True),
+        ("millennial", "", "Age-coded; describe the skills or traits needed instead.", True),
+        ("millennials", "", "Age-coded; describe the skills or traits needed instead.", True),
+        ("gen z", "", "Age-coded; describe the skills or traits needed instead.", True),
+        ("energetic", "motivated", "Can read as age-coded depending on context.", False),
+        ("high energy", "motivated", "Can read as age-coded depending on context.", False),
+        ("overqualified", "", "Often used to screen out older applicants.", True),
+        ("no more than 5 years of experience", "", "An experience ceiling acts as an age filter.", True),
+        ("maximum of 5 years of experience", "", "An experience ceiling acts as an age filter.", True),
+    ],
+    "ability": [
+        ("able bodied", "", "Excludes people with disabilities; list the actual physical requirements if any.", True),
+        ("must be able to stand", "", "May exclude people with disabilities; state it only if essential and mention accommodations.", False),
+        ("stand for long periods", "", "May exclude people with disabilities; state it only if essential and mention accommodations.", False),
+        ("must be able to lift", "", "May exclude people with disabilities; state it only if essential and mention accommodations.", False),
+        ("must be able to walk", "", "May exclude people with disabilities; state it only if essential and mention accommodations.", False),
+        ("valid driver's license", "reliable transportation", "Excludes people who cannot drive; keep only if driving is part of the job.", False),
+        ("valid drivers license", "reliable transportation", "Excludes people who cannot drive; keep only if driving is part of the job.", False),
+        ("perfect vision", "", "Excludes people with visual impairments unless genuinely required.", True),
+        ("excellent eyesight", "", "Excludes people with visual impairments unless genuinely required.", True),
+        ("crazy", "intense", "Ableist language.", True),
+        ("insane", "remarkable", "Ableist language.", True),
+        ("lame", "unconvincing", "Ableist language.", True),
+        ("psycho", "", "Ableist language.", True),
+        ("spaz", "", "Ableist slur.", True),
+        ("crippled", "impaired", "Ableist language.", True),
+        ("cripple", "impair", "Ableist language.", True),
+        ("handicapped", "disabled", "Outdated term; prefer \"disabled\" or \"person with a disability\".", True),
+        ("wheelchair bound", "wheelchair user", "Ableist phrasing.", True),
+        ("confined to a wheelchair", "wheelchair user", "Ableist phrasing.", True),
+        ("suffers from", "has", "Frames disability as suffering.", True),
+        ("ocd", "detail-oriented", "Trivialises a mental health condition.", True),
+        ("tone deaf", "unaware", "Ableist idiom.", True),
+        ("turn a blind eye", "ignore", "Ableist idiom.", True),
+        ("blind spot", "gap", "Ableist idiom.", True),
+        ("sanity check", "quick check", "Ableist idiom.", True),
+        ("fall on deaf ears", "be ignored", "Ableist idiom.", True),
+    ],
+    "exclusionary": [
+        ("culture fit", "culture add", "Invites hiring people similar to the existing team.", True),
+        ("cultural fit", "culture add", "Invites hiring people similar to the existing team.", True),
+        ("native english speaker", "fluent in English", "Discriminates by national origin; ask for fluency instead.", True),
+        ("native speaker", "fluent speaker", "Discriminates by national origin; ask for fluency instead.", True),
+        ("english as a first language", "fluent in English", "Discriminates by national origin; ask for fluency instead.", True),
+        ("mother tongue", "fluent", "Discriminates by national origin; ask for fluency instead.", True),
+        ("no gaps in employment", "", "Penalises caregivers, people with illness or disability, and veterans.", True),
+        ("clean shaven", "", "Can exclude applicants for religious reasons.", True),
+        ("work hard play hard", "", "Signals a culture that may exclude people with caring responsibilities.", True),
+        ("must be a us citizen", "must be authorized to work in the US", "Citizenship requirements are only lawful for some roles.", False),
+        ("us citizens only", "must be authorized to work in the US", "Citizenship requirements are only lawful for some roles.", False),
+        ("ivy league", "accredited university", "Screens by pedigree rather than ability.", True),
+        ("top tier university", "accredited university", "Screens by pedigree rather than ability.", True),
+        ("whitelist", "allowlist", "Racially loaded term.", True),
+        ("blacklist", "blocklist", "Racially loaded term.", True),
+        ("master/slave", "primary/replica", "Racially loaded term.", True),
+        ("grandfathered", "legacy", "Term with a racist history.", True),
+        ("grandfather clause", "legacy clause", "Term with a racist history.", True),
+        ("spirit animal", "favorite", "Appropriates Indigenous culture.", True),
+        ("powwow", "meeting", "Appropriates Indigenous culture.", True),
+        ("tribe", "team", "Appropriates Indigenous culture.", False),
+    ],
+}
+
+# Everything but letters, digits, apostrophes and slashes becomes a space before matching.
+_SEPARATOR_RE = re.compile(r"[^\w'/]|_")
+
+
+def _normalize(text):
+    """
+    Lowercases the text and turns punctuation runs into single spaces, returning
+    (normalized, offsets) where offsets[i] is the index in `text` of normalized[i].
+    """
+    chars = []
+    offsets = []
+    for index, ch in enumerate(text):
+        if ch in "‘’":
+            ch = "'"
+        if _SEPARATOR_RE.match(ch):
+            if chars and chars[-1] == " ":
+                continue
+            ch = " "
+        else:
+            lower = ch.lower()
+            ch = lower if len(lower) == 1 else ch
+        chars.append(ch)
+        offsets.append(index)
+    return "".join(chars), offsets
+
+
+class AhoCorasick:
+    """
+    Multi-pattern string matcher: finds every occurrence of every pattern in
+    one pass over the text, in time linear in the text plus the matches.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for number, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                if ch not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][ch] = len(self._goto) - 1
+                state = self._goto[state][ch]
+            self._output[state].append(number)
+
+        # Breadth-first, so each state's failure link points at an already-finished state
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def finditer(self, text):
+        """
+        Yields (start, end, pattern_number) for every match, overlapping ones included.
+        """
+        state = 0
+        for index, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for number in self._output[state]:
+                yield index + 1 - len(self.patterns[number]), index + 1, number
+
+
+def _build_matcher():
+    entries = []
+    for category, terms in INCLUSIVITY_LEXICON.items():
+        for phrase, suggestion, reason, conclusive in terms:
+            entries.append({
+                "term": _normalize(phrase)[0],
+                "category": category,
+                "suggestion": suggestion,
+                "reason": reason,
+                "conclusive": conclusive,
+            })
+    return AhoCorasick([entry["term"] for entry in entries]), entries
+
+
+_MATCHER, _ENTRIES = _build_matcher()
+
+
+def scan_inclusivity(text):
+    """
+    Finds lexicon terms in a job description. Returns findings ordered by
+    position, each with character offsets into `text`; where phrases
+    overlap, the longest wins ("young and dynamic" over "young").
+    """
+    normalized, offsets = _normalize(text)
+    hits = []
+    for start, end, number in _MATCHER.finditer(normalized):
+        # Whole words only: "tribe" must not match inside "tribeca"
+        if (start > 0 and normalized[start - 1].isalnum()) or (end < len(normalized) and normalized[end].isalnum()):
+            continue
+        hits.append((start, end, number))
+
+    findings = []
+    taken_until = -1
+    for start, end, number in sorted(hits, key=lambda hit: (hit[0], hit[0] - hit[1])):
+        if start < taken_until:
+            continue
+        taken_until = end
+        entry = _ENTRIES[number]
+        source_start = offsets[start]
+        source_end = offsets[end - 1] + 1
+        findings.append({
+            "start": source_start,
+            "end": source_end,
+            "text": text[source_start:source_end],
+            "category": entry["category"],
+            "suggestion": entry["suggestion"],
+            "reason": entry["reason"],
+            "conclusive": entry["conclusive"],
+        })
+    return findings
@@ -1,8 +1,9 @@
-from ..helpers.llm_helper import get_groq_response
+from ..helpers.llm_helper import get_llm_response, stream_llm_response
+from .inclusivity import scan_inclusivity
 
-def generate_jd(role, level, skills, tone):
+def build_jd_prompt(role, level, skills, tone):
     """
-    Generates a job description with a specific tone.
+    Builds the job description prompt.
     """
     prompt = f"""
     Generate a detailed job description for the role of a {role} at a {level} level.
@@ -17,19 +18,68 @@ def generate_jd(role, level, skills, tone):
     - Requirements and Skills
     - Company Culture/Perks (tailored to the specified tone)
     """
-    response = get_groq_response(prompt)
+    return prompt
+
+async def generate_jd(role, level, skills, tone):
+    """
+    Generates a job description with a specific tone.
+    """
+    prompt = build_jd_prompt(role, level, skills, tone)
+    response = await get_llm_response(prompt, task="jd_generation")
     return response
 
-def check_inclusivity(jd_text):
+def stream_jd(role, level, skills, tone):
     """
-    Analyzes a job description for inclusive language.
+    Streams a job description token by token.
     """
-    prompt = f"""
+    return stream_llm_response(build_jd_prompt(role, level, skills, tone), task="jd_generation")
+
+def build_inclusivity_prompt(jd_text, findings=()):
+    """
+    Builds the inclusivity review prompt, pointing the model at any phrases
+    the local scan could not judge on its own.
+    """
+    flagged = ""
+    if findings:
+        phrases = "\n".join(f'    - "{f["text"]}" ({f["category"]}): {f["reason"]}' for f in findings)
+        flagged = f"""
+    A keyword scan flagged these phrases whose impact depends on context. Say for each whether it is a problem in this job description:
+{phrases}
+"""
+    return f"""
     Please act as an inclusivity expert. Review the following job description for any language that might be biased, non-inclusive, or could discourage potential applicants from diverse backgrounds.
     Provide a list of suggestions for improvement. If the document is already well-written, please state that.
-
+    {flagged}
     Job Description:
     {jd_text}
     """
-    response = get_groq_response(prompt)
-    return response
+
+def format_inclusivity_findings(findings):
+    """
+    Renders local scan findings as a markdown list.
+    """
+    if not findings:
+        return "No potentially non-inclusive language was found."
+    lines = [f"Found {len(findings)} potentially non-inclusive term{'s' if len(findings) != 1 else ''}:", ""]
+    for f in findings:
+        suggestion = f' Consider "{f["suggestion"]}".' if f["suggestion"] else " Consider removing or rephrasing it."
+        context = "" if f["conclusive"] else " *(depends on context)*"
+        lines.append(f'- **"{f["text"]}"** ({f["category"]}){context}: {f["reason"]}{suggestion}')
+    return "\n".join(lines)
+
+async def check_inclusivity(jd_text, deep_review=False):
+    """
+    Checks a job description for non-inclusive language with the local lexicon
+    scan. The LLM review runs only when asked for, or when every term the scan
+    found depends on context and needs judging.
+    Returns {"result": markdown, "findings": [...], "llm_reviewed": bool}.
+    """
+    # The scan takes well under a millisecond, far less than a hop to the process pool
+    findings = scan_inclusivity(jd_text)
+    result = format_inclusivity_findings(findings)
+    inconclusive = [f for f in findings if not f["conclusive"]]
+    llm_reviewed = deep_review or (bool(findings) and len(inconclusive) == len(findings))
+    if llm_reviewed:
+        review = await get_llm_response(build_inclusivity_prompt(jd_text, inconclusive), task="inclusivity_check")
+        result = f"{result}\n\n### Detailed Review\n\n{review}"
+    return {"result": result, "findings": findings, "llm_reviewed": llm_reviewed}
@@ -1,19 +1,16 @@
 import os
-import fitz  # PyMuPDF
 import requests
 from dotenv import load_dotenv
 
+from ...helpers.extraction import extract_text
+from ...helpers.model_router import get_route
+
 load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_MODEL = "llama3-70b-8192"  # or your chosen Groq-supported LLaMA model
 
 def extract_text_from_pdf(file_path):
-    doc = fitz.open(file_path)
-    text = ""
-    for page in doc:
-        text += page.get_text()
-    return text.strip()
+    return extract_text(file_path).strip()
 
 def screen_resume_against_jd(resume_pdf_path, jd_pdf_path):
     resume_text = extract_text_from_pdf(resume_pdf_path)
@@ -38,6 +35,7 @@ Based on the above, answer:
 Respond in bullet points.
 """
 
+    route = get_route("resume_screening")
     response = requests.post(
         "https://api.groq.com/openai/v1/chat/completions",
         headers={
@@ -45,7 +43,7 @@ Respond in bullet points.
             "Content-Type": "application/json"
         },
         json={
-            "model": GROQ_MODEL,
+            "model": route.primary,
             "messages": [{"role": "user", "content": prompt}],
             "temperature": 0.4
         }
@@ -1,31 +1,67 @@
-from ..helpers.llm_helper import get_groq_response
-import fitz # PyMuPDF
+from ..helpers.llm_helper import get_llm_response
+from ..helpers.model_router import get_route
+from ..helpers.llm_scheduler import LLMError
+from ..helpers.executor import run_io, ExecutorSaturatedError
+from ..helpers.text_cache import load_document
+from ..helpers.prompt_budget import PromptSlot, fit_prompt, record_prompt_budget
+from ..candidate_store.candidate_store import artifact_version, text_digest, load_artifact, save_artifact
 
-def analyze_job_fit(candidate_profile, jd_path):
+# Tokens kept free for the score and summary.
+JOB_FIT_OUTPUT_TOKENS = 1024
+
+def build_job_fit_prompt(candidate_profile, jd_text):
+    """
+    Builds the compatibility analysis prompt.
     """
-    Analyzes the fit between a candidate profile and a job description.
+    return f"""
+    Analyze the compatibility between the following candidate profile and job description.
+    Provide a compatibility score and a summary of the analysis.
+
+    Candidate Profile/Bio:
+    {candidate_profile}
+
+    Job Description:
+    {jd_text}
+
+    Output format:
+    Compatibility Score: [score]%
+    Summary: [detailed summary of why the candidate is or is not a good fit]
+    """
+
+JOB_FIT_PROMPT_VERSION = artifact_version(build_job_fit_prompt("", ""))
+
+def job_fit_version():
+    # Routes can be switched at runtime, so the models are read on every call
+    return artifact_version(JOB_FIT_PROMPT_VERSION, *get_route("job_fit").models)
+
+async def analyze_job_fit(candidate_profile, jd):
+    """
+    Analyzes the fit between a candidate profile and a job description,
+    reusing the stored analysis for the same profile text and JD.
     """
     try:
-        with fitz.open(jd_path) as jd_doc:
-            jd_text = ""
-            for page in jd_doc:
-                jd_text += page.get_text()
-
-        prompt = f"""
-        Analyze the compatibility between the following candidate profile and job description.
-        Provide a compatibility score and a summary of the analysis.
-
-        Candidate Profile/Bio:
-        {candidate_profile}
-
-        Job Description:
-        {jd_text}
-
-        Output format:
-        Compatibility Score: [score]%
-        Summary: [detailed summary of why the candidate is or is not a good fit]
-        """
-        response = get_groq_response(prompt)
+        jd_doc = await load_document(jd)
+        # A pasted profile is stored like a resume, keyed by the hash of its text
+        profile_digest = text_digest(candidate_profile)
+        version = job_fit_version()
+        stored = await load_artifact(profile_digest, "job_fit", version, jd_doc.digest)
+        if stored is not None:
+            return stored
+
+        prompt, reports = await run_io(
+            fit_prompt,
+            build_job_fit_prompt,
+            {
+                "candidate_profile": PromptSlot(candidate_profile, kind="resume"),
+                "jd_text": PromptSlot(jd_doc.text, kind="jd", page_offsets=jd_doc.page_offsets),
+            },
+            JOB_FIT_OUTPUT_TOKENS,
+        )
+        record_prompt_budget("job_fit", reports)
+        response = await get_llm_response(prompt, task="job_fit")
+        await save_artifact(profile_digest, "job_fit", version, response, jd_doc.digest)
         return response
+    except (ExecutorSaturatedError, LLMError):
+        raise
     except Exception as e:
         return f"An error occurred: {e}"
@@ -1,120 +1,487 @@
-from fastapi import FastAPI, File, UploadFile, Form, Body
-from fastapi.responses import JSONResponse
-import os
-import shutil
-from typing import Dict, Any
+from fastapi import FastAPI, File, UploadFile, Form, Body, Request, Depends, Query
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+import json
+import time
+import asyncio
+import logging
+import zipfile
+from datetime import datetime
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional
 
 # Import feature modules
-from .resume_screener.resume_screener import ats_and_fit_analysis # Import the new all-in-one function
-from .jd_generator.jd_generator import generate_jd, check_inclusivity
-from .interview_generator.interview_generator import generate_interview_questions
+from .resume_screener.resume_screener import ats_and_fit_analysis, ats_and_fit_analysis_progressive, ats_and_fit_analysis_batch, BATCH_CONCURRENCY
+from .resume_screener.pre_ranker import PRESCREEN_METHODS
+from .jd_generator.jd_generator import generate_jd, stream_jd, check_inclusivity
+from .interview_generator.interview_generator import generate_interview_questions, stream_interview_questions
 from .policy_assistant.policy_assistant import answer_policy_question
 from .onboarding_assistant.onboarding_assistant import answer_onboarding_question
 from .job_fit_analyzer.job_fit_analyzer import analyze_job_fit
 from .candidate_summarizer.candidate_summarizer import summarize_candidate
-from .offer_letter_generator.offer_letter_generator import generate_offer_letter
-from .performance_review_assistant.performance_review_assistant import generate_performance_review
-from .analytics_dashboard.analytics_dashboard import log_data, get_analytics_data
+from .offer_letter_generator.offer_letter_generator import (
+    generate_offer_letter, generate_offer_document, stream_offer_letter, generate_offer_letters_bulk, validate_offer_details,
+    get_offer_template, put_offer_template, delete_offer_template, list_offer_templates, OFFER_FORMATS,
+)
+from .performance_review_assistant.performance_review_assistant import generate_performance_review, stream_performance_review
+from .performance_review_assistant.review_jobs import create_review_job, get_review_job, retry_review_job, export_review_job, resume_review_jobs, stop_review_jobs
+from .analytics_dashboard.analytics_dashboard import log_data, get_analytics_data, get_analytics_window
+from .helpers.llm_helper import init_llm_client, close_llm_client
+from .helpers.executor import run_io, get_executor_stats, shutdown_executors, ExecutorSaturatedError
+from .helpers.llm_cache import set_cache_bypass, get_llm_cache_stats, LLM_CACHE_BYPASS_PATHS
+from .helpers.llm_scheduler import set_llm_priority, get_llm_scheduler_stats, LLMError, LLM_INTERACTIVE_PATHS, PRIORITY_INTERACTIVE
+from .helpers.model_router import get_model_routes, set_model_routes, get_model_stats
+from .candidate_store.candidate_store import get_candidate_store_stats
+from .candidate_search.candidate_search import search_candidates, refresh_skill_index, get_skill_index_stats
+from .candidate_match.candidate_match import register_jd, match_jd, run_candidate_index_sync, get_candidate_index_stats, IVF_NPROBE
+from .helpers.text_cache import load_document, get_text_cache_stats
+from .helpers.semantic_cache import get_semantic_cache_stats
+from .helpers.prompt_budget import get_prompt_budget_stats
+from .helpers.upload_store import save_upload, save_zip_upload, run_upload_gc, get_upload_store_stats, UploadTooLargeError
 
-app = FastAPI()
+BATCH_MAX_FILES = 500
 
-# Create a temporary directory for file uploads
-UPLOAD_DIR = "temp_uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled LLM client shared by every request handled by this worker
+    await init_llm_client()
+    upload_gc = asyncio.create_task(run_upload_gc())
+    # Build the skills index in the background so the first search is fast
+    skill_index_warmup = asyncio.create_task(run_io(refresh_skill_index))
+    candidate_index_sync = asyncio.create_task(run_candidate_index_sync())
+    # Pick up bulk review jobs that were interrupted by a crash or restart
+    await resume_review_jobs()
+    yield
+    stop_review_jobs()
+    upload_gc.cancel()
+    skill_index_warmup.cancel()
+    candidate_index_sync.cancel()
+    await close_llm_client()
+    shutdown_executors()
+
+
+async def llm_cache_policy(request: Request):
+    # Skip the LLM response cache for configured endpoints or on "Cache-Control: no-cache"
+    if request.url.path in LLM_CACHE_BYPASS_PATHS or "no-cache" in request.headers.get("cache-control", ""):
+        set_cache_bypass(True)
+
+
+async def llm_priority_policy(request: Request):
+    # Chat-style endpoints go ahead of batch work in the LLM scheduler
+    if request.url.path in LLM_INTERACTIVE_PATHS:
+        set_llm_priority(PRIORITY_INTERACTIVE)
+
+
+app = FastAPI(lifespan=lifespan, dependencies=[Depends(llm_cache_policy), Depends(llm_priority_policy)])
+
+
+@app.exception_handler(ExecutorSaturatedError)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturatedError):
+    return JSONResponse(
+        status_code=503,
+        content={"error": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(LLMError)
+async def llm_error_handler(request: Request, exc: LLMError):
+    if exc.retry_after is not None:
+        return JSONResponse(
+            status_code=503,
+            content={"error": str(exc)},
+            headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+        )
+    return JSONResponse(status_code=502, content={"error": str(exc)})
+
+
+@app.exception_handler(UploadTooLargeError)
+async def upload_too_large_handler(request: Request, exc: UploadTooLargeError):
+    return JSONResponse(status_code=413, content={"error": str(exc)})
 
 
 # --- PRIMARY ATS & FIT ANALYSIS ENDPOINT ---
 @app.post("/ats_fit_analysis")
-async def ats_fit_analysis_endpoint(resume: UploadFile = File(...), jd: UploadFile = File(...)):
-    resume_path = os.path.join(UPLOAD_DIR, resume.filename)
-    jd_path = os.path.join(UPLOAD_DIR, jd.filename)
-
-    with open(resume_path, "wb") as buffer:
-        shutil.copyfileobj(resume.file, buffer)
-    with open(jd_path, "wb") as buffer:
-        shutil.copyfileobj(jd.file, buffer)
-    
-    result = ats_and_fit_analysis(resume_path, jd_path)
-    
+async def ats_fit_analysis_endpoint(resume: UploadFile = File(...), jd: UploadFile = File(...), progressive: bool = Query(False)):
+    resume_file = await save_upload(resume)
+    jd_file = await save_upload(jd)
+
+    if progressive:
+        # One NDJSON line per part ({"fit_analysis": ...}, {"ats_parsing": ...}) as soon as each is ready
+        async def stream_parts():
+            result = {}
+            try:
+                async for part, value in ats_and_fit_analysis_progressive(resume_file, jd_file):
+                    result[part] = value
+                    yield json.dumps({part: value}) + "\n"
+            except (LLMError, ExecutorSaturatedError) as e:
+                # Headers are already sent, so report the failure in-band
+                result["error"] = str(e)
+                yield json.dumps({"error": str(e)}) + "\n"
+            if "error" not in result:
+                await log_fit_score(result)
+        return StreamingResponse(stream_parts(), media_type="application/x-ndjson")
+
+    result = await ats_and_fit_analysis(resume_file, jd_file)
+    await log_fit_score(result)
+    return JSONResponse(content=result)
+
+async def log_fit_score(result):
     # Log the fit score for analytics if it exists
-    if result and "fit_analysis" in result and "fit_score" in result["fit_analysis"]:
-        fit_score = result["fit_analysis"]["fit_score"]
+    fit_analysis = result.get("fit_analysis") if isinstance(result, dict) else None
+    if isinstance(fit_analysis, dict) and "fit_score" in fit_analysis:
+        fit_score = fit_analysis["fit_score"]
         # Attempt to get role from parsed data, otherwise use 'Unknown'
-        role = result.get("ats_parsing", {}).get("work_experience", [{}])[0].get("job_title", "Unknown Role")
-        log_data("fit_score", {"role": role, "score": fit_score})
-        
-    return JSONResponse(content=result)
+        experience = (result.get("ats_parsing") or {}).get("work_experience")
+        latest = experience[0] if isinstance(experience, list) and experience else None
+        role = (latest.get("job_title") if isinstance(latest, dict) else None) or "Unknown Role"
+        await run_io(log_data, "fit_score", {"role": role, "score": fit_score})
+
+@app.post("/ats_fit_analysis/batch")
+async def ats_fit_analysis_batch_endpoint(
+    jd: UploadFile = File(...),
+    resumes: Optional[List[UploadFile]] = File(None),
+    resumes_zip: Optional[UploadFile] = File(None),
+    concurrency: int = Form(BATCH_CONCURRENCY),
+    top_k: Optional[int] = Form(None),
+    min_score: Optional[float] = Form(None),
+    prescreen_method: str = Form("tfidf"),
+):
+    """
+    Screens one JD against many resumes (multipart files and/or a zip archive)
+    and streams one NDJSON line per resume as soon as its analysis finishes.
+    With top_k/min_score, only the best locally pre-ranked resumes reach the LLM.
+    """
+    if prescreen_method not in PRESCREEN_METHODS:
+        return JSONResponse(status_code=400, content={"error": f"prescreen_method must be one of: {', '.join(PRESCREEN_METHODS)}."})
+    jd_file = await save_upload(jd)
+    resume_files = []
+    for resume in resumes or []:
+        resume_files.append(await save_upload(resume))
+    if resumes_zip is not None:
+        try:
+            resume_files.extend(await save_zip_upload(resumes_zip, BATCH_MAX_FILES))
+        except (ValueError, zipfile.BadZipFile) as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+    if not resume_files:
+        return JSONResponse(status_code=400, content={"error": "Please upload at least one resume."})
+    if len(resume_files) > BATCH_MAX_FILES:
+        return JSONResponse(status_code=400, content={"error": f"A batch may contain at most {BATCH_MAX_FILES} resumes."})
+    # The JD is shared by every resume, so an unreadable one is rejected before streaming starts
+    try:
+        jd_doc = await load_document(jd_file)
+    except ExecutorSaturatedError:
+        raise
+    except Exception as e:
+        return JSONResponse(status_code=400, content={"error": f"The job description could not be read: {e}"})
+    if not jd_doc.text.strip():
+        return JSONResponse(status_code=400, content={"error": "The job description contains no text."})
+
+    async def stream_results():
+        try:
+            batch = ats_and_fit_analysis_batch(resume_files, jd_doc, concurrency, top_k, min_score, prescreen_method)
+            async for index, result in batch:
+                try:
+                    await log_fit_score(result)
+                except Exception as e:
+                    logger.error("Could not log the fit score of batch item %d: %s", index, e)
+                line = {"index": index, "filename": resume_files[index].filename, "result": result}
+                yield json.dumps(line) + "\n"
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            logger.error("Batch screening failed: %s", e)
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+# --- STREAMING (SERVER-SENT EVENTS) ---
+
+def sse_response(tokens):
+    """
+    Wraps an async iterator of text deltas as a text/event-stream response:
+    one `data: {"token": ...}` event per delta, then `event: done` (or `event: error`).
+    """
+    async def events():
+        try:
+            async for token in tokens:
+                yield f"data: {json.dumps({'token': token})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            logger.error("Streaming failed: %s", e)
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/jdgenerate/stream")
+async def jd_generate_stream_endpoint(role: str = Form(...), level: str = Form(...), skills: str = Form(...), tone: str = Form(...)):
+    async def tokens():
+        async for token in stream_jd(role, level, skills, tone):
+            yield token
+        await run_io(log_data, "jd_generated", {})
+    return sse_response(tokens())
+
+@app.post("/generateoffer/stream")
+async def generate_offer_stream_endpoint(details: Dict[str, Any] = Body(...)):
+    # Bad details are a 400 up front rather than an error event mid-stream
+    try:
+        validate_offer_details(details)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    return sse_response(stream_offer_letter(details))
+
+@app.post("/generateperformance/stream")
+async def generate_performance_stream_endpoint(points: str = Form(...), employee_name: str = Form(...), review_period: str = Form(...)):
+    return sse_response(stream_performance_review(points, employee_name, review_period))
+
+@app.post("/interviewgenerate/stream")
+async def interview_generate_stream_endpoint(jd: UploadFile = File(...)):
+    jd_file = await save_upload(jd)
+    return sse_response(stream_interview_questions(jd_file))
 
 
 # --- OTHER ENDPOINTS ---
 
 @app.post("/jdgenerate")
 async def jd_generate_endpoint(role: str = Form(...), level: str = Form(...), skills: str = Form(...), tone: str = Form(...)):
-    result = generate_jd(role, level, skills, tone)
-    log_data("jd_generated", {})
+    result = await generate_jd(role, level, skills, tone)
+    await run_io(log_data, "jd_generated", {})
     return JSONResponse(content={"result": result})
 
 @app.post("/policyqa")
 async def policy_qa_endpoint(policy_doc: UploadFile = File(...), question: str = Form(...)):
-    policy_doc_path = os.path.join(UPLOAD_DIR, policy_doc.filename)
-    with open(policy_doc_path, "wb") as buffer:
-        shutil.copyfileobj(policy_doc.file, buffer)
-    log_data("policy_question", question)
-    result = answer_policy_question(policy_doc_path, question)
+    policy_file = await save_upload(policy_doc)
+    await run_io(log_data, "policy_question", question)
+    result = await answer_policy_question(policy_file, question)
     return JSONResponse(content={"result": result})
 
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
 @app.post("/generateoffer")
-async def generate_offer_endpoint(details: Dict[str, Any] = Body(...)):
-    result = generate_offer_letter(details)
+async def generate_offer_endpoint(details: Dict[str, Any] = Body(...), format: str = Query("txt")):
+    if format not in OFFER_FORMATS:
+        return JSONResponse(status_code=400, content={"error": f"format must be one of: {', '.join(OFFER_FORMATS)}."})
+    try:
+        if format == "docx":
+            document = await generate_offer_document(details)
+            return Response(content=document, media_type=DOCX_MEDIA_TYPE, headers={"Content-Disposition": 'attachment; filename="offer_letter.docx"'})
+        result = await generate_offer_letter(details)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
     return JSONResponse(content={"result": result})
 
+@app.post("/generateoffer/bulk")
+async def generate_offer_bulk_endpoint(offers: UploadFile = File(...), format: str = Query("txt")):
+    upload = await save_upload(offers)
+    try:
+        archive, generated, errors = await generate_offer_letters_bulk(await run_io(upload.read_bytes), format)
+    except (ValueError, UnicodeDecodeError) as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    return Response(
+        content=archive,
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": 'attachment; filename="offer_letters.zip"',
+            "X-Offers-Generated": str(generated),
+            "X-Offers-Failed": str(len(errors)),
+        },
+    )
+
+@app.get("/offertemplates")
+async def list_offer_templates_endpoint():
+    return JSONResponse(content={"templates": await run_io(list_offer_templates)})
+
+@app.get("/offertemplates/{job_title}")
+async def get_offer_template_endpoint(job_title: str):
+    # Drafts the template with the LLM if the title has none yet, so HR can review and edit it
+    try:
+        template = await get_offer_template(job_title)
+    except ValueError as e:
+        return JSONResponse(status_code=422, content={"error": str(e)})
+    return JSONResponse(content={"job_title": job_title, "template": template})
+
+@app.put("/offertemplates/{job_title}")
+async def put_offer_template_endpoint(job_title: str, template: str = Body(..., embed=True)):
+    try:
+        record = await put_offer_template(job_title, template)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    return JSONResponse(content=record)
+
+@app.delete("/offertemplates/{job_title}")
+async def delete_offer_template_endpoint(job_title: str):
+    if not await run_io(delete_offer_template, job_title):
+        return JSONResponse(status_code=404, content={"error": f"No template for '{job_title}'."})
+    return JSONResponse(content={"deleted": job_title})
+
 @app.post("/generateperformance")
 async def generate_performance_endpoint(points: str = Form(...), employee_name: str = Form(...), review_period: str = Form(...)):
-    result = generate_performance_review(points, employee_name, review_period)
+    result = await generate_performance_review(points, employee_name, review_period)
     return JSONResponse(content={"result": result})
 
+@app.post("/generateperformance/bulk")
+async def generate_performance_bulk_endpoint(reviews: UploadFile = File(...)):
+    upload = await save_upload(reviews)
+    try:
+        job = await create_review_job(await run_io(upload.read_bytes), upload.filename)
+    except (ValueError, UnicodeDecodeError) as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    return JSONResponse(status_code=202, content=job)
+
+@app.get("/generateperformance/bulk/{job_id}")
+async def performance_bulk_status_endpoint(job_id: str):
+    try:
+        job = await get_review_job(job_id)
+    except ValueError:
+        job = None
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": f"No review job with id {job_id}."})
+    return JSONResponse(content=job)
+
+@app.post("/generateperformance/bulk/{job_id}/retry")
+async def performance_bulk_retry_endpoint(job_id: str):
+    try:
+        job = await retry_review_job(job_id)
+    except ValueError:
+        job = None
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": f"No review job with id {job_id}."})
+    return JSONResponse(content=job)
+
+@app.get("/generateperformance/bulk/{job_id}/download")
+async def performance_bulk_download_endpoint(job_id: str):
+    try:
+        exported = await export_review_job(job_id)
+    except ValueError:
+        exported = None
+    if exported is None:
+        return JSONResponse(status_code=404, content={"error": f"No review job with id {job_id}."})
+    archive, count = exported
+    return Response(
+        content=archive,
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="performance_reviews_{job_id[:8]}.zip"', "X-Reviews-Completed": str(count)},
+    )
+
+def parse_timestamp(value):
+    # Accepts epoch seconds or an ISO 8601 date/datetime
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
 @app.get("/getanalytics")
-async def get_analytics_endpoint():
-    data = get_analytics_data()
+async def get_analytics_endpoint(
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = Query(None),
+    granularity: Optional[str] = Query(None),
+):
+    data = await run_io(get_analytics_data)
+    if from_ or to or granularity:
+        try:
+            end = parse_timestamp(to) if to else time.time()
+            start = parse_timestamp(from_) if from_ else end - 30 * 86400
+            data["window"] = await run_io(get_analytics_window, start, end, granularity)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
     return JSONResponse(content=data)
 
 @app.post("/checkinclusivity")
-async def check_inclusivity_endpoint(jd_text: str = Form(...)):
-    result = check_inclusivity(jd_text)
-    return JSONResponse(content={"result": result})
+async def check_inclusivity_endpoint(jd_text: str = Form(...), deep_review: bool = Form(False)):
+    return JSONResponse(content=await check_inclusivity(jd_text, deep_review))
 
 @app.post("/interviewgenerate")
 async def interview_generate_endpoint(jd: UploadFile = File(...)):
-    jd_path = os.path.join(UPLOAD_DIR, jd.filename)
-    with open(jd_path, "wb") as buffer:
-        shutil.copyfileobj(jd.file, buffer)
-    result = generate_interview_questions(jd_path)
+    jd_file = await save_upload(jd)
+    result = await generate_interview_questions(jd_file)
     return JSONResponse(content={"result": result})
 
 @app.post("/onboardingqa")
 async def onboarding_qa_endpoint(onboarding_guide: UploadFile = File(...), question: str = Form(...)):
-    onboarding_guide_path = os.path.join(UPLOAD_DIR, onboarding_guide.filename)
-    with open(onboarding_guide_path, "wb") as buffer:
-        shutil.copyfileobj(onboarding_guide.file, buffer)
-    result = answer_onboarding_question(onboarding_guide_path, question)
+    guide_file = await save_upload(onboarding_guide)
+    result = await answer_onboarding_question(guide_file, question)
     return JSONResponse(content={"result": result})
 
 @app.post("/jobfit")
 async def job_fit_endpoint(candidate_profile: str = Form(...), jd: UploadFile = File(...)):
-    jd_path = os.path.join(UPLOAD_DIR, jd.filename)
-    with open(jd_path, "wb") as buffer:
-        shutil.copyfileobj(jd.file, buffer)
-    result = analyze_job_fit(candidate_profile, jd_path)
+    jd_file = await save_upload(jd)
+    result = await analyze_job_fit(candidate_profile, jd_file)
     return JSONResponse(content={"result": result})
 
 @app.post("/summarizecandidate")
 async def summarize_candidate_endpoint(resume: UploadFile = File(...)):
-    resume_path = os.path.join(UPLOAD_DIR, resume.filename)
-    with open(resume_path, "wb") as buffer:
-        shutil.copyfileobj(resume.file, buffer)
-    result = summarize_candidate(resume_path)
+    resume_file = await save_upload(resume)
+    result = await summarize_candidate(resume_file)
     return JSONResponse(content={"result": result})
 
+@app.get("/candidates/search")
+async def candidate_search_endpoint(
+    q: str = Query(...),
+    mode: str = Query("boolean"),
+    since: Optional[str] = Query(None),
+    limit: int = Query(50),
+):
+    try:
+        result = await search_candidates(q, mode, parse_timestamp(since) if since else None, limit)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    return JSONResponse(content=result)
+
+@app.post("/jd")
+async def register_jd_endpoint(jd: UploadFile = File(...), title: Optional[str] = Form(None)):
+    jd_file = await save_upload(jd)
+    try:
+        jd_doc = await load_document(jd_file)
+    except ExecutorSaturatedError:
+        raise
+    except Exception as e:
+        # ValueError for unsupported formats; the PDF/DOCX readers raise their own types on corrupt files
+        return JSONResponse(status_code=400, content={"error": f"The job description could not be read: {e}"})
+    if not jd_doc.text.strip():
+        return JSONResponse(status_code=400, content={"error": "The job description contains no text."})
+    return JSONResponse(content=await register_jd(jd_doc, title))
+
+@app.get("/jd/{jd_id}/match")
+async def match_jd_endpoint(jd_id: int, top_n: int = Query(10), rescore: bool = Query(False), nprobe: int = Query(IVF_NPROBE)):
+    try:
+        result = await match_jd(jd_id, top_n, rescore, nprobe)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    if result is None:
+        return JSONResponse(status_code=404, content={"error": f"No job description with id {jd_id}."})
+    return JSONResponse(content=result)
+
+@app.get("/stats")
+async def stats_endpoint():
+    return JSONResponse(content={
+        "executors": get_executor_stats(),
+        "llm_cache": get_llm_cache_stats(),
+        "llm_scheduler": get_llm_scheduler_stats(),
+        "models": get_model_stats(),
+        "text_cache": get_text_cache_stats(),
+        "upload_store": get_upload_store_stats(),
+        "semantic_cache": get_semantic_cache_stats(),
+        "prompt_budget": get_prompt_budget_stats(),
+        "candidate_store": await run_io(get_candidate_store_stats),
+        "skill_index": await run_io(get_skill_index_stats),
+        "candidate_index": await run_io(get_candidate_index_stats),
+    })
+
+@app.get("/models/routes")
+async def get_model_routes_endpoint():
+    return JSONResponse(content={"routes": get_model_routes(), "models": get_model_stats()})
+
+@app.put("/models/routes")
+async def set_model_routes_endpoint(routes: Dict[str, Any] = Body(...)):
+    # Replaces the runtime routing table until the next restart
+    try:
+        set_model_routes(routes)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": f"Invalid routing table: {e}"})
+    return JSONResponse(content={"routes": get_model_routes()})
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the AI-Powered HR Assistant API"}
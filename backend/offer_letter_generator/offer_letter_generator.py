@@ -1,21 +1,154 @@
-# VERIFICATION STEP 1: Ensure this file has this exact content.
-from ..helpers.llm_helper import get_groq_response
+import os
+import io
+import re
+import math
+import csv
+import json
+import time
+import hashlib
+import asyncio
+import zipfile
+from string import Template
+from datetime import date
 
-def generate_offer_letter(details):
+from ..helpers.llm_helper import get_llm_response
+from ..helpers.llm_scheduler import set_llm_priority, PRIORITY_BATCH
+from ..helpers.executor import run_io, run_cpu
+
+# One template per job title, as {slug}-{hash}.json. HR can write them through the API; missing ones are drafted by the LLM once.
+OFFER_TEMPLATE_DIR = os.environ.get("OFFER_TEMPLATE_DIR", "offer_templates")
+OFFER_COMPANY_NAME = os.environ.get("OFFER_COMPANY_NAME", "InnovateTech Solutions")
+OFFER_FORMATS = ("txt", "docx")
+OFFER_BULK_MAX_ROWS = int(os.environ.get("OFFER_BULK_MAX_ROWS", "2000"))
+OFFER_RENDER_CHUNK = 100
+
+OFFER_FIELDS = ("candidate_name", "job_title", "start_date", "salary", "manager_name", "expiration_date")
+# Placeholders a template may use, and those it must use for the letter to be a valid offer.
+TEMPLATE_VARIABLES = OFFER_FIELDS + ("company_name",)
+TEMPLATE_REQUIRED_VARIABLES = ("candidate_name", "start_date", "salary", "expiration_date")
+
+_template_locks = {}
+
+
+def template_slug(job_title):
+    return re.sub(r"[^a-z0-9]+", "-", job_title.lower()).strip("-") or "default"
+
+
+def template_key(job_title):
+    # The slug keeps file names readable; the hash keeps "C++ Dev" and "C# Dev" apart
+    normalized = " ".join(job_title.lower().split())
+    return f"{template_slug(job_title)}-{hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:8]}"
+
+
+def template_identifiers(text):
+    """
+    Returns the placeholder names used in a string.Template text. Raises
+    ValueError on a malformed placeholder such as a bare "$" before a digit.
+    """
+    names = []
+    for match in Template.pattern.finditer(text):
+        if match.group("invalid") is not None:
+            line = text.count("\n", 0, match.start()) + 1
+            raise ValueError(f"Invalid placeholder on line {line}; write a literal dollar sign as $$.")
+        name = match.group("named") or match.group("braced")
+        if name:
+            names.append(name)
+    return names
+
+
+def validate_template(text):
+    """
+    Checks an offer letter template and raises ValueError naming every problem.
+    """
+    if not text or not text.strip():
+        raise ValueError("The template is empty.")
+    names = set(template_identifiers(text))
+    problems = []
+    unknown = sorted(names - set(TEMPLATE_VARIABLES))
+    if unknown:
+        problems.append(f"unknown placeholders: {', '.join(unknown)}")
+    missing = [name for name in TEMPLATE_REQUIRED_VARIABLES if name not in names]
+    if missing:
+        problems.append(f"missing placeholders: {', '.join(missing)}")
+    if problems:
+        raise ValueError(f"Invalid template ({'; '.join(problems)}). Allowed placeholders: {', '.join('$' + v for v in TEMPLATE_VARIABLES)}.")
+
+
+def parse_salary(value):
+    """
+    Parses a salary given as a number or as text like "$120,000", "120000.50" or "120k".
+    """
+    if isinstance(value, bool):
+        raise ValueError("salary must be a number.")
+    if isinstance(value, (int, float)):
+        amount = float(value)
+    else:
+        cleaned = re.sub(r"[\s,$]|usd", "", str(value).lower())
+        multiplier = 1000 if cleaned.endswith("k") else 1
+        try:
+            amount = float(cleaned.rstrip("k")) * multiplier
+        except ValueError:
+            raise ValueError(f"salary must be a number, got '{value}'.") from None
+    if not math.isfinite(amount):
+        raise ValueError(f"salary must be a finite number, got '{value}'.")
+    if amount <= 0:
+        raise ValueError("salary must be greater than zero.")
+    return amount
+
+
+def _format_date(value):
+    # ISO dates (from CSVs and APIs) are spelled out; anything else is used as written
+    try:
+        return date.fromisoformat(str(value).strip()).strftime("%B %d, %Y")
+    except ValueError:
+        return str(value).strip()
+
+
+def validate_offer_details(details):
+    """
+    Returns the template values for one offer, or raises ValueError listing
+    every missing or malformed field.
+    """
+    if not isinstance(details, dict):
+        raise ValueError("Offer details must be an object.")
+    problems = [f"{field} is required" for field in OFFER_FIELDS if not str(details.get(field) or "").strip()]
+    values = {}
+    if "salary is required" not in problems:
+        try:
+            amount = parse_salary(details["salary"])
+            values["salary"] = f"${amount:,.0f}" if amount == int(amount) else f"${amount:,.2f}"
+        except ValueError as e:
+            problems.append(str(e).rstrip("."))
+    if problems:
+        raise ValueError(f"Invalid offer details: {'; '.join(problems)}.")
+    values.update(
+        candidate_name=str(details["candidate_name"]).strip(),
+        job_title=str(details["job_title"]).strip(),
+        manager_name=str(details["manager_name"]).strip(),
+        start_date=_format_date(details["start_date"]),
+        expiration_date=_format_date(details["expiration_date"]),
+        company_name=str(details.get("company_name") or OFFER_COMPANY_NAME).strip(),
+    )
+    return values
+
+
+def build_offer_template_prompt(job_title):
     """
-    Generates a professional offer letter based on provided details.
+    Builds the prompt that drafts a reusable offer letter template for a job title.
     """
     prompt = f"""
-    Please act as an HR professional and draft a formal job offer letter.
-    Use the following details to construct the letter:
+    Please act as an HR professional and draft a reusable formal job offer letter template for the position of {job_title}.
+    Write placeholders exactly as shown below; they are filled in for each candidate later:
 
-    - Company Name: "InnovateTech Solutions" (use this as a placeholder)
-    - Candidate Name: {details['candidate_name']}
-    - Job Title: {details['job_title']}
-    - Start Date: {details['start_date']}
-    - Annual Salary: ${details['salary']:,}
-    - Reporting Manager: {details['manager_name']}
-    - Offer Expiration Date: {details['expiration_date']}
+    - ${{company_name}}: the company name
+    - ${{candidate_name}}: the candidate's full name
+    - ${{job_title}}: the job title
+    - ${{start_date}}: the start date
+    - ${{salary}}: the annual salary, already formatted with its currency symbol
+    - ${{manager_name}}: the reporting manager
+    - ${{expiration_date}}: the offer expiration date
+
+    Do not use any other placeholders or brackets. If you need a literal dollar sign, write $$.
 
     The letter should be professional, welcoming, and include standard sections such as:
     1.  Introduction and congratulations.
@@ -25,7 +158,238 @@ def generate_offer_letter(details):
     5.  At-will employment statement (if applicable in the US).
     6.  Next steps and a signature line for acceptance.
 
-    Please return only the complete, formatted letter.
+    Please return only the complete template.
     """
-    response = get_groq_response(prompt)
-    return response
\ No newline at end of file
+    return prompt
+
+
+def _template_path(job_title):
+    return os.path.join(OFFER_TEMPLATE_DIR, f"{template_key(job_title)}.json")
+
+
+def _existing_template_path(job_title):
+    # Templates saved before file names carried a hash are moved over on first use
+    path = _template_path(job_title)
+    legacy_path = os.path.join(OFFER_TEMPLATE_DIR, f"{template_slug(job_title)}.json")
+    if not os.path.exists(path) and os.path.exists(legacy_path):
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            legacy_title = json.load(f).get("job_title", "")
+        if template_key(legacy_title) == template_key(job_title):
+            os.replace(legacy_path, path)
+    return path
+
+
+def load_offer_template(job_title):
+    path = _existing_template_path(job_title)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_offer_template(job_title, text, source):
+    os.makedirs(OFFER_TEMPLATE_DIR, exist_ok=True)
+    record = {"job_title": job_title, "template": text, "source": source, "updated_at": time.time()}
+    path = _template_path(job_title)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(record, f)
+    os.replace(f"{path}.tmp", path)
+    return record
+
+
+def delete_offer_template(job_title):
+    path = _existing_template_path(job_title)
+    if not os.path.exists(path):
+        return False
+    os.remove(path)
+    return True
+
+
+def list_offer_templates():
+    if not os.path.isdir(OFFER_TEMPLATE_DIR):
+        return []
+    templates = []
+    for name in sorted(os.listdir(OFFER_TEMPLATE_DIR)):
+        if name.endswith(".json"):
+            with open(os.path.join(OFFER_TEMPLATE_DIR, name), "r", encoding="utf-8") as f:
+                record = json.load(f)
+            templates.append({"job_title": record["job_title"], "source": record["source"], "updated_at": record["updated_at"]})
+    return templates
+
+
+async def put_offer_template(job_title, text):
+    """
+    Stores an HR-written template for a job title; raises ValueError if it is invalid.
+    """
+    validate_template(text)
+    return await run_io(save_offer_template, job_title, text, "hr")
+
+
+async def get_offer_template(job_title):
+    """
+    Returns the template for a job title, asking the LLM to draft and store one
+    the first time the title is seen. Concurrent requests for the same title
+    share that one LLM call.
+    """
+    key = template_key(job_title)
+    record = await run_io(load_offer_template, job_title)
+    if record is not None:
+        # Template files can also be edited by hand, so check them on the way in
+        validate_template(record["template"])
+        return record["template"]
+    lock = _template_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        record = await run_io(load_offer_template, job_title)
+        if record is None:
+            text = (await get_llm_response(build_offer_template_prompt(job_title), task="offer_letter")).strip()
+            try:
+                validate_template(text)
+            except ValueError as e:
+                raise ValueError(f"The drafted template for '{job_title}' was unusable: {e}") from None
+            record = await run_io(save_offer_template, job_title, text, "llm")
+    _template_locks.pop(key, None)
+    return record["template"]
+
+
+def render_offer(template_text, values):
+    return Template(template_text).substitute(values)
+
+
+def offer_docx_bytes(text):
+    """
+    Lays out a rendered letter as a DOCX document, one paragraph per block of text.
+    """
+    import docx
+    document = docx.Document()
+    for block in re.split(r"\n\s*\n", text.strip()):
+        paragraph = document.add_paragraph()
+        lines = block.split("\n")
+        for n, line in enumerate(lines):
+            run = paragraph.add_run(line.strip())
+            if n + 1 < len(lines):
+                run.add_break()
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def render_offer_files(jobs, file_format):
+    """
+    Renders [(filename, template_text, values)] into [(filename, bytes)]. Runs in the CPU pool.
+    """
+    files = []
+    for filename, template_text, values in jobs:
+        text = render_offer(template_text, values)
+        files.append((f"{filename}.{file_format}", offer_docx_bytes(text) if file_format == "docx" else text.encode("utf-8")))
+    return files
+
+
+async def generate_offer_letter(details):
+    """
+    Generates an offer letter from the job title's template.
+    Raises ValueError on invalid details.
+    """
+    values = validate_offer_details(details)
+    return render_offer(await get_offer_template(values["job_title"]), values)
+
+
+async def generate_offer_document(details):
+    """
+    Generates an offer letter as DOCX bytes.
+    """
+    return await run_cpu(offer_docx_bytes, await generate_offer_letter(details))
+
+
+async def stream_offer_letter(details):
+    """
+    Yields the rendered offer letter. Templates render in one piece, so this
+    is a single chunk once the template is available.
+    """
+    yield await generate_offer_letter(details)
+
+
+def _offer_filename(number, candidate_name):
+    return f"{number:04d}_{re.sub(r'[^A-Za-z0-9]+', '_', candidate_name).strip('_') or 'candidate'}"
+
+
+def _read_offer_rows(data):
+    text = data.decode("utf-8-sig")
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames:
+        raise ValueError("The CSV is empty.")
+    columns = {name.strip().lower().replace(" ", "_") for name in reader.fieldnames if name}
+    missing = [field for field in OFFER_FIELDS if field not in columns]
+    if missing:
+        raise ValueError(f"The CSV is missing columns: {', '.join(missing)}.")
+    rows = []
+    for row in reader:
+        # DictReader puts the fields past the header under None (e.g. an unquoted "120,000");
+        # the marker is kept so the row is reported instead of parsed
+        extra = row.pop(None, None)
+        cleaned = {(key or "").strip().lower().replace(" ", "_"): (value or "").strip() for key, value in row.items()}
+        if extra is not None:
+            cleaned[None] = extra
+        rows.append(cleaned)
+        if len(rows) > OFFER_BULK_MAX_ROWS:
+            raise ValueError(f"A bulk request may contain at most {OFFER_BULK_MAX_ROWS} offers.")
+    if not rows:
+        raise ValueError("The CSV has no offers.")
+    return rows
+
+
+def _write_zip(files, errors):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for filename, content in files:
+            # DOCX files are already compressed
+            archive.writestr(filename, content, zipfile.ZIP_STORED if filename.endswith(".docx") else zipfile.ZIP_DEFLATED)
+        if errors:
+            archive.writestr("errors.json", json.dumps(errors, indent=2), zipfile.ZIP_DEFLATED)
+    return buffer.getvalue()
+
+
+async def generate_offer_letters_bulk(csv_bytes, file_format="txt"):
+    """
+    Renders one offer letter per CSV row (columns named like the offer fields,
+    plus an optional company_name) and returns (zip_bytes, generated, errors).
+    The LLM runs at most once per job title without a template; rows that
+    fail validation are listed in errors.json inside the zip.
+    Raises ValueError if the CSV itself is unusable.
+    """
+    if file_format not in OFFER_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(OFFER_FORMATS)}.")
+    set_llm_priority(PRIORITY_BATCH)
+    rows = _read_offer_rows(csv_bytes)
+
+    errors = []
+    offers = []
+    for number, row in enumerate(rows, start=1):
+        try:
+            if None in row:
+                raise ValueError("Too many columns; quote values that contain commas, e.g. \"120,000\".")
+            offers.append((number, validate_offer_details(row)))
+        except ValueError as e:
+            errors.append({"row": number, "candidate_name": row.get("candidate_name", ""), "error": str(e)})
+
+    titles = {values["job_title"] for _, values in offers}
+    fetched = await asyncio.gather(*(get_offer_template(title) for title in titles), return_exceptions=True)
+    templates = {}
+    for title, result in zip(titles, fetched):
+        if isinstance(result, Exception):
+            # One bad title should not sink the other offers
+            errors.append({"job_title": title, "error": f"No template available: {result}"})
+        else:
+            templates[title] = result
+
+    jobs = [
+        (_offer_filename(number, values["candidate_name"]), templates[values["job_title"]], values)
+        for number, values in offers if values["job_title"] in templates
+    ]
+    skipped = [number for number, values in offers if values["job_title"] not in templates]
+    for number in skipped:
+        errors.append({"row": number, "candidate_name": rows[number - 1].get("candidate_name", ""), "error": "No template for this job title."})
+    chunks = [jobs[start:start + OFFER_RENDER_CHUNK] for start in range(0, len(jobs), OFFER_RENDER_CHUNK)]
+    rendered = await asyncio.gather(*(run_cpu(render_offer_files, chunk, file_format) for chunk in chunks))
+    files = [item for chunk in rendered for item in chunk]
+    errors.sort(key=lambda error: error.get("row", 0))
+    return await run_io(_write_zip, files, errors), len(files), errors
@@ -1,35 +1,56 @@
-from ..helpers.llm_helper import get_groq_response
-import fitz # PyMuPDF
-import docx
+from ..helpers.llm_helper import get_llm_response
+from ..helpers.llm_scheduler import LLMError
+from ..helpers.executor import run_io, ExecutorSaturatedError
+from ..helpers.text_cache import load_document
+from ..helpers.retrieval import retrieve_context
+from ..helpers.embeddings import embed_query
+from ..helpers.semantic_cache import lookup_answer, store_answer
+from ..helpers.prompt_budget import PromptSlot, fit_prompt, record_prompt_budget
 
-def answer_onboarding_question(onboarding_guide_path, question):
+# Tokens kept free for the answer.
+ONBOARDING_OUTPUT_TOKENS = 1024
+
+def build_onboarding_prompt(guide_text, question):
+    """
+    Builds the question-answering prompt around the retrieved guide text.
+    """
+    return f"""
+    You are an Onboarding Assistant for new hires. Answer the following question based on the provided onboarding guide.
+    Be friendly and helpful.
+
+    Onboarding Guide:
+    {guide_text}
+
+    New Hire's Question:
+    {question}
+    """
+
+async def answer_onboarding_question(onboarding_guide, question):
     """
     Answers a new hire's question based on an onboarding guide.
     """
     try:
-        if onboarding_guide_path.endswith(".pdf"):
-            with fitz.open(onboarding_guide_path) as doc:
-                guide_text = ""
-                for page in doc:
-                    guide_text += page.get_text()
-        elif onboarding_guide_path.endswith(".docx"):
-            doc = docx.Document(onboarding_guide_path)
-            guide_text = "\n".join([para.text for para in doc.paragraphs])
-        else:
-            with open(onboarding_guide_path, 'r') as f:
-                guide_text = f.read()
-
-        prompt = f"""
-        You are an Onboarding Assistant for new hires. Answer the following question based on the provided onboarding guide.
-        Be friendly and helpful.
+        doc = await load_document(onboarding_guide)
+        question_vector = await embed_query(question)
+        # Reuse the answer to an earlier, similarly worded question about the same document
+        cached = lookup_answer("onboarding", doc, question_vector)
+        if cached is not None:
+            return cached
 
-        Onboarding Guide:
-        {guide_text}
+        # Only the sections relevant to the question go into the prompt
+        guide_text = await retrieve_context(doc, question, query_vector=question_vector)
 
-        New Hire's Question:
-        {question}
-        """
-        response = get_groq_response(prompt)
+        prompt, reports = await run_io(
+            fit_prompt,
+            build_onboarding_prompt,
+            {"guide_text": PromptSlot(guide_text, weight=4), "question": PromptSlot(question)},
+            ONBOARDING_OUTPUT_TOKENS,
+        )
+        record_prompt_budget("onboarding_qa", reports)
+        response = await get_llm_response(prompt, task="onboarding_qa")
+        store_answer("onboarding", doc, question, question_vector, response)
         return response
+    except (ExecutorSaturatedError, LLMError):
+        raise
     except Exception as e:
         return f"An error occurred: {e}"
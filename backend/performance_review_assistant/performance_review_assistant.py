@@ -1,8 +1,8 @@
-from ..helpers.llm_helper import get_groq_response
+from ..helpers.llm_helper import get_llm_response, stream_llm_response
 
-def generate_performance_review(points, employee_name, review_period):
+def build_performance_review_prompt(points, employee_name, review_period):
     """
-    Drafts a structured performance review from bullet points.
+    Builds the performance review prompt.
     """
     prompt = f"""
     Act as an experienced HR manager. Your task is to convert a list of bullet points into a well-structured, constructive, and professional performance review.
@@ -22,5 +22,18 @@ def generate_performance_review(points, employee_name, review_period):
 
     The tone should be balanced, supportive, and professional.
     """
-    response = get_groq_response(prompt)
+    return prompt
+
+async def generate_performance_review(points, employee_name, review_period):
+    """
+    Drafts a structured performance review from bullet points.
+    """
+    prompt = build_performance_review_prompt(points, employee_name, review_period)
+    response = await get_llm_response(prompt, task="performance_review")
     return response
+
+def stream_performance_review(points, employee_name, review_period):
+    """
+    Streams a performance review token by token.
+    """
+    return stream_llm_response(build_performance_review_prompt(points, employee_name, review_period), task="performance_review")
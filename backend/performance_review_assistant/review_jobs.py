@@ -0,0 +1,313 @@
+import os
+import io
+import re
+import csv
+import json
+import time
+import uuid
+import asyncio
+import logging
+import zipfile
+
+try:
+    import fcntl
+except ImportError: # Windows: a single worker is assumed to run the jobs
+    fcntl = None
+
+from ..helpers.executor import run_io, ExecutorSaturatedError
+from ..helpers.llm_scheduler import set_llm_priority, LLMError, PRIORITY_BATCH
+from .performance_review_assistant import generate_performance_review
+
+logger = logging.getLogger(__name__)
+
+# Each job is a directory: job.json (settings and status), items.json (the input) and one
+# reviews/NNNNN.json checkpoint per finished review, so a restarted job skips what is done.
+REVIEW_JOBS_DIR = os.environ.get("REVIEW_JOBS_DIR", "review_jobs")
+# Reviews generated at once across all bulk jobs; the LLM scheduler still paces the actual calls.
+REVIEW_JOB_CONCURRENCY = int(os.environ.get("REVIEW_JOB_CONCURRENCY", "4"))
+REVIEW_BULK_MAX_ROWS = int(os.environ.get("REVIEW_BULK_MAX_ROWS", "2000"))
+# Times a review throttled by the LLM quota or a saturated pool is retried after its Retry-After.
+REVIEW_JOB_THROTTLE_RETRIES = int(os.environ.get("REVIEW_JOB_THROTTLE_RETRIES", "5"))
+REVIEW_FIELDS = ("employee_name", "review_period", "points")
+
+_running = {}
+_job_slots = None
+
+
+def _job_dir(job_id):
+    if not re.fullmatch(r"[0-9a-f]{32}", job_id):
+        raise ValueError("Invalid job id.")
+    return os.path.join(REVIEW_JOBS_DIR, job_id)
+
+
+def _write_json(path, data):
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def _read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def parse_review_items(data, filename=None):
+    """
+    Reads review requests from a CSV with employee_name, review_period and
+    points columns, or a JSON list of objects with those keys. Raises
+    ValueError listing the rows that are incomplete.
+    """
+    text = data.decode("utf-8-sig")
+    if (filename or "").lower().endswith(".json") or text.lstrip().startswith("["):
+        try:
+            rows = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"The JSON could not be parsed: {e}") from None
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("The JSON must be a list of objects.")
+    else:
+        reader = csv.DictReader(io.StringIO(text))
+        columns = {(name or "").strip().lower().replace(" ", "_") for name in reader.fieldnames or []}
+        missing = [field for field in REVIEW_FIELDS if field not in columns]
+        if missing:
+            raise ValueError(f"The CSV is missing columns: {', '.join(missing)}.")
+        rows = [{(key or "").strip().lower().replace(" ", "_"): value for key, value in row.items()} for row in reader]
+
+    if not rows:
+        raise ValueError("There are no reviews to generate.")
+    if len(rows) > REVIEW_BULK_MAX_ROWS:
+        raise ValueError(f"A bulk job may contain at most {REVIEW_BULK_MAX_ROWS} reviews.")
+    items = []
+    incomplete = []
+    for number, row in enumerate(rows, start=1):
+        item = {field: str(row.get(field) or "").strip() for field in REVIEW_FIELDS}
+        if not all(item.values()):
+            incomplete.append(str(number))
+        items.append(item)
+    if incomplete:
+        raise ValueError(f"Rows missing employee_name, review_period or points: {', '.join(incomplete[:20])}{'...' if len(incomplete) > 20 else ''}.")
+    return items
+
+
+def _create_job_files(items):
+    job_id = uuid.uuid4().hex
+    job_dir = _job_dir(job_id)
+    os.makedirs(os.path.join(job_dir, "reviews"))
+    _write_json(os.path.join(job_dir, "items.json"), items)
+    _write_json(os.path.join(job_dir, "job.json"), {"id": job_id, "created_at": time.time(), "total": len(items), "status": "running"})
+    return job_id
+
+
+def _lock_job(job_id):
+    # Only one worker process runs a given job; the others see it as taken
+    handle = open(os.path.join(_job_dir(job_id), "lock"), "a")
+    if fcntl is not None:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return None
+    return handle
+
+
+def _completed_indexes(job_id):
+    names = os.listdir(os.path.join(_job_dir(job_id), "reviews"))
+    return {int(name[:-5]) for name in names if name.endswith(".json")}
+
+
+def _save_review(job_id, index, item, review, seconds):
+    _write_json(os.path.join(_job_dir(job_id), "reviews", f"{index:05d}.json"), {
+        "index": index,
+        "employee_name": item["employee_name"],
+        "review_period": item["review_period"],
+        "review": review,
+        "seconds": round(seconds, 2),
+        "completed_at": time.time(),
+    })
+
+
+def _set_status(job_id, status, errors=None):
+    path = os.path.join(_job_dir(job_id), "job.json")
+    job = _read_json(path)
+    job["status"] = status
+    if errors is not None:
+        job["errors"] = errors
+    job["updated_at"] = time.time()
+    _write_json(path, job)
+
+
+async def _run_job(job_id, lock_handle):
+    global _job_slots
+    if _job_slots is None:
+        _job_slots = asyncio.Semaphore(REVIEW_JOB_CONCURRENCY)
+    set_llm_priority(PRIORITY_BATCH)
+    progress = _running[job_id]
+    try:
+        items = await run_io(_read_json, os.path.join(_job_dir(job_id), "items.json"))
+        done = await run_io(_completed_indexes, job_id)
+        pending = [index for index in range(len(items)) if index not in done]
+        progress.update(completed_before=len(done), completed=0, started_at=time.time(), errors={})
+
+        async def review(index):
+            item = items[index]
+            for attempt in range(REVIEW_JOB_THROTTLE_RETRIES + 1):
+                async with _job_slots:
+                    started = time.monotonic()
+                    try:
+                        text = await generate_performance_review(item["points"], item["employee_name"], item["review_period"])
+                        await run_io(_save_review, job_id, index, item, text, time.monotonic() - started)
+                        progress["completed"] += 1
+                        return
+                    except (LLMError, ExecutorSaturatedError) as e:
+                        if e.retry_after is None or attempt == REVIEW_JOB_THROTTLE_RETRIES:
+                            progress["errors"][index] = f"An error occurred: {e}"
+                            return
+                        retry_after = e.retry_after
+                    except Exception as e:
+                        # Left without a checkpoint, so resuming the job retries it
+                        progress["errors"][index] = f"An error occurred: {e}"
+                        return
+                # Throttled: wait outside the slot so other reviews keep going, then try again
+                await asyncio.sleep(retry_after)
+
+        await asyncio.gather(*(review(index) for index in pending))
+        errors = [{"index": index, "employee_name": items[index]["employee_name"], "error": error} for index, error in sorted(progress["errors"].items())]
+        await run_io(_set_status, job_id, "completed_with_errors" if errors else "completed", errors)
+        logger.info("Review job %s finished: %d generated, %d failed", job_id, progress["completed"], len(errors))
+    except asyncio.CancelledError:
+        # Shutdown: the job stays "running" on disk and resumes on the next start
+        raise
+    except Exception as e:
+        logger.error("Review job %s failed: %s", job_id, e)
+        await run_io(_set_status, job_id, "failed", [{"error": str(e)}])
+    finally:
+        _running.pop(job_id, None)
+        lock_handle.close()
+
+
+async def _start_job(job_id):
+    if job_id in _running:
+        return True
+    lock_handle = await run_io(_lock_job, job_id)
+    if lock_handle is None:
+        return False
+    _running[job_id] = {"completed_before": 0, "completed": 0, "started_at": time.time(), "errors": {}}
+    _running[job_id]["task"] = asyncio.create_task(_run_job(job_id, lock_handle))
+    return True
+
+
+async def create_review_job(data, filename=None):
+    """
+    Starts a bulk review job from an uploaded CSV or JSON and returns its status.
+    Raises ValueError on unusable input.
+    """
+    items = parse_review_items(data, filename)
+    job_id = await run_io(_create_job_files, items)
+    await _start_job(job_id)
+    return await get_review_job(job_id)
+
+
+def _list_resumable_jobs():
+    if not os.path.isdir(REVIEW_JOBS_DIR):
+        return []
+    resumable = []
+    for job_id in os.listdir(REVIEW_JOBS_DIR):
+        path = os.path.join(REVIEW_JOBS_DIR, job_id, "job.json")
+        if os.path.exists(path) and _read_json(path)["status"] == "running":
+            resumable.append(job_id)
+    return resumable
+
+
+async def resume_review_jobs():
+    """
+    Restarts jobs that were interrupted mid-run. Called from the app lifespan.
+    """
+    for job_id in await run_io(_list_resumable_jobs):
+        if await _start_job(job_id):
+            logger.info("Resuming review job %s", job_id)
+
+
+async def retry_review_job(job_id):
+    """
+    Re-runs the reviews of a finished job that have no checkpoint yet.
+    Returns None if the job does not exist.
+    """
+    job = await get_review_job(job_id)
+    if job is None or job["status"] == "running":
+        return job
+    await run_io(_set_status, job_id, "running", [])
+    await _start_job(job_id)
+    return await get_review_job(job_id)
+
+
+def stop_review_jobs():
+    for progress in list(_running.values()):
+        progress["task"].cancel()
+
+
+async def get_review_job(job_id):
+    """
+    Returns a job's status with progress and an ETA based on this run's throughput, or None.
+    """
+    path = os.path.join(_job_dir(job_id), "job.json")
+    if not await run_io(os.path.exists, path):
+        return None
+    job = await run_io(_read_json, path)
+    progress = _running.get(job_id)
+    if progress is not None:
+        completed = progress["completed_before"] + progress["completed"]
+        failed = len(progress["errors"])
+        elapsed = time.time() - progress["started_at"]
+        remaining = job["total"] - completed - failed
+        rate = progress["completed"] / elapsed if elapsed > 0 else 0
+        eta = round(remaining / rate) if rate > 0 else None
+    else:
+        completed = len(await run_io(_completed_indexes, job_id))
+        failed = len(job.get("errors", []))
+        eta = 0 if job["status"] != "running" else None
+    return {
+        "id": job_id,
+        "status": job["status"],
+        "total": job["total"],
+        "completed": completed,
+        "failed": failed,
+        "percent": round(100 * completed / job["total"], 1),
+        "eta_seconds": eta,
+        "created_at": job["created_at"],
+        "errors": job.get("errors", [])[:50] if progress is None else [],
+    }
+
+
+def _review_filename(index, employee_name):
+    return f"{index + 1:04d}_{re.sub(r'[^A-Za-z0-9]+', '_', employee_name).strip('_') or 'employee'}.txt"
+
+
+def build_review_archive(job_id):
+    """
+    Zips every finished review of a job (a partial job gives a partial zip).
+    Returns (zip_bytes, count). Runs in the I/O pool.
+    """
+    reviews_dir = os.path.join(_job_dir(job_id), "reviews")
+    job = _read_json(os.path.join(_job_dir(job_id), "job.json"))
+    buffer = io.BytesIO()
+    count = 0
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name in sorted(os.listdir(reviews_dir)):
+            if not name.endswith(".json"):
+                continue
+            record = _read_json(os.path.join(reviews_dir, name))
+            header = f"Performance Review: {record['employee_name']}\nReview Period: {record['review_period']}\n\n"
+            archive.writestr(_review_filename(record["index"], record["employee_name"]), header + record["review"])
+            count += 1
+        if job.get("errors"):
+            archive.writestr("errors.json", json.dumps(job["errors"], indent=2))
+    return buffer.getvalue(), count
+
+
+async def export_review_job(job_id):
+    """
+    Returns (zip_bytes, count) for a job, or None if it does not exist.
+    """
+    if not await run_io(os.path.exists, os.path.join(_job_dir(job_id), "job.json")):
+        return None
+    return await run_io(build_review_archive, job_id)
@@ -1,35 +1,56 @@
-from ..helpers.llm_helper import get_groq_response
-import fitz # PyMuPDF
-import docx
+from ..helpers.llm_helper import get_llm_response
+from ..helpers.llm_scheduler import LLMError
+from ..helpers.executor import run_io, ExecutorSaturatedError
+from ..helpers.text_cache import load_document
+from ..helpers.retrieval import retrieve_context
+from ..helpers.embeddings import embed_query
+from ..helpers.semantic_cache import lookup_answer, store_answer
+from ..helpers.prompt_budget import PromptSlot, fit_prompt, record_prompt_budget
 
-def answer_policy_question(policy_doc_path, question):
+# Tokens kept free for the answer.
+POLICY_OUTPUT_TOKENS = 1024
+
+def build_policy_prompt(policy_text, question):
+    """
+    Builds the question-answering prompt around the retrieved policy text.
+    """
+    return f"""
+    You are an HR Policy Q&A Assistant. Answer the following question based *only* on the provided policy document.
+    If the answer is not in the document, state that.
+
+    Policy Document:
+    {policy_text}
+
+    Question:
+    {question}
+    """
+
+async def answer_policy_question(policy_doc, question):
     """
     Answers a question based on a policy document.
     """
     try:
-        if policy_doc_path.endswith(".pdf"):
-            with fitz.open(policy_doc_path) as doc:
-                policy_text = ""
-                for page in doc:
-                    policy_text += page.get_text()
-        elif policy_doc_path.endswith(".docx"):
-            doc = docx.Document(policy_doc_path)
-            policy_text = "\n".join([para.text for para in doc.paragraphs])
-        else:
-            with open(policy_doc_path, 'r') as f:
-                policy_text = f.read()
-
-        prompt = f"""
-        You are an HR Policy Q&A Assistant. Answer the following question based *only* on the provided policy document.
-        If the answer is not in the document, state that.
+        doc = await load_document(policy_doc)
+        question_vector = await embed_query(question)
+        # Reuse the answer to an earlier, similarly worded question about the same document
+        cached = lookup_answer("policy", doc, question_vector)
+        if cached is not None:
+            return cached
 
-        Policy Document:
-        {policy_text}
+        # Only the sections relevant to the question go into the prompt
+        policy_text = await retrieve_context(doc, question, query_vector=question_vector)
 
-        Question:
-        {question}
-        """
-        response = get_groq_response(prompt)
+        prompt, reports = await run_io(
+            fit_prompt,
+            build_policy_prompt,
+            {"policy_text": PromptSlot(policy_text, weight=4), "question": PromptSlot(question)},
+            POLICY_OUTPUT_TOKENS,
+        )
+        record_prompt_budget("policy_qa", reports)
+        response = await get_llm_response(prompt, task="policy_qa")
+        store_answer("policy", doc, question, question_vector, response)
         return response
+    except (ExecutorSaturatedError, LLMError):
+        raise
     except Exception as e:
         return f"An error occurred: {e}"
@@ -0,0 +1,248 @@
+import os
+import re
+import logging
+
+from .skills import find_skills, normalize_skill
+
+logger = logging.getLogger(__name__)
+
+# Bump when parsing rules change so stored parses are recomputed.
+ATS_PARSER_VERSION = "1"
+# spaCy is optional here: with a model installed it confirms names and locations, without one the regexes stand alone.
+SPACY_MODEL = os.environ.get("SPACY_MODEL", "en_core_web_sm")
+
+SECTION_ALIASES = {
+    "summary": ["summary", "professional summary", "profile", "professional profile", "about me", "objective", "career objective"],
+    "experience": ["experience", "work experience", "professional experience", "employment", "employment history", "work history", "career history"],
+    "education": ["education", "academic background", "academics", "education and training", "qualifications"],
+    "skills": ["skills", "technical skills", "core skills", "key skills", "core competencies", "competencies", "technologies", "tools"],
+    "other": ["projects", "certifications", "awards", "publications", "languages", "interests", "hobbies", "references", "volunteering", "volunteer experience"],
+}
+_HEADINGS = {alias: section for section, aliases in SECTION_ALIASES.items() for alias in aliases}
+
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
+_MONTH_LOOKUP = {m[:3].lower(): m for m in MONTHS}
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+PHONE_RE = re.compile(r"(?<![\w+])(?:\+?\d{1,3}[\s.-]?)?(?:\(\d{2,4}\)[\s.-]?)?\d{2,5}[\s.-]?\d{3,4}(?:[\s.-]?\d{3,4})?(?!\w)")
+LOCATION_RE = re.compile(r"\b([A-Z][a-zA-Z.]+(?:[ -][A-Z][a-zA-Z.]+)*),\s*([A-Z]{2}|[A-Z][a-zA-Z]+(?: [A-Z][a-zA-Z]+)*)\b")
+_DATE = r"(?:(?P<{0}m>Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|June?|July?|Aug(?:ust)?|Sep(?:t(?:ember)?)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)\.?\s+|(?P<{0}n>\d{{1,2}})/)?(?P<{0}y>(?:19|20)\d{{2}})"
+DATE_RANGE_RE = re.compile(
+    _DATE.format("s") + r"\s*(?:-|–|—|to|until)\s*(?:" + _DATE.format("e") + r"|(?P<present>present|current|now|today|date))",
+    re.IGNORECASE,
+)
+DEGREE_RE = re.compile(
+    r"\b(Bachelor(?:'s)?|Master(?:'s)?|Doctor(?:ate)?|Ph\.?\s?D|MBA|M\.?B\.?A|B\.?\s?Tech|M\.?\s?Tech|B\.?\s?Sc|M\.?\s?Sc|B\.?S\.?|M\.?S\.?|B\.?A\.?|M\.?A\.?|B\.?E\.?|M\.?E\.?|B\.?Com|M\.?Com|Associate(?:'s)?|Diploma|High School)\b"
+)
+INSTITUTION_RE = re.compile(r"(?:[A-Z][\w.&'-]*\s+)*(?:University|College|Institute|School|Academy|Polytechnic)\b(?:\s+of\s+[A-Z][\w.&' -]*)?")
+YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+_BULLET_RE = re.compile(r"^\s*(?:[-•*▪●◦‣–]|\d+[.)])\s*")
+_TITLE_COMPANY_SEPARATORS = re.compile(r"\s+(?:at|@)\s+|\s*[|,–—]\s*|\s+-\s+")
+
+_nlp = None
+_nlp_failed = False
+
+
+def _get_nlp():
+    global _nlp, _nlp_failed
+    if _nlp is None and not _nlp_failed:
+        try:
+            import spacy
+            _nlp = spacy.load(SPACY_MODEL, disable=["parser", "lemmatizer", "tagger", "attribute_ruler"])
+        except Exception as e:
+            _nlp_failed = True
+            logger.info("spaCy model '%s' unavailable (%s); parsing with regexes only.", SPACY_MODEL, e)
+    return _nlp
+
+
+def _heading_section(line):
+    cleaned = re.sub(r"[^a-z &]", "", line.lower()).strip()
+    if not cleaned or len(cleaned.split()) > 4:
+        return None
+    return _HEADINGS.get(cleaned)
+
+
+def split_resume_sections(text):
+    """
+    Returns {"header": [...], "summary": [...], "experience": [...], ...} of
+    non-empty lines, keyed by the canonical section each line falls under.
+    """
+    sections = {"header": []}
+    current = "header"
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        section = _heading_section(stripped)
+        if section is not None:
+            current = section
+            sections.setdefault(current, [])
+            continue
+        sections.setdefault(current, []).append(stripped)
+    return sections
+
+
+def _format_date(month, number, year):
+    if month:
+        return f"{_MONTH_LOOKUP[month.lower().rstrip('.')[:3]]} {year}"
+    if number and 1 <= int(number) <= 12:
+        return f"{MONTHS[int(number) - 1]} {year}"
+    return year
+
+
+def _parse_contact(header_lines, text, entities):
+    emails = EMAIL_RE.findall(text)
+    phones = [p.strip() for p in PHONE_RE.findall("\n".join(header_lines[:8]) or text) if len(re.sub(r"\D", "", p)) >= 7]
+    contact = {"name": "", "email": emails[0] if emails else "", "phone": phones[0] if phones else "", "location": ""}
+    low = []
+
+    for line in header_lines[:5]:
+        words = line.split()
+        if (
+            2 <= len(words) <= 4
+            and not any(ch.isdigit() for ch in line)
+            and not EMAIL_RE.search(line)
+            and all(w[0].isupper() for w in words if w[0].isalpha())
+        ):
+            contact["name"] = line.title() if line.isupper() else line
+            break
+    people = entities.get("PERSON", [])
+    if not contact["name"] and people:
+        contact["name"] = people[0]
+    elif contact["name"] and entities and contact["name"] not in people:
+        low.append("contact_info.name") # spaCy disagrees with the layout heuristic
+
+    for line in header_lines[:8]:
+        match = LOCATION_RE.search(EMAIL_RE.sub("", line))
+        if match:
+            contact["location"] = match.group(0)
+            break
+    if not contact["location"] and entities.get("GPE"):
+        contact["location"] = entities["GPE"][0]
+
+    for field in ("name", "email", "phone", "location"):
+        if not contact[field] and f"contact_info.{field}" not in low:
+            low.append(f"contact_info.{field}")
+    return contact, low
+
+
+def _split_title_company(parts):
+    parts = [p.strip() for text in parts for p in _TITLE_COMPANY_SEPARATORS.split(text) if p and p.strip()]
+    return (parts[0] if parts else ""), (parts[1] if len(parts) > 1 else "")
+
+
+def _parse_experience(lines):
+    """
+    Splits the experience section into jobs at each date range. The rest of
+    the date line, plus up to two plain lines just above it, give the title
+    and company; the lines after it, up to the next job's heading, are its
+    responsibilities.
+    """
+    anchors = [i for i, line in enumerate(lines) if DATE_RANGE_RE.search(line)]
+    headings = []
+    for n, i in enumerate(anchors):
+        text = DATE_RANGE_RE.sub("", lines[i]).strip(" |,–—-()")
+        needed = 0 if text and _TITLE_COMPANY_SEPARATORS.search(text) else (1 if text else 2)
+        start = i
+        floor = anchors[n - 1] + 1 if n > 0 else 0
+        while needed and start - 1 >= floor and not _BULLET_RE.match(lines[start - 1]) and len(lines[start - 1]) < 80:
+            start -= 1
+            needed -= 1
+        headings.append((start, lines[start:i] + ([text] if text else [])))
+
+    jobs = []
+    for n, i in enumerate(anchors):
+        match = DATE_RANGE_RE.search(lines[i])
+        end = "Present" if match.group("present") else _format_date(match.group("em"), match.group("en"), match.group("ey"))
+        title, company = _split_title_company(headings[n][1])
+        body_end = headings[n + 1][0] if n + 1 < len(anchors) else len(lines)
+        jobs.append({
+            "job_title": title,
+            "company": company,
+            "start_date": _format_date(match.group("sm"), match.group("sn"), match.group("sy")),
+            "end_date": end,
+            "responsibilities": [_BULLET_RE.sub("", l).strip() for l in lines[i + 1:body_end] if len(l) > 3],
+        })
+    return jobs
+
+
+def _parse_education(lines):
+    degree_lines = [i for i, line in enumerate(lines) if DEGREE_RE.search(line)]
+    entries = []
+    for n, i in enumerate(degree_lines):
+        # An entry is its degree line plus up to two lines before the next degree
+        stop = degree_lines[n + 1] if n + 1 < len(degree_lines) else len(lines)
+        window = lines[i:min(i + 3, stop)]
+        institution = next((m.group(0).strip(" ,") for l in window for m in [INSTITUTION_RE.search(l)] if m), "")
+        years = next((found for l in window for found in [YEAR_RE.findall(l)] if found), [])
+        degree = re.split(r"\s*[|,–—]\s*|\s+-\s+", lines[i])[0].strip()
+        if institution and institution in degree:
+            degree = degree.replace(institution, "").strip(" ,-")
+        entries.append({
+            "degree": degree or DEGREE_RE.search(lines[i]).group(0),
+            "institution": institution,
+            "graduation_date": max(years) if years else "",
+        })
+    return entries
+
+
+def _parse_skills(lines, text):
+    listed = []
+    for line in lines:
+        for item in re.split(r"[,;|•·/]|\s{2,}|:\s", _BULLET_RE.sub("", line)):
+            item = item.strip()
+            if item and len(item.split()) <= 4 and not item.endswith(":"):
+                listed.append(normalize_skill(item))
+    skills = []
+    seen = set()
+    for skill in listed + find_skills(text):
+        if skill.lower() not in seen:
+            seen.add(skill.lower())
+            skills.append(skill)
+    return skills
+
+
+def parse_resume(text):
+    """
+    Parses a resume into the `ats_parsing` schema without the LLM.
+
+    Returns (ats_parsing, low_confidence) where low_confidence lists the
+    fields the parser could not fill reliably (e.g. "contact_info.location",
+    "work_experience"), for the LLM to complete. Runs in the CPU pool.
+    """
+    sections = split_resume_sections(text)
+    header = sections.get("header", [])
+    entities = {}
+    nlp = _get_nlp()
+    if nlp is not None:
+        for ent in nlp("\n".join(header[:10]) or text[:1000]).ents:
+            entities.setdefault(ent.label_, []).append(ent.text.strip())
+
+    contact, low = _parse_contact(header, text, entities)
+
+    summary_lines = sections.get("summary", [])
+    summary = " ".join(summary_lines)
+    if not summary:
+        low.append("professional_summary")
+
+    jobs = _parse_experience(sections.get("experience", []))
+    complete = [job for job in jobs if job["job_title"] and job["company"]]
+    if not jobs or len(complete) < len(jobs):
+        low.append("work_experience")
+
+    education = _parse_education(sections.get("education", []))
+    if not education or any(not entry["institution"] for entry in education):
+        low.append("education")
+
+    skills = _parse_skills(sections.get("skills", []), text)
+    if not skills:
+        low.append("skills")
+
+    ats_parsing = {
+        "contact_info": contact,
+        "professional_summary": summary,
+        "work_experience": jobs,
+        "education": education,
+        "skills": skills,
+    }
+    return ats_parsing, low
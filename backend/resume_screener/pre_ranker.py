@@ -0,0 +1,64 @@
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from ..helpers.embeddings import embed_texts
+
+PRESCREEN_METHODS = ("tfidf", "embedding", "hybrid")
+
+
+def tfidf_scores(jd_text, resume_texts):
+    """
+    Cosine similarity between the JD and each resume over TF-IDF vectors.
+    """
+    vectorizer = TfidfVectorizer(stop_words="english", sublinear_tf=True, ngram_range=(1, 2), max_features=50000)
+    try:
+        matrix = vectorizer.fit_transform([jd_text] + list(resume_texts))
+    except ValueError:
+        # Empty vocabulary: every document is blank or stop words only, so nothing is similar
+        return np.zeros(len(resume_texts))
+    # Rows are L2-normalized by the vectorizer, so the dot product is the cosine.
+    return (matrix[1:] @ matrix[0].T).toarray().ravel()
+
+
+def embedding_scores(jd_text, resume_texts):
+    """
+    Cosine similarity between the JD and each resume over sentence embeddings.
+    """
+    vectors = embed_texts([jd_text] + list(resume_texts))
+    return vectors[1:] @ vectors[0]
+
+
+def score_resumes(jd_text, resume_texts, method="tfidf"):
+    """
+    Returns a 0-100 local similarity score per resume. Runs in the CPU pool.
+    """
+    if not resume_texts:
+        return []
+    if method == "tfidf":
+        scores = tfidf_scores(jd_text, resume_texts)
+    elif method == "embedding":
+        scores = embedding_scores(jd_text, resume_texts)
+    elif method == "hybrid":
+        scores = 0.5 * tfidf_scores(jd_text, resume_texts) + 0.5 * embedding_scores(jd_text, resume_texts)
+    else:
+        raise ValueError(f"Unknown pre-screen method '{method}'. Use one of: {', '.join(PRESCREEN_METHODS)}.")
+    return np.round(100 * np.clip(scores, 0.0, 1.0), 2).tolist()
+
+
+def select_for_llm(scores, top_k=None, min_score=None):
+    """
+    Ranks resumes by local score and picks the ones worth an LLM call:
+    the best `top_k` and/or everything at or above `min_score`.
+    Returns (ranks, selected) where both are indexed like `scores`.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    order = np.argsort(-scores, kind="stable")
+    ranks = np.empty(len(scores), dtype=np.int64)
+    ranks[order] = np.arange(1, len(scores) + 1)
+
+    selected = np.ones(len(scores), dtype=bool)
+    if top_k is not None:
+        selected &= ranks <= top_k
+    if min_score is not None:
+        selected &= scores >= min_score
+    return ranks.tolist(), selected.tolist()
@@ -1,66 +1,407 @@
-from ..helpers.llm_helper import get_groq_response
-import fitz # PyMuPDF
+from ..helpers.llm_helper import get_llm_response
+from ..helpers.model_router import get_route
+from ..helpers.llm_scheduler import LLMError, set_llm_priority, PRIORITY_BATCH
+from ..helpers.executor import run_cpu, run_io, ExecutorSaturatedError
+from ..helpers.text_cache import load_document
+from ..helpers.prompt_budget import PromptSlot, fit_prompt, record_prompt_budget
+from .pre_ranker import score_resumes, select_for_llm
+from .ats_parser import parse_resume, ATS_PARSER_VERSION, DATE_RANGE_RE
+from ..candidate_store.candidate_store import artifact_version, load_artifact, save_artifact, remember_candidate, remember_jd
+import os
 import json
 import re
+import math
+import asyncio
+import logging
+from functools import partial
 
-# This is now the only function in this file, as it handles all resume screening tasks.
-def ats_and_fit_analysis(resume_path, jd_path):
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", "32"))
+# Tokens kept free for the fit analysis, and for each parsing gap the LLM is asked to fill.
+# The fit analysis lists matching and missing skills, which runs long for skill-heavy JDs.
+FIT_OUTPUT_TOKENS = 1024
+GAP_OUTPUT_TOKENS = {
+    "professional_summary": 192,
+    "education": 256,
+    "skills": 256,
+}
+CONTACT_GAP_OUTPUT_TOKENS = 32
+# Work experience grows with the number of jobs: each entry with its responsibilities.
+WORK_EXPERIENCE_TOKENS_PER_JOB = 256
+GAP_MAX_OUTPUT_TOKENS = int(os.environ.get("GAP_MAX_OUTPUT_TOKENS", "4096"))
+
+logger = logging.getLogger(__name__)
+
+# JSON shapes of the ats_parsing fields, for asking the LLM to fill the ones the local parser could not.
+GAP_SCHEMAS = {
+    "professional_summary": '"professional_summary": "string"',
+    "work_experience": '"work_experience": [ { "job_title": "string", "company": "string", "start_date": "string (Month YYYY)", "end_date": "string (Month YYYY or \'Present\')", "responsibilities": ["string", ...] } ]',
+    "education": '"education": [ { "degree": "string", "institution": "string", "graduation_date": "string (YYYY)" } ]',
+    "skills": '"skills": ["A comprehensive list of all skills found in the resume."]',
+}
+
+async def ats_and_fit_analysis(resume, jd):
     """
     Performs a comprehensive analysis including ATS parsing and a fit score against a JD.
     """
     try:
         # Extract text from resume and JD
-        with fitz.open(resume_path) as resume_doc:
-            resume_text = "".join(page.get_text() for page in resume_doc)
-        with fitz.open(jd_path) as jd_doc:
-            jd_text = "".join(page.get_text() for page in jd_doc)
-
-        prompt = f"""
-        You are a world-class Applicant Tracking System (ATS) with advanced analytical capabilities.
-        Your task is to perform a two-part analysis on the provided resume and job description.
-        Your response MUST be a single, valid JSON object and nothing else.
-
-        The required JSON structure is as follows:
-
-        {{
-          "fit_analysis": {{
-            "fit_score": "An integer between 0 and 100.",
-            "summary": "A brief one-paragraph summary of the candidate's suitability.",
-            "matching_skills": ["A list of key skills from the JD that the candidate possesses."],
-            "missing_skills": ["A list of key skills from the JD the candidate seems to be missing."]
-          }},
-          "ats_parsing": {{
-            "contact_info": {{ "name": "string", "email": "string", "phone": "string", "location": "string" }},
-            "professional_summary": "string",
-            "work_experience": [
-              {{ "job_title": "string", "company": "string", "start_date": "string (Month YYYY)", "end_date": "string (Month YYYY or 'Present')", "responsibilities": ["string", ...] }}
-            ],
-            "education": [
-              {{ "degree": "string", "institution": "string", "graduation_date": "string (YYYY)" }}
-            ],
-            "skills": ["A comprehensive list of all skills found in the resume."]
-          }}
-        }}
-
-        Perform this analysis on the following documents:
-        ---
-        RESUME:
-        {resume_text}
-        ---
-        JOB DESCRIPTION:
-        {jd_text}
-        ---
-        """
-        response = get_groq_response(prompt)
-
-        # Robust JSON Parsing
-        try:
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group(0))
+        resume_doc = await load_document(resume)
+        jd_doc = await load_document(jd)
+        return await analyze_resume(resume_doc, jd_doc, getattr(resume, "filename", None))
+    except (ExecutorSaturatedError, LLMError):
+        raise
+    except Exception as e:
+        return {"error": f"An unexpected error occurred during analysis: {e}"}
+
+async def ats_and_fit_analysis_progressive(resume, jd):
+    """
+    Like ats_and_fit_analysis, but yields each part of the result as soon as
+    it is ready: ("fit_analysis", ...), ("ats_parsing", ...) or ("error", message).
+    """
+    try:
+        resume_doc = await load_document(resume)
+        jd_doc = await load_document(jd)
+        async for part in analyze_resume_progressive(resume_doc, jd_doc, getattr(resume, "filename", None)):
+            yield part
+    except ExecutorSaturatedError:
+        raise
+    except Exception as e:
+        yield "error", f"An unexpected error occurred during analysis: {e}"
+
+async def ats_and_fit_analysis_batch(resumes, jd_doc, concurrency=BATCH_CONCURRENCY, top_k=None, min_score=None, prescreen_method="tfidf"):
+    """
+    Screens many resumes against one already extracted JD, yielding (index, result)
+    pairs as each finishes. At most `concurrency` resumes are processed at a time.
+
+    When `top_k` or `min_score` is given, every resume is first scored locally
+    and only the selected ones go to the LLM; the rest are reported with their
+    local pre-screen score alone.
+    """
+    # Screening calls queue behind interactive requests for the LLM quota
+    set_llm_priority(PRIORITY_BATCH)
+    semaphore = asyncio.Semaphore(max(1, min(concurrency, BATCH_MAX_CONCURRENCY)))
+    resume_docs = [None] * len(resumes)
+
+    async def extract(index, resume):
+        async with semaphore:
+            resume_docs[index] = await load_document(resume)
+
+    prescreen = {}
+    to_llm = range(len(resumes))
+    if top_k is not None or min_score is not None:
+        # Ranking needs every resume's text before the first LLM call
+        outcomes = await asyncio.gather(*(extract(i, r) for i, r in enumerate(resumes)), return_exceptions=True)
+        extracted = []
+        for index, outcome in enumerate(outcomes):
+            if isinstance(outcome, Exception):
+                # One bad resume must not take the rest of the batch down with it
+                yield index, {"error": f"An unexpected error occurred during analysis: {outcome}"}
+            else:
+                extracted.append(index)
+        scores = await run_cpu(score_resumes, jd_doc.text, [resume_docs[i].text for i in extracted], prescreen_method)
+        ranks, selected = select_for_llm(scores, top_k, min_score)
+        to_llm = []
+        for position, index in enumerate(extracted):
+            prescreen[index] = {"method": prescreen_method, "score": scores[position], "rank": ranks[position]}
+            if selected[position]:
+                to_llm.append(index)
+            else:
+                yield index, {"prescreen": prescreen[index], "screened_by": "local"}
+
+    async def screen(index):
+        # Without pre-ranking each resume is extracted in its own slot, so results stream from the start
+        async with semaphore:
+            try:
+                if resume_docs[index] is None:
+                    resume_docs[index] = await load_document(resumes[index])
+                result = await analyze_resume(resume_docs[index], jd_doc, getattr(resumes[index], "filename", None))
+            except Exception as e:
+                result = {"error": f"An unexpected error occurred during analysis: {e}"}
+        if index in prescreen:
+            result["prescreen"] = prescreen[index]
+        return index, result
+
+    tasks = [asyncio.create_task(screen(index)) for index in to_llm]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def _gap_schema(gaps):
+    contact = ", ".join(f'"{gap.split(".", 1)[1]}": "string"' for gap in gaps if gap.startswith("contact_info."))
+    fields = ["\"contact_info\": { " + contact + " }"] if contact else []
+    fields += [GAP_SCHEMAS[gap] for gap in gaps if gap in GAP_SCHEMAS]
+    return ",\n        ".join(fields)
+
+
+def _gap_output_tokens(gaps, resume_text, ats_parsing):
+    tokens = 0
+    for gap in gaps:
+        if gap == "work_experience":
+            # Date ranges find jobs the local parser could not split into complete entries
+            jobs = max(len(ats_parsing.get("work_experience") or []), len(DATE_RANGE_RE.findall(resume_text)), 1)
+            tokens += jobs * WORK_EXPERIENCE_TOKENS_PER_JOB
+        else:
+            tokens += GAP_OUTPUT_TOKENS.get(gap, CONTACT_GAP_OUTPUT_TOKENS)
+    return min(tokens, GAP_MAX_OUTPUT_TOKENS)
+
+
+def build_fit_prompt(resume_text, jd_text):
+    """
+    Builds the fit analysis prompt.
+    """
+    return f"""
+    You are a world-class Applicant Tracking System (ATS) with advanced analytical capabilities.
+    Your task is to assess how well the provided resume fits the job description.
+    Your response MUST be a single, valid JSON object and nothing else.
+
+    The required JSON structure is as follows:
+
+    {{
+      "fit_analysis": {{
+        "fit_score": "An integer between 0 and 100.",
+        "summary": "A brief one-paragraph summary of the candidate's suitability.",
+        "matching_skills": ["A list of key skills from the JD that the candidate possesses."],
+        "missing_skills": ["A list of key skills from the JD the candidate seems to be missing."]
+      }}
+    }}
+
+    Perform this analysis on the following documents:
+    ---
+    RESUME:
+    {resume_text}
+    ---
+    JOB DESCRIPTION:
+    {jd_text}
+    ---
+    """
+
+def build_gap_prompt(resume_text, gaps=()):
+    """
+    Builds the prompt that extracts the ats_parsing fields the local parser
+    flagged as low-confidence.
+    """
+    return f"""
+    You are a world-class Applicant Tracking System (ATS) resume parser.
+    Extract the requested fields from the resume below.
+    Your response MUST be a single, valid JSON object and nothing else.
+
+    The required JSON structure is as follows:
+
+    {{
+      "ats_parsing": {{
+        {_gap_schema(gaps)}
+      }}
+    }}
+
+    ---
+    RESUME:
+    {resume_text}
+    ---
+    """
+
+# Stored results made with other prompts, another parser or other models are recomputed.
+FIT_PROMPT_VERSION = artifact_version(build_fit_prompt("", ""))
+GAP_PROMPT_VERSION = artifact_version(ATS_PARSER_VERSION, build_gap_prompt("", ("contact_info.name",) + tuple(GAP_SCHEMAS)))
+
+def fit_analysis_version():
+    # Routes can be switched at runtime, so the models are read on every call
+    return artifact_version(FIT_PROMPT_VERSION, *get_route("resume_screening").models)
+
+def ats_parsing_version():
+    return artifact_version(GAP_PROMPT_VERSION, *get_route("resume_parsing").models)
+
+def _parse_json_response(response):
+    # Robust JSON Parsing
+    try:
+        json_match = re.search(r'\{.*\}', response, re.DOTALL)
+        if not json_match:
             raise ValueError("No valid JSON object found in the LLM response.")
-        except (json.JSONDecodeError, ValueError) as e:
-            return {"error": f"Failed to parse AI response. Error: {e}. Raw response: '{response[:200]}...'"}
+        return json.loads(json_match.group(0))
+    except (json.JSONDecodeError, ValueError) as e:
+        raise ValueError(f"Failed to parse AI response. Error: {e}. Raw response: '{response[:200]}...'")
+
+def _gap_value(gap, value):
+    """
+    Returns the LLM's value for a gap if it has the GAP_SCHEMAS shape, else None.
+    List entries of the wrong type are dropped.
+    """
+    if gap == "professional_summary":
+        return value.strip() if isinstance(value, str) and value.strip() else None
+    if not isinstance(value, list):
+        return None
+    if gap == "skills":
+        items = [item.strip() for item in value if isinstance(item, str) and item.strip()]
+    else:
+        items = [item for item in value if isinstance(item, dict)]
+    return items or None
+
+def _merge_gaps(ats_parsing, filled, gaps):
+    """
+    Copies the LLM's values for the flagged fields over the local parse,
+    keeping the local value wherever the reply has the wrong shape.
+    """
+    if not isinstance(filled, dict):
+        return ats_parsing
+    contact = filled.get("contact_info")
+    for gap in gaps:
+        if gap.startswith("contact_info."):
+            field = gap.split(".", 1)[1]
+            value = contact.get(field) if isinstance(contact, dict) else None
+            if isinstance(value, str) and value.strip():
+                ats_parsing["contact_info"][field] = value.strip()
+        else:
+            value = _gap_value(gap, filled.get(gap))
+            if value is not None:
+                ats_parsing[gap] = value
+    return ats_parsing
+
+def _valid_fit_analysis(fit_analysis):
+    """
+    Returns the fit analysis with fit_score as an int in 0-100 and the skill
+    fields as lists of strings, or None if the LLM's reply cannot be read that way.
+    """
+    if not isinstance(fit_analysis, dict):
+        return None
+    score = fit_analysis.get("fit_score")
+    if isinstance(score, bool):
+        return None
+    try:
+        score = float(str(score).strip().rstrip("%"))
+    except ValueError:
+        return None
+    if not (math.isfinite(score) and 0 <= score <= 100):
+        return None
+    skills = {}
+    for field in ("matching_skills", "missing_skills"):
+        value = fit_analysis.get(field, [])
+        if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+            return None
+        skills[field] = value
+    summary = fit_analysis.get("summary", "")
+    if not isinstance(summary, str):
+        return None
+    return {**fit_analysis, "fit_score": round(score), "summary": summary, **skills}
+
+async def _fit_analysis(resume_doc, jd_doc):
+    prompt, reports = await run_io(
+        fit_prompt,
+        build_fit_prompt,
+        {
+            "resume_text": PromptSlot(resume_doc.text, kind="resume", weight=2, page_offsets=resume_doc.page_offsets),
+            "jd_text": PromptSlot(jd_doc.text, kind="jd", weight=1, page_offsets=jd_doc.page_offsets),
+        },
+        FIT_OUTPUT_TOKENS,
+    )
+    shrunk = record_prompt_budget("resume_screening", reports)
+    response = await get_llm_response(prompt, task="resume_screening", max_tokens=FIT_OUTPUT_TOKENS)
+    raw = _parse_json_response(response).get("fit_analysis", {})
+    fit_analysis = _valid_fit_analysis(raw)
+    if fit_analysis is None:
+        # Not stored, so the next analysis asks again instead of serving a malformed result
+        logger.warning("The fit analysis for %s does not match the schema; not storing it", resume_doc.digest[:12])
+        return raw
+    if shrunk:
+        # The score was based on a shortened resume or JD; say what was left out
+        fit_analysis["prompt_budget"] = shrunk
+    await save_artifact(resume_doc.digest, "fit_analysis", fit_analysis_version(), fit_analysis, jd_doc.digest)
+    return fit_analysis
+
+async def score_candidate_fit(resume_doc, jd_doc):
+    """
+    Returns the fit analysis of a resume against a JD, from the candidate store when it has one.
+    """
+    stored = await load_artifact(resume_doc.digest, "fit_analysis", fit_analysis_version(), jd_doc.digest)
+    if stored is not None:
+        return stored
+    return await _fit_analysis(resume_doc, jd_doc)
+
+async def _fill_gaps(resume_doc, ats_parsing, gaps):
+    """
+    Completes the local parse with the LLM. Parsing is best-effort: if the
+    call or its JSON fails, the local values are kept (but not stored, so
+    the next analysis tries again).
+    """
+    output_tokens = _gap_output_tokens(gaps, resume_doc.text, ats_parsing)
+    try:
+        prompt, reports = await run_io(
+            fit_prompt,
+            partial(build_gap_prompt, gaps=tuple(gaps)),
+            {"resume_text": PromptSlot(resume_doc.text, kind="resume", page_offsets=resume_doc.page_offsets)},
+            output_tokens,
+        )
+        record_prompt_budget("resume_parsing", reports)
+        response = await get_llm_response(prompt, task="resume_parsing", max_tokens=output_tokens)
+        ats_parsing = _merge_gaps(ats_parsing, _parse_json_response(response).get("ats_parsing"), gaps)
+    except ExecutorSaturatedError:
+        raise
+    except (LLMError, ValueError) as e:
+        logger.warning("Keeping the local resume parse; filling %s failed: %s", ", ".join(gaps), e)
+        return ats_parsing
+    await save_artifact(resume_doc.digest, "ats_parsing", ats_parsing_version(), ats_parsing)
+    return ats_parsing
 
+async def analyze_resume_progressive(resume_doc, jd_doc, resume_name=None):
+    """
+    Parses the resume locally, then runs the fit analysis and the filling of
+    low-confidence parsing fields as two concurrent LLM calls. Yields
+    ("fit_analysis", ...) and ("ats_parsing", ...) in whichever order they finish,
+    or ("error", message) if the fit analysis fails.
+
+    Both parts are kept in the candidate store; a part already stored for this
+    resume (and JD) with the current prompt version is returned as is.
+    """
+    await remember_candidate(resume_doc, resume_name)
+    await remember_jd(jd_doc)
+    stored_parse = await load_artifact(resume_doc.digest, "ats_parsing", ats_parsing_version())
+    stored_fit = await load_artifact(resume_doc.digest, "fit_analysis", fit_analysis_version(), jd_doc.digest)
+    fit_task = gap_task = None
+    try:
+        if stored_fit is not None:
+            yield "fit_analysis", stored_fit
+        else:
+            fit_task = asyncio.create_task(_fit_analysis(resume_doc, jd_doc))
+        if stored_parse is not None:
+            yield "ats_parsing", stored_parse
+        else:
+            ats_parsing, gaps = await run_cpu(parse_resume, resume_doc.text)
+            if gaps:
+                gap_task = asyncio.create_task(_fill_gaps(resume_doc, ats_parsing, gaps))
+            else:
+                await save_artifact(resume_doc.digest, "ats_parsing", ats_parsing_version(), ats_parsing)
+                yield "ats_parsing", ats_parsing
+        pending = {task for task in (fit_task, gap_task) if task is not None}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task is gap_task:
+                    yield "ats_parsing", task.result()
+                    continue
+                try:
+                    yield "fit_analysis", task.result()
+                except ValueError as e:
+                    yield "error", str(e)
+    finally:
+        for task in (fit_task, gap_task):
+            if task is not None:
+                task.cancel()
+
+async def analyze_resume(resume_doc, jd_doc, resume_name=None):
+    """
+    Runs the full analysis on already-extracted documents and returns the
+    combined {"fit_analysis": ..., "ats_parsing": ...} result.
+    """
+    try:
+        result = {}
+        async for part, value in analyze_resume_progressive(resume_doc, jd_doc, resume_name):
+            if part == "error":
+                return {"error": value}
+            result[part] = value
+        return {"fit_analysis": result["fit_analysis"], "ats_parsing": result["ats_parsing"]}
+    except (ExecutorSaturatedError, LLMError):
+        raise
     except Exception as e:
         return {"error": f"An unexpected error occurred during analysis: {e}"}
@@ -0,0 +1,150 @@
+import re
+
+# Canonical skill name -> other spellings seen in resumes and JDs (matched case-insensitively).
+SKILL_ALIASES = {
+    # Languages
+    "Python": ["python3", "py"],
+    "Java": [],
+    "JavaScript": ["js", "ecmascript", "es6"],
+    "TypeScript": ["ts"],
+    "C": [],
+    "C++": ["cpp"],
+    "C#": ["c sharp", "csharp"],
+    "Go": ["golang"],
+    "Rust": [],
+    "Ruby": [],
+    "PHP": [],
+    "Kotlin": [],
+    "Swift": [],
+    "Scala": [],
+    "R": [],
+    "MATLAB": [],
+    "Perl": [],
+    "Bash": ["shell scripting", "shell"],
+    "SQL": [],
+    "HTML": ["html5"],
+    "CSS": ["css3"],
+    # Frameworks and libraries
+    "React": ["react.js", "reactjs"],
+    "Angular": ["angular.js", "angularjs"],
+    "Vue.js": ["vue", "vuejs"],
+    "Node.js": ["node", "nodejs"],
+    "Express": ["express.js", "expressjs"],
+    "Next.js": ["nextjs"],
+    "Django": [],
+    "Flask": [],
+    "FastAPI": [],
+    "Spring": ["spring boot", "springboot"],
+    ".NET": ["dotnet", "asp.net", ".net core"],
+    "Ruby on Rails": ["rails", "ror"],
+    "Pandas": [],
+    "NumPy": [],
+    "scikit-learn": ["sklearn", "scikit learn"],
+    "TensorFlow": [],
+    "PyTorch": ["torch"],
+    "Keras": [],
+    "Spark": ["apache spark", "pyspark"],
+    "Hadoop": [],
+    "Kafka": ["apache kafka"],
+    "Airflow": ["apache airflow"],
+    "GraphQL": [],
+    "REST APIs": ["rest", "restful", "rest api", "restful apis"],
+    "Microservices": ["microservice architecture"],
+    # Data and infrastructure
+    "PostgreSQL": ["postgres", "psql"],
+    "MySQL": [],
+    "SQLite": [],
+    "MongoDB": ["mongo"],
+    "Redis": [],
+    "Elasticsearch": ["elastic search", "elk"],
+    "Snowflake": [],
+    "BigQuery": [],
+    "AWS": ["amazon web services"],
+    "Azure": ["microsoft azure"],
+    "GCP": ["google cloud", "google cloud platform"],
+    "Docker": [],
+    "Kubernetes": ["k8s"],
+    "Terraform": [],
+    "Ansible": [],
+    "Jenkins": [],
+    "CI/CD": ["ci cd", "continuous integration", "continuous delivery"],
+    "Git": ["github", "gitlab"],
+    "Linux": ["unix"],
+    "Tableau": [],
+    "Power BI": ["powerbi"],
+    "Excel": ["microsoft excel", "ms excel"],
+    "Looker": [],
+    # Practices and domains
+    "Machine Learning": ["ml"],
+    "Deep Learning": ["dl"],
+    "Natural Language Processing": ["nlp"],
+    "Computer Vision": ["cv"],
+    "Data Analysis": ["data analytics"],
+    "Data Engineering": [],
+    "Statistics": ["statistical analysis"],
+    "ETL": ["elt"],
+    "Agile": ["scrum", "kanban"],
+    "Project Management": ["pmp"],
+    "Product Management": [],
+    "Stakeholder Management": [],
+    "UX Design": ["ux", "user experience"],
+    "UI Design": ["ui", "user interface design"],
+    "Figma": [],
+    "Jira": [],
+    "Salesforce": ["sfdc"],
+    "SAP": [],
+    "SEO": ["search engine optimization"],
+    "Digital Marketing": [],
+    "Accounting": [],
+    "Financial Modeling": ["financial modelling"],
+    "Recruiting": ["recruitment", "talent acquisition"],
+    "Payroll": [],
+    "Employee Relations": [],
+    "Communication": ["communication skills"],
+    "Leadership": ["team leadership"],
+    "Problem Solving": ["problem-solving"],
+    "Customer Service": ["customer support"],
+    "Sales": [],
+    "Negotiation": [],
+}
+
+# Aliases too ambiguous to match in free text; they only count inside a skills list.
+LIST_ONLY_ALIASES = {"c", "r", "go", "py", "ts", "ui", "ux", "cv", "ml", "dl", "rest", "node", "shell", "elt", "sales", "communication",
+                     "excel", "spring", "swift", "express"}
+
+_CANONICAL = {}
+for _skill, _aliases in SKILL_ALIASES.items():
+    _CANONICAL[_skill.lower()] = _skill
+    for _alias in _aliases:
+        _CANONICAL[_alias.lower()] = _skill
+
+
+def normalize_skill(name):
+    """
+    Maps a skill spelling to its canonical name; unknown skills are returned tidied but unchanged.
+    """
+    cleaned = re.sub(r"\s+", " ", name).strip(" .,;:-•*").strip()
+    return _CANONICAL.get(cleaned.lower(), cleaned)
+
+
+def _alias_pattern(aliases):
+    # Word-ish boundaries that still allow "C++", "C#" and ".NET"
+    alternatives = sorted((re.escape(a) for a in aliases), key=len, reverse=True)
+    return re.compile(r"(?<![\w+#.])(" + "|".join(alternatives) + r")(?![\w+#])", re.IGNORECASE)
+
+
+_FREE_TEXT_PATTERN = _alias_pattern([a for a in _CANONICAL if a not in LIST_ONLY_ALIASES])
+
+
+def find_skills(text):
+    """
+    Returns the canonical names of known skills mentioned anywhere in the text, in order of first mention.
+    """
+    found = []
+    seen = set()
+    for match in _FREE_TEXT_PATTERN.finditer(text):
+        skill = _CANONICAL[match.group(1).lower()]
+        if skill not in seen:
+            seen.add(skill)
+            found.append(skill)
+    return found
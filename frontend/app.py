@@ -3,7 +3,7 @@ import requests
 import os
 import json
 import pandas as pd
-from datetime import date
+from datetime import date, timedelta
 
 # ======================================================================================
 # Page Configuration & Custom CSS
@@ -102,6 +102,34 @@ def render_header(title, icon):
     """Renders a consistent header for each module."""
     st.markdown(f"<h2>{icon} {title}</h2>", unsafe_allow_html=True)
 
+def stream_tokens(path, **kwargs):
+    """Yields text tokens from one of the backend's Server-Sent Events endpoints."""
+    with requests.post(f"{BACKEND_URL}{path}", stream=True, **kwargs) as response:
+        response.raise_for_status()
+        event = "message"
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                event = "message"
+            elif line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                payload = json.loads(line[len("data:"):])
+                if event == "error":
+                    raise RuntimeError(payload["error"])
+                if event == "done":
+                    return
+                yield payload["token"]
+
+def render_stream(path, **kwargs):
+    """Shows tokens as they arrive, then clears the live preview and returns the full text."""
+    placeholder = st.empty()
+    text = ""
+    for token in stream_tokens(path, **kwargs):
+        text += token
+        placeholder.markdown(text + "▌")
+    placeholder.empty()
+    return text
+
 # ======================================================================================
 # Page Rendering Functions (ALL MODULES INCLUDED)
 # ======================================================================================
@@ -138,6 +166,23 @@ def show_dashboard():
                 st.table(df_questions)
             else:
                 st.info("No policy questions have been asked yet.")
+
+        st.markdown("---")
+        st.subheader("Trends (Last 90 Days)")
+        trend_response = requests.get(f"{BACKEND_URL}/getanalytics", params={"from": (date.today() - timedelta(days=90)).isoformat(), "granularity": "day"})
+        if trend_response.status_code == 200 and trend_response.json().get("window", {}).get("totals", {}).get("screenings"):
+            df_trend = pd.DataFrame(trend_response.json()["window"]["series"])
+            df_trend["Day"] = pd.to_datetime(df_trend["bucket_start"], unit="s")
+            df_trend = df_trend.set_index("Day")
+            t1, t2 = st.columns(2)
+            with t1:
+                st.caption("Resumes Screened & JDs Generated per Day")
+                st.line_chart(df_trend[["screenings", "jds_generated"]])
+            with t2:
+                st.caption("Average Fit Score per Day")
+                st.line_chart(df_trend[["avg_fit_score"]])
+        else:
+            st.info("No activity in the last 90 days to chart yet.")
     else:
         st.error("Could not fetch analytics data from the backend.")
 
@@ -153,61 +198,192 @@ def show_ats_resume_screener():
 
     if st.button("Run Full Analysis"):
         if resume_file and jd_file:
+            files = {
+                "resume": (resume_file.name, resume_file.getvalue()),
+                "jd": (jd_file.name, jd_file.getvalue())
+            }
+            # Each part is drawn as soon as the backend finishes it, so the fit score does not wait for parsing
+            fit_area = st.container()
+            ats_area = st.container()
+            failed = False
             with st.spinner("Performing ATS Screening & Fit Analysis..."):
-                files = {
-                    "resume": (resume_file.name, resume_file.getvalue()),
-                    "jd": (jd_file.name, jd_file.getvalue())
-                }
-                response = requests.post(f"{BACKEND_URL}/ats_fit_analysis", files=files)
-                
+                with requests.post(f"{BACKEND_URL}/ats_fit_analysis", params={"progressive": "true"}, files=files, stream=True) as response:
+                    if response.status_code != 200:
+                        st.error(f"An error occurred: {response.status_code} - {response.text}")
+                        return
+                    for line in response.iter_lines():
+                        if not line:
+                            continue
+                        part = json.loads(line)
+                        if part.get("error"):
+                            failed = True
+                            st.error(part["error"])
+                        elif "fit_analysis" in part:
+                            with fit_area:
+                                render_fit_analysis(part["fit_analysis"])
+                        elif "ats_parsing" in part:
+                            with ats_area:
+                                render_ats_parsing(part["ats_parsing"])
+            if not failed:
+                st.success("Analysis Complete!")
+        else:
+            st.warning("Please upload both a resume and a job description.")
+
+def render_fit_analysis(fit_data):
+    st.metric(label="Fit Score", value=f"{fit_data.get('fit_score', 0)}%")
+
+    with st.expander("View Fit Analysis Details", expanded=True):
+        st.subheader("AI Summary")
+        st.write(fit_data.get("summary", "N/A"))
+
+        st.subheader("Skills Match")
+        matching_skills_html = "".join([f'<span class="skill-tag matching-skill">{skill}</span>' for skill in fit_data.get("matching_skills", [])])
+        st.markdown("<h6>Matching Skills</h6>" + matching_skills_html if matching_skills_html else "No matching skills identified.", unsafe_allow_html=True)
+
+        missing_skills_html = "".join([f'<span class="skill-tag missing-skill">{skill}</span>' for skill in fit_data.get("missing_skills", [])])
+        st.markdown("<h6>Missing Skills</h6>" + missing_skills_html if missing_skills_html else "No missing skills identified.", unsafe_allow_html=True)
+
+    st.markdown("---")
+
+def render_ats_parsing(ats_data):
+    st.subheader("Detailed ATS Parsing")
+    with st.expander("View Full ATS Data"):
+        contact = ats_data.get("contact_info", {})
+        st.markdown(f"**Name:** {contact.get('name', 'N/A')} | **Email:** {contact.get('email', 'N/A')} | **Phone:** {contact.get('phone', 'N/A')}")
+
+        st.markdown("**Professional Summary**")
+        st.write(ats_data.get("professional_summary", "N/A"))
+
+        st.markdown("**Work Experience**")
+        for job in ats_data.get("work_experience", []):
+            st.markdown(f"**{job.get('job_title')}** at {job.get('company')} ({job.get('start_date')} - {job.get('end_date')})")
+
+        st.markdown("**Education**")
+        for edu in ats_data.get("education", []):
+            st.markdown(f"**{edu.get('degree')}**, {edu.get('institution')} ({edu.get('graduation_date')})")
+
+        st.markdown("**Skills**")
+        st.write(", ".join(ats_data.get("skills", [])))
+
+def show_batch_resume_screener():
+    render_header("Batch Resume Screening", "📚")
+    st.write("Screen many resumes against one job description. Results appear as soon as each resume is analyzed.")
+
+    jd_file = st.file_uploader("Upload Job Description (PDF)", type="pdf", key="batch_jd")
+    resume_files = st.file_uploader("Upload Resumes (PDF)", type="pdf", accept_multiple_files=True, key="batch_resumes")
+    concurrency = st.slider("Resumes analyzed in parallel", min_value=1, max_value=32, value=8)
+    top_k = st.number_input("Send only the top K locally pre-ranked resumes to the AI (0 = all)", min_value=0, value=0, step=5)
+
+    if st.button("Screen All Resumes"):
+        if jd_file and resume_files:
+            files = [("jd", (jd_file.name, jd_file.getvalue()))]
+            files += [("resumes", (f.name, f.getvalue())) for f in resume_files]
+            data = {"concurrency": concurrency}
+            if top_k:
+                data["top_k"] = top_k
+            progress = st.progress(0.0, text="Screening resumes...")
+            table = st.empty()
+            rows = []
+            batch_error = None
+            with requests.post(f"{BACKEND_URL}/ats_fit_analysis/batch", files=files, data=data, stream=True) as response:
+                if response.status_code != 200:
+                    st.error(f"An error occurred: {response.status_code} - {response.text}")
+                    return
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    item = json.loads(line)
+                    if "result" not in item:
+                        batch_error = item.get("error", "Unknown error")
+                        continue
+                    result = item["result"]
+                    fit_data = result.get("fit_analysis", {})
+                    rows.append({
+                        "Resume": item["filename"],
+                        "Fit Score": fit_data.get("fit_score"),
+                        "Pre-screen Score": result.get("prescreen", {}).get("score"),
+                        "Summary": result.get("error") or fit_data.get("summary", ""),
+                    })
+                    progress.progress(len(rows) / len(resume_files), text=f"Screened {len(rows)} of {len(resume_files)} resumes")
+                    results = pd.DataFrame(rows)
+                    # The LLM sometimes returns scores as text, and failed resumes have none
+                    results["Fit Score"] = pd.to_numeric(results["Fit Score"], errors="coerce")
+                    table.dataframe(results.sort_values("Fit Score", ascending=False, na_position="last"), use_container_width=True)
+            if batch_error:
+                st.error(f"Batch screening stopped early: {batch_error}")
+            else:
+                st.success("Batch screening complete!")
+        else:
+            st.warning("Please upload a job description and at least one resume.")
+
+def show_candidate_search():
+    render_header("Candidate Search", "🔎")
+    st.write("Find previously screened candidates by skill, e.g. `Kubernetes AND (Go OR Rust) AND NOT PHP`.")
+    query = st.text_input("Skills Query")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        mode = st.selectbox("Mode", ["boolean", "ranked"], help="Ranked mode scores anyone with at least one skill, rarest skills first.")
+    with col2:
+        since = st.date_input("Screened Since", value=None)
+    with col3:
+        limit = st.number_input("Max Results", min_value=1, max_value=500, value=50)
+    if st.button("Search Candidates"):
+        if query:
+            params = {"q": query, "mode": mode, "limit": int(limit)}
+            if since:
+                params["since"] = since.isoformat()
+            response = requests.get(f"{BACKEND_URL}/candidates/search", params=params)
+            if response.status_code == 200:
+                found = response.json()
+                st.success(f"{found['total']} candidates matched in {found['took_ms']} ms.")
+                rows = [{
+                    "Resume": result["filename"] or result["digest"][:12],
+                    "Matched Skills": ", ".join(result["matched_skills"]),
+                    "Score": result.get("score"),
+                    "Last Screened": pd.to_datetime(result["screened_at"], unit="s") if result["screened_at"] else None,
+                } for result in found["results"]]
+                if rows:
+                    st.dataframe(pd.DataFrame(rows), use_container_width=True)
+            else:
+                st.error(f"An error occurred: {response.json().get('error', response.text)}")
+        else:
+            st.warning("Please enter a skills query.")
+
+def show_candidate_matcher():
+    render_header("Match Past Applicants", "🧲")
+    st.write("Upload a new job description to surface the closest candidates you have already screened.")
+    jd_file = st.file_uploader("Upload Job Description (PDF)", type="pdf", key="matcher_jd")
+    title = st.text_input("Requisition Title (optional)")
+    col1, col2 = st.columns(2)
+    with col1:
+        top_n = st.number_input("Candidates to Return", min_value=1, max_value=100, value=10)
+    with col2:
+        rescore = st.checkbox("Re-score with a full fit analysis (up to 20)", value=False)
+    if st.button("Find Matches"):
+        if jd_file:
+            with st.spinner("Matching candidates..."):
+                files = {"jd": (jd_file.name, jd_file.getvalue())}
+                response = requests.post(f"{BACKEND_URL}/jd", files=files, data={"title": title} if title else {})
+                if response.status_code != 200:
+                    st.error(f"An error occurred: {response.text}")
+                    return
+                jd_id = response.json()["id"]
+                response = requests.get(f"{BACKEND_URL}/jd/{jd_id}/match", params={"top_n": int(top_n), "rescore": str(rescore).lower()})
                 if response.status_code == 200:
-                    st.success("Analysis Complete!")
-                    data = response.json()
-
-                    if data.get("error"):
-                        st.error(data["error"])
-                    else:
-                        # --- Fit Analysis Section ---
-                        fit_data = data.get("fit_analysis", {})
-                        st.metric(label="Fit Score", value=f"{fit_data.get('fit_score', 0)}%")
-                        
-                        with st.expander("View Fit Analysis Details", expanded=True):
-                            st.subheader("AI Summary")
-                            st.write(fit_data.get("summary", "N/A"))
-                            
-                            st.subheader("Skills Match")
-                            matching_skills_html = "".join([f'<span class="skill-tag matching-skill">{skill}</span>' for skill in fit_data.get("matching_skills", [])])
-                            st.markdown("<h6>Matching Skills</h6>" + matching_skills_html if matching_skills_html else "No matching skills identified.", unsafe_allow_html=True)
-                            
-                            missing_skills_html = "".join([f'<span class="skill-tag missing-skill">{skill}</span>' for skill in fit_data.get("missing_skills", [])])
-                            st.markdown("<h6>Missing Skills</h6>" + missing_skills_html if missing_skills_html else "No missing skills identified.", unsafe_allow_html=True)
-
-                        st.markdown("---")
-
-                        # --- ATS Parsing Section ---
-                        ats_data = data.get("ats_parsing", {})
-                        st.subheader("Detailed ATS Parsing")
-                        with st.expander("View Full ATS Data"):
-                            contact = ats_data.get("contact_info", {})
-                            st.markdown(f"**Name:** {contact.get('name', 'N/A')} | **Email:** {contact.get('email', 'N/A')} | **Phone:** {contact.get('phone', 'N/A')}")
-
-                            st.markdown("**Professional Summary**")
-                            st.write(ats_data.get("professional_summary", "N/A"))
-                            
-                            st.markdown("**Work Experience**")
-                            for job in ats_data.get("work_experience", []):
-                                st.markdown(f"**{job.get('job_title')}** at {job.get('company')} ({job.get('start_date')} - {job.get('end_date')})")
-                            
-                            st.markdown("**Education**")
-                            for edu in ats_data.get("education", []):
-                                st.markdown(f"**{edu.get('degree')}**, {edu.get('institution')} ({edu.get('graduation_date')})")
-                            
-                            st.markdown("**Skills**")
-                            st.write(", ".join(ats_data.get("skills", [])))
+                    found = response.json()
+                    rows = [{
+                        "Resume": result["filename"] or f"Candidate {result['candidate_id']}",
+                        "Similarity": result["similarity"],
+                        "Fit Score": result.get("fit_analysis", {}).get("fit_score"),
+                        "Summary": result.get("error") or result.get("fit_analysis", {}).get("summary", ""),
+                    } for result in found["results"]]
+                    st.success(f"Found {len(rows)} candidates in {found['took_ms']} ms.")
+                    if rows:
+                        st.dataframe(pd.DataFrame(rows), use_container_width=True)
                 else:
-                    st.error(f"An error occurred: {response.status_code} - {response.text}")
+                    st.error(f"An error occurred: {response.json().get('error', response.text)}")
         else:
-            st.warning("Please upload both a resume and a job description.")
+            st.warning("Please upload a job description.")
 
 def show_jd_generator():
     render_header("Job Description Generator", "📝")
@@ -225,23 +401,22 @@ def show_jd_generator():
         submitted = st.form_submit_button("Generate JD")
         if submitted:
             if role and level and skills:
-                with st.spinner("Generating JD..."):
-                    data = {"role": role, "level": level, "skills": skills, "tone": tone}
-                    response = requests.post(f"{BACKEND_URL}/jdgenerate", data=data)
-                    if response.status_code == 200:
-                        st.success("JD Generated!")
-                        st.session_state.generated_jd = response.json()["result"]
-                    else:
-                        st.error(f"An error occurred: {response.text}")
+                data = {"role": role, "level": level, "skills": skills, "tone": tone}
+                try:
+                    st.session_state.generated_jd = render_stream("/jdgenerate/stream", data=data)
+                    st.success("JD Generated!")
+                except (requests.exceptions.RequestException, RuntimeError) as e:
+                    st.error(f"An error occurred: {e}")
             else:
                 st.warning("Please fill in all fields.")
 
     if st.session_state.generated_jd:
         st.subheader("Generated Job Description")
-        st.text_area("JD Output", st.session_state.generated_jd, height=400, key="jd_output")
+        jd_text = st.text_area("JD Output", st.session_state.generated_jd, height=400, key="jd_output")
+        deep_review = st.checkbox("Include a detailed AI review", value=False)
         if st.button("Check for Inclusivity"):
             with st.spinner("Analyzing for inclusive language..."):
-                response = requests.post(f"{BACKEND_URL}/checkinclusivity", data={"jd_text": st.session_state.generated_jd})
+                response = requests.post(f"{BACKEND_URL}/checkinclusivity", data={"jd_text": jd_text, "deep_review": str(deep_review).lower()})
                 if response.status_code == 200:
                     st.info("Inclusivity Analysis:")
                     st.markdown(response.json()["result"])
@@ -284,21 +459,42 @@ def show_offer_letter_generator():
         submitted = st.form_submit_button("Generate Offer Letter")
         if submitted:
             if all([candidate_name, job_title, manager_name, salary, start_date, expiration_date]):
-                with st.spinner("Drafting offer letter..."):
-                    details = {
-                        "candidate_name": candidate_name, "job_title": job_title, "manager_name": manager_name,
-                        "salary": salary, "start_date": start_date.strftime("%B %d, %Y"),
-                        "expiration_date": expiration_date.strftime("%B %d, %Y")
-                    }
-                    response = requests.post(f"{BACKEND_URL}/generateoffer", json=details)
-                    if response.status_code == 200:
-                        st.success("Offer Letter Generated!")
-                        st.text_area("Generated Letter", response.json()['result'], height=500, key="offer_letter_output")
-                    else:
-                        st.error(f"An error occurred: {response.text}")
+                details = {
+                    "candidate_name": candidate_name, "job_title": job_title, "manager_name": manager_name,
+                    "salary": salary, "start_date": start_date.strftime("%B %d, %Y"),
+                    "expiration_date": expiration_date.strftime("%B %d, %Y")
+                }
+                try:
+                    letter = render_stream("/generateoffer/stream", json=details)
+                    st.success("Offer Letter Generated!")
+                    st.text_area("Generated Letter", letter, height=500, key="offer_letter_output")
+                except (requests.exceptions.RequestException, RuntimeError) as e:
+                    st.error(f"An error occurred: {e}")
             else:
                 st.warning("Please fill in all the details.")
 
+    st.markdown("---")
+    st.subheader("Bulk Offers from CSV")
+    st.write("Upload a CSV with columns `candidate_name, job_title, start_date, salary, manager_name, expiration_date` (and optionally `company_name`). Each job title's template is drafted once and reused for every candidate.")
+    offers_file = st.file_uploader("Upload Offers (CSV)", type="csv", key="offers_csv")
+    file_format = st.selectbox("Letter Format", ["docx", "txt"])
+    if st.button("Generate All Offers"):
+        if offers_file:
+            with st.spinner("Rendering offer letters..."):
+                files = {"offers": (offers_file.name, offers_file.getvalue())}
+                response = requests.post(f"{BACKEND_URL}/generateoffer/bulk", files=files, params={"format": file_format})
+                if response.status_code == 200:
+                    generated = response.headers.get("X-Offers-Generated", "0")
+                    failed = int(response.headers.get("X-Offers-Failed", "0"))
+                    st.success(f"Generated {generated} offer letters.")
+                    if failed:
+                        st.warning(f"{failed} rows could not be generated; see errors.json in the download.")
+                    st.download_button("Download Offer Letters (ZIP)", response.content, file_name="offer_letters.zip", mime="application/zip")
+                else:
+                    st.error(f"An error occurred: {response.json().get('error', response.text)}")
+        else:
+            st.warning("Please upload a CSV of offers.")
+
 def show_performance_review_assistant():
     render_header("Performance Review Assistant", "📈")
     st.write("Draft a structured and constructive performance review from your notes.")
@@ -311,31 +507,71 @@ def show_performance_review_assistant():
         submitted = st.form_submit_button("Generate Review")
         if submitted:
             if employee_name and review_period and points:
-                with st.spinner("Drafting performance review..."):
-                    data = {"employee_name": employee_name, "review_period": review_period, "points": points}
-                    response = requests.post(f"{BACKEND_URL}/generateperformance", data=data)
-                    if response.status_code == 200:
-                        st.success("Review Generated!")
-                        st.text_area("Generated Review", response.json()['result'], height=500, key="perf_review_output")
-                    else:
-                        st.error(f"An error occurred: {response.text}")
+                data = {"employee_name": employee_name, "review_period": review_period, "points": points}
+                try:
+                    review = render_stream("/generateperformance/stream", data=data)
+                    st.success("Review Generated!")
+                    st.text_area("Generated Review", review, height=500, key="perf_review_output")
+                except (requests.exceptions.RequestException, RuntimeError) as e:
+                    st.error(f"An error occurred: {e}")
             else:
                 st.warning("Please fill in all fields.")
 
+    st.markdown("---")
+    st.subheader("Bulk Reviews")
+    st.write("Upload a CSV or JSON with `employee_name`, `review_period` and `points` for each employee. The job runs in the background and picks up where it left off after a restart.")
+    reviews_file = st.file_uploader("Upload Reviews (CSV or JSON)", type=["csv", "json"], key="bulk_reviews")
+    if st.button("Start Bulk Job"):
+        if reviews_file:
+            files = {"reviews": (reviews_file.name, reviews_file.getvalue())}
+            response = requests.post(f"{BACKEND_URL}/generateperformance/bulk", files=files)
+            if response.status_code == 202:
+                st.session_state.review_job_id = response.json()["id"]
+            else:
+                st.error(f"An error occurred: {response.json().get('error', response.text)}")
+        else:
+            st.warning("Please upload a file of reviews.")
+
+    job_id = st.text_input("Job ID", value=st.session_state.get("review_job_id", ""))
+    # The last status is kept across reruns so the buttons below it still work when clicked
+    if job_id and st.button("Check Progress"):
+        response = requests.get(f"{BACKEND_URL}/generateperformance/bulk/{job_id}")
+        if response.status_code == 200:
+            st.session_state.review_job_status = response.json()
+        else:
+            st.session_state.pop("review_job_status", None)
+            st.error(f"An error occurred: {response.json().get('error', response.text)}")
+
+    job = st.session_state.get("review_job_status")
+    if job and job["id"] == job_id:
+        if job["failed"] and job["status"] != "running" and st.button("Retry Failed Reviews"):
+            response = requests.post(f"{BACKEND_URL}/generateperformance/bulk/{job_id}/retry")
+            if response.status_code == 200:
+                job = st.session_state.review_job_status = response.json()
+                st.info("Retrying the failed reviews.")
+            else:
+                st.error(f"An error occurred: {response.json().get('error', response.text)}")
+        st.progress(job["percent"] / 100, text=f"{job['completed']} of {job['total']} reviews done ({job['status'].replace('_', ' ')})")
+        if job["status"] == "running" and job["eta_seconds"] is not None:
+            st.write(f"About {timedelta(seconds=job['eta_seconds'])} remaining.")
+        if job["failed"]:
+            st.warning(f"{job['failed']} reviews failed.")
+        if job["completed"]:
+            archive = requests.get(f"{BACKEND_URL}/generateperformance/bulk/{job_id}/download")
+            st.download_button("Download Reviews (ZIP)", archive.content, file_name=f"performance_reviews_{job_id[:8]}.zip", mime="application/zip")
+
 def show_interview_generator():
     render_header("Interview Question Generator", "❓")
     st.write("Generate tailored interview questions from a job description.")
     jd_file = st.file_uploader("Upload Job Description (PDF)", type="pdf", key="interview_jd")
     if st.button("Generate Questions"):
         if jd_file:
-            with st.spinner("Generating questions..."):
-                files = {"jd": (jd_file.name, jd_file.getvalue())}
-                response = requests.post(f"{BACKEND_URL}/interviewgenerate", files=files)
-                if response.status_code == 200:
-                    st.success("Questions Generated!")
-                    st.markdown(response.json()["result"])
-                else:
-                    st.error(f"An error occurred: {response.text}")
+            files = {"jd": (jd_file.name, jd_file.getvalue())}
+            try:
+                st.write_stream(stream_tokens("/interviewgenerate/stream", files=files))
+                st.success("Questions Generated!")
+            except (requests.exceptions.RequestException, RuntimeError) as e:
+                st.error(f"An error occurred: {e}")
         else:
             st.warning("Please upload a job description.")
 
@@ -418,6 +654,9 @@ with st.sidebar:
     PAGES = {
         "📊 Analytics Dashboard": show_dashboard,
         "📄 ATS Resume Screener": show_ats_resume_screener,
+        "📚 Batch Resume Screening": show_batch_resume_screener,
+        "🔎 Candidate Search": show_candidate_search,
+        "🧲 Match Past Applicants": show_candidate_matcher,
         "📝 JD Generator": show_jd_generator,
         "✍️ Candidate Summarizer": show_candidate_summarizer,
         "✉️ Offer Letter Generator": show_offer_letter_generator,